@@ -0,0 +1,224 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import graph_io
+import matcher
+import subgraph
+from compact_graph import CompactGraph
+from exercise import EXTENSIONS, PARTS, read_exercise_graphs, read_source
+from result_cache import ResultCache
+from shortest_paths import NegativeCycle, floyd_warshall_graph, has_negative_weights, shortest_path, table_path
+
+
+# в режиме --reference работами могут быть и файлы форматов graph_io
+SOURCE_EXTENSIONS = EXTENSIONS + tuple(graph_io.EXTENSIONS) + tuple(ext + ".gz" for ext in graph_io.EXTENSIONS)
+
+# несколько запросов --path на небольшом графе дешевле ответить одной таблицей всех пар
+TABLE_NODE_LIMIT = 200
+
+_cache: Optional[ResultCache] = None
+# Event из matcher.MP_CONTEXT: выставленный, прерывает идущие в процессах сверки
+_cancel = None
+
+
+def init_worker(cache_path: Optional[str], cache_size: int, cancel=None):
+    global _cache, _cancel
+    _cache = ResultCache(cache_size, cache_path)
+    _cancel = cancel
+    matcher.COMPONENT_WORKERS = 1
+
+
+def check_cancel(expanded: int, depth: int):
+    if _cancel is not None and _cancel.is_set():
+        raise matcher.SearchCancelled()
+
+
+def collect_files(patterns: Sequence[str], extensions: Tuple[str, ...] = EXTENSIONS) -> List[str]:
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.extend(sorted(f for f in glob.glob(os.path.join(pattern, "*")) if f.endswith(extensions)))
+        elif glob.has_magic(pattern):
+            files.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            files.append(pattern)
+    return files
+
+
+def run_task(file_path: str, paths: Sequence[Sequence[str]], timeout: Optional[float],
+             mode: str = "isomorphism", collect_stats: bool = False) -> dict:
+    started = time.perf_counter()
+    result = {"file": file_path}
+    stats = matcher.SearchStats() if collect_stats else None
+    try:
+        graph, matrix = read_exercise_graphs(file_path)
+        try:
+            with matcher.timed(stats, "total"):
+                if mode == "isomorphism":
+                    mapping = matcher.solve_graphs(graph, matrix, timeout, cache=_cache, stats=stats)
+                else:
+                    # _cache хранит канонические нумерации, а они решают только вопрос изоморфизма:
+                    # вложение в больший граф по ним не найти, поэтому здесь кэш не используется
+                    mapping = subgraph.solve_subgraph(graph, matrix, mode == "induced", timeout, stats=stats)
+        except matcher.SearchTimeout:
+            result["status"] = "timeout"
+            mapping = None
+        else:
+            result["status"] = "ok" if mapping else "no_match"
+        result["mapping"] = mapping
+        if stats is not None:
+            result["stats"] = stats.as_dict()
+
+        queries = []
+        adj = graph.adjacency() if paths else None
+        pred = None
+        if len(paths) > 1 and len(graph) <= TABLE_NODE_LIMIT and not has_negative_weights(adj):
+            _, pred = floyd_warshall_graph(graph)
+        for start, end in paths:
+            path = None
+            length = None
+            query = {"from": start, "to": end}
+            u, v = graph.index_of(start), graph.index_of(end)
+            if u is not None and v is not None:
+                try:
+                    path = table_path(pred, u, v) if pred is not None else shortest_path(adj, u, v)
+                except NegativeCycle as e:
+                    query["negative_cycle"] = [graph.names[i] for i in e.cycle]
+            if path:
+                length = sum(adj[path[i]][path[i + 1]] for i in range(len(path) - 1))
+                path = [graph.names[i] for i in path]
+            query.update(path=path, length=length)
+            queries.append(query)
+        if queries:
+            result["paths"] = queries
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["time"] = round(time.perf_counter() - started, 6)
+    return result
+
+
+def compare_graphs(a: CompactGraph, b: CompactGraph, mode: str = "isomorphism", timeout: Optional[float] = None,
+                   progress: matcher.Progress = None, cache: Optional[ResultCache] = None,
+                   stats: Optional[matcher.SearchStats] = None) -> Optional[Dict[str, str]]:
+    # те же фильтры и кэш, что и у сравнения рисунка с матрицей; результат - имена вершин b.
+    # Веса сравниваются строго: невзвешенный эталон не должен принимать взвешенную работу
+    if mode == "isomorphism":
+        mapping = matcher.solve_graphs(a, b, timeout, progress, cache, stats, strict_weights=True)
+    else:
+        mapping = subgraph.solve_subgraph(a, b, mode == "induced", timeout, progress, stats, strict_weights=True)
+    if mapping is None:
+        return None
+    return {name: b.names[i - 1] for name, i in mapping.items()}
+
+
+def run_comparison(reference: CompactGraph, spec: str, part: str, timeout: Optional[float],
+                   mode: str = "isomorphism") -> dict:
+    started = time.perf_counter()
+    result = {"file": spec}
+    try:
+        try:
+            mapping = compare_graphs(reference, read_source(spec, part), mode, timeout, check_cancel, _cache)
+        except matcher.SearchTimeout:
+            result["status"] = "timeout"
+            mapping = None
+        except matcher.SearchCancelled:
+            result["status"] = "cancelled"
+            mapping = None
+        else:
+            result["status"] = "ok" if mapping else "no_match"
+        result["mapping"] = mapping
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["time"] = round(time.perf_counter() - started, 6)
+    return result
+
+
+def run_comparisons(reference: CompactGraph, specs: Sequence[str], part: str = "graph",
+                    timeout: Optional[float] = None, workers: Optional[int] = None,
+                    cache_path: Optional[str] = None, cache_size: int = 1024,
+                    mode: str = "isomorphism", cancel=None) -> Iterator[dict]:
+    # один эталон против множества работ: эталон передаётся в процессы один раз на задачу,
+    # его каноническая форма кэшируется внутри каждого процесса
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=matcher.MP_CONTEXT, initializer=init_worker,
+                               initargs=(cache_path, cache_size, cancel))
+    futures = []
+    try:
+        futures = [pool.submit(run_comparison, reference, spec, part, timeout, mode) for spec in specs]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # если генератор закрыли раньше (отмена), ждущие задачи снимаются здесь же:
+        # cancel_futures исполняет поток пула позже и теряется, если пул уже собран
+        # сборщиком мусора; идущие задачи выходят сами на ближайшей проверке cancel
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def run_batch(files: Sequence[str], paths: Sequence[Sequence[str]] = (), timeout: Optional[float] = None,
+              workers: Optional[int] = None, cache_path: Optional[str] = None,
+              cache_size: int = 1024, mode: str = "isomorphism", collect_stats: bool = False) -> Iterator[dict]:
+    with ProcessPoolExecutor(max_workers=workers, mp_context=matcher.MP_CONTEXT, initializer=init_worker,
+                             initargs=(cache_path, cache_size)) as pool:
+        futures = [pool.submit(run_task, f, paths, timeout, mode, collect_stats) for f in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Match graph exercises to their matrices without the GUI.")
+    parser.add_argument("inputs", nargs="+",
+                        help="exercise files (.json, .dz9, optionally .gz), directories or glob patterns")
+    parser.add_argument("--reference", default=None, metavar="SOURCE",
+                        help="compare every input against this graph instead of its own matrix; "
+                             "exercise files take a '#graph' or '#matrix' suffix, graph formats are also accepted")
+    parser.add_argument("--part", choices=PARTS, default="graph",
+                        help="which part of an input exercise to compare with --reference")
+    parser.add_argument("--path", nargs=2, action="append", default=[], metavar=("START", "END"),
+                        help="also find the shortest path between two named nodes (repeatable)")
+    parser.add_argument("--mode", choices=list(subgraph.MODES), default="isomorphism",
+                        help="match the whole graph or embed it as an (induced) subgraph")
+    parser.add_argument("--stats", action="store_true",
+                        help="add search counters (candidates, prunes per rule, backtracks, stage times)")
+    parser.add_argument("--timeout", type=float, default=None, help="matching time limit per file, seconds")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--cache", default=None, help="SQLite file to share memoized results between runs")
+    parser.add_argument("--cache-size", type=int, default=1024, help="in-memory results kept per worker")
+    parser.add_argument("-o", "--output", default="-", help="JSON Lines output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.reference:
+        try:
+            reference = read_source(args.reference)
+        except (OSError, ValueError) as e:
+            print(f"{args.reference}: {e}", file=sys.stderr)
+            return 2
+        results = run_comparisons(reference, collect_files(args.inputs, SOURCE_EXTENSIONS), args.part,
+                                  args.timeout, args.workers, args.cache, args.cache_size, args.mode)
+    else:
+        results = run_batch(collect_files(args.inputs), args.path, args.timeout, args.workers, args.cache,
+                            args.cache_size, args.mode, args.stats)
+    out = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    failed = 0
+    try:
+        for result in results:
+            if result["status"] == "error":
+                failed += 1
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import matcher
+from compact_graph import CompactGraph
+from graph_io import build_graph
+from shortest_paths import dijkstra_search
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+FORMAT_VERSION = 2
+REPEAT = 5
+PATH_QUERIES = 20
+MAX_WEIGHT = 9
+# допуск: во сколько раз можно превысить базовый прогон. Проверяются только детерминированные
+# счётчики работы и память под tracemalloc; время зависит от машины и лишь выводится рядом
+MEMORY_RATIO = 1.25
+NODES_RATIO = 1.0
+MIN_MEMORY_DELTA = 64 * 1024
+COUNTERS = ("match_nodes", "match_candidates", "match_backtracks", "path_settled")
+
+Edges = List[Tuple[int, int]]
+
+
+def gnp(n: int, rng: random.Random, p: float = None) -> Edges:
+    # по умолчанию средняя степень около 6
+    p = min(1.0, 6 / max(n - 1, 1)) if p is None else p
+    return [(u, v) for u in range(n) for v in range(u + 1, n) if rng.random() < p]
+
+
+def random_regular(n: int, rng: random.Random, d: int = 3) -> Edges:
+    # модель конфигураций: перемешанные полурёбра, пока не выйдет простой граф
+    if n * d % 2:
+        raise ValueError(f"no {d}-regular graph on {n} vertices")
+    stubs = [u for u in range(n) for _ in range(d)]
+    while True:
+        rng.shuffle(stubs)
+        edges = {(min(u, v), max(u, v)) for u, v in zip(stubs[::2], stubs[1::2])}
+        if len(edges) == n * d // 2 and all(u != v for u, v in edges):
+            return sorted(edges)
+
+
+def paley(n: int, rng: random.Random) -> Edges:
+    # граф Пэли - сильно регулярный, q простое и q = 1 (mod 4)
+    if n % 4 != 1 or any(n % k == 0 for k in range(2, int(n ** 0.5) + 1)):
+        raise ValueError(f"Paley graph needs a prime q = 1 (mod 4), got {n}")
+    squares = {x * x % n for x in range(1, n)}
+    return [(u, v) for u in range(n) for v in range(u + 1, n) if (v - u) % n in squares]
+
+
+def grid(n: int, rng: random.Random) -> Edges:
+    side = max(1, round(n ** 0.5))
+    rows = -(-n // side)
+    edges = []
+    for u in range(n):
+        r, c = divmod(u, side)
+        if c + 1 < side and u + 1 < n:
+            edges.append((u, u + 1))
+        if r + 1 < rows and u + side < n:
+            edges.append((u, u + side))
+    return edges
+
+
+def tree(n: int, rng: random.Random) -> Edges:
+    # случайное дерево по коду Прюфера
+    if n < 2:
+        return []
+    code = [rng.randrange(n) for _ in range(n - 2)]
+    degree = [1] * n
+    for v in code:
+        degree[v] += 1
+    edges = []
+    for v in code:
+        leaf = degree.index(1)
+        edges.append((leaf, v))
+        degree[leaf] -= 1
+        degree[v] -= 1
+    u, v = (x for x in range(n) if degree[x] == 1)
+    edges.append((u, v))
+    return edges
+
+
+FAMILIES: Dict[str, Callable[[int, random.Random], Edges]] = {
+    "gnp": gnp,
+    "regular": random_regular,
+    "paley": paley,
+    "grid": grid,
+    "tree": tree,
+}
+
+# (семейство, размеры, взвешенный вариант)
+SUITES = {
+    "quick": [
+        ("gnp", (50, 200), False), ("gnp", (50, 200), True),
+        ("regular", (50, 100), False),
+        ("paley", (13, 29), False),
+        ("grid", (49, 196), False), ("grid", (196,), True),
+        ("tree", (50, 200), False), ("tree", (200,), True),
+    ],
+    "full": [
+        ("gnp", (100, 500, 2000), False), ("gnp", (100, 500, 2000), True),
+        ("regular", (100, 500, 2000), False), ("regular", (500,), True),
+        ("paley", (13, 29, 53, 101), False),
+        ("grid", (100, 900, 2500), False), ("grid", (900,), True),
+        ("tree", (100, 1000, 5000), False), ("tree", (1000,), True),
+    ],
+}
+
+
+def case_name(family: str, n: int, weighted: bool) -> str:
+    return f"{family}-{n}{'-w' if weighted else ''}"
+
+
+def make_case(family: str, n: int, weighted: bool, seed: int) -> Tuple[CompactGraph, CompactGraph]:
+    # рисунок и матрица одного графа: в матрице вершины перемешаны, как у студента
+    rng = random.Random(f"{seed}:{family}:{n}:{weighted}")
+    edges = FAMILIES[family](n, rng)
+    weights = [rng.randint(1, MAX_WEIGHT) if weighted else 1 for _ in edges]
+    src = [u for u, _ in edges]
+    dst = [v for _, v in edges]
+    graph = build_graph([f"N{u}" for u in range(n)], src, dst, weights)
+
+    perm = list(range(n))
+    rng.shuffle(perm)
+    matrix = np.zeros((n, n))
+    for (u, v), w in zip(edges, weights):
+        matrix[perm[u], perm[v]] = matrix[perm[v], perm[u]] = w
+    return graph, CompactGraph.from_matrix(matrix)
+
+
+def measure(run: Callable[[], object], repeat: int) -> Tuple[float, object, int]:
+    # время - лучший из повторов, память - отдельным прогоном под tracemalloc
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            result = run()
+            best = min(best, time.perf_counter() - started)
+        finally:
+            gc.enable()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, result, peak
+
+
+def run_case(family: str, n: int, weighted: bool, seed: int, repeat: int = REPEAT,
+             timeout: Optional[float] = None) -> dict:
+    graph, matrix = make_case(family, n, weighted, seed)
+    result = {"name": case_name(family, n, weighted), "family": family, "n": n, "weighted": weighted,
+              "edges": graph.arc_count // 2, "seed": seed}
+    stats = matcher.SearchStats()
+
+    def solve():
+        nonlocal stats
+        stats = matcher.SearchStats()
+        return matcher.solve_graphs(graph, matrix, timeout, stats=stats)
+
+    try:
+        elapsed, mapping, peak = measure(solve, repeat)
+    except matcher.SearchTimeout:
+        result["status"] = "timeout"
+        return result
+    result.update(status="ok" if mapping else "no_match", match_time=round(elapsed, 6),
+                  match_nodes=stats.nodes, match_candidates=stats.candidates,
+                  match_backtracks=stats.backtracks, match_pruned=dict(sorted(stats.pruned.items())),
+                  match_peak=peak)
+
+    rng = random.Random(f"{seed}:queries:{result['name']}")
+    adj = graph.adjacency()
+    queries = [(rng.randrange(n), rng.randrange(n)) for _ in range(PATH_QUERIES)]
+
+    def paths():
+        return sum(dijkstra_search(adj, u, v)[1] for u, v in queries)
+
+    elapsed, settled, peak = measure(paths, repeat)
+    result.update(path_time=round(elapsed, 6), path_settled=settled, path_peak=peak)
+    return result
+
+
+def compare(results: List[dict], baseline: List[dict], memory_ratio: float = MEMORY_RATIO,
+            nodes_ratio: float = NODES_RATIO) -> List[str]:
+    failures = []
+    known = {case["name"]: case for case in baseline}
+    for case in results:
+        name = case["name"]
+        base = known.get(name)
+        # таймаут, который был и в базовом прогоне, - известное ограничение, а не регрессия
+        if case["status"] != "ok":
+            if base is None or base.get("status") != case["status"]:
+                failures.append(f"{name}: {case['status']}")
+            continue
+        if base is None or base.get("status") != "ok":
+            continue
+        limits = [(key, case[key], base[key], nodes_ratio, 0) for key in COUNTERS]
+        limits += [(f"pruned[{rule}]", count, base["match_pruned"].get(rule, 0), nodes_ratio, 0)
+                   for rule, count in case["match_pruned"].items()]
+        limits += [(key, case[key], base[key], memory_ratio, MIN_MEMORY_DELTA) for key in ("match_peak", "path_peak")]
+        for key, value, reference, ratio, delta in limits:
+            if value > reference * ratio and value - reference > delta:
+                failures.append(f"{name}: {key} {value} > {reference} x {ratio}")
+    return failures
+
+
+def time_report(results: List[dict], baseline: List[dict]) -> List[str]:
+    # для сведения: на другой машине или под нагрузкой время заметно другое
+    known = {case["name"]: case for case in baseline}
+    lines = []
+    for case in results:
+        base = known.get(case["name"], {})
+        for key in ("match_time", "path_time"):
+            if key in case and base.get(key):
+                lines.append(f"{case['name']}: {key} {case[key]} (baseline {base[key]}, "
+                             f"x{case[key] / base[key]:.2f})")
+    return lines
+
+
+def load_results(path: str) -> List[dict]:
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported benchmark format {data.get('version')!r}")
+    return data["cases"]
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time graph matching and shortest paths on generated graphs.")
+    parser.add_argument("--suite", choices=list(SUITES), default="quick")
+    parser.add_argument("--only", default="*", help="glob over case names, e.g. 'paley-*'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timed runs per case, the best one counts")
+    parser.add_argument("--timeout", type=float, default=60.0, help="matching time limit per case, seconds")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--memory-ratio", type=float, default=MEMORY_RATIO)
+    parser.add_argument("--nodes-ratio", type=float, default=NODES_RATIO)
+    parser.add_argument("-o", "--output", default="-", help="JSON results file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    # замеры в одном процессе: tracemalloc не видит дочерние процессы
+    matcher.COMPONENT_WORKERS = 1
+    results = []
+    for family, sizes, weighted in SUITES[args.suite]:
+        for n in sizes:
+            if fnmatch.fnmatch(case_name(family, n, weighted), args.only):
+                results.append(run_case(family, n, weighted, args.seed, args.repeat, args.timeout))
+                print(json.dumps(results[-1]), file=sys.stderr)
+
+    report = {"version": FORMAT_VERSION, "suite": args.suite, "python": platform.python_version(),
+              "machine": platform.machine(), "cases": results}
+    text = json.dumps(report, indent=1)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        return 0
+    # без базового прогона сравнивать не с чем - это ошибка, а не успех
+    if not os.path.exists(args.baseline):
+        print(f"no baseline {args.baseline}, run with --save-baseline first", file=sys.stderr)
+        return 2
+    baseline = load_results(args.baseline)
+    for line in time_report(results, baseline):
+        print(f"time {line}", file=sys.stderr)
+    failures = compare(results, baseline, args.memory_ratio, args.nodes_ratio)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from compact_graph import CompactGraph
+
+Cells = List[List[int]]
+Adjacency = List[Dict[int, float]]
+# вызывается в каждом узле дерева поиска с (узлы, глубина), может прервать поиск исключением
+Checkpoint = Optional[Callable[[int, int], None]]
+
+CANON_NODE_LIMIT = 2000
+FORM_CACHE_SIZE = 256
+
+
+class GiveUp(Exception):
+    # checkpoint прекращает канонизацию, результат - как при превышении node_limit
+    pass
+
+
+class CanonicalForm:
+    def __init__(self, certificate: str, order: List[int], automorphisms: List[List[int]], group_size: int):
+        self.certificate = certificate
+        self.order = order
+        self.automorphisms = automorphisms
+        self.group_size = group_size
+
+
+def refine(adj: Adjacency, cells: Cells) -> Cells:
+    # клетки упорядочиваются по сигнатурам, а не по номерам вершин,
+    # поэтому результат не зависит от исходной нумерации
+    color = [0] * len(adj)
+    while True:
+        for ci, cell in enumerate(cells):
+            for v in cell:
+                color[v] = ci
+        new_cells = []
+        changed = False
+        for cell in cells:
+            if len(cell) == 1:
+                new_cells.append(cell)
+                continue
+            groups: Dict[tuple, List[int]] = {}
+            for v in cell:
+                sig = tuple(sorted((color[u], w) for u, w in adj[v].items()))
+                groups.setdefault(sig, []).append(v)
+            if len(groups) > 1:
+                changed = True
+            for sig in sorted(groups):
+                new_cells.append(groups[sig])
+        cells = new_cells
+        if not changed:
+            return cells
+
+
+def individualize(adj: Adjacency, cells: Cells, v: int) -> Cells:
+    for i, cell in enumerate(cells):
+        if v in cell:
+            rest = [u for u in cell if u != v]
+            return refine(adj, cells[:i] + [[v], rest] + cells[i + 1:])
+    raise ValueError(f"vertex {v} is not in the partition")
+
+
+def target_cell(cells: Cells) -> Optional[List[int]]:
+    best = None
+    for cell in cells:
+        if len(cell) > 1 and (best is None or len(cell) < len(best)):
+            best = cell
+    return best
+
+
+def leaf_code(adj: Adjacency, order: List[int]) -> tuple:
+    pos = [0] * len(order)
+    for i, v in enumerate(order):
+        pos[v] = i
+    return tuple(sorted((pos[u], pos[v], w) for u in range(len(adj)) for v, w in adj[u].items()))
+
+
+def find(parent: List[int], x: int) -> int:
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def union(parent: List[int], x: int, y: int):
+    rx, ry = find(parent, x), find(parent, y)
+    if rx != ry:
+        parent[max(rx, ry)] = min(rx, ry)
+
+
+def next_child(frame: list, moved: List[Dict[int, int]], n: int) -> Optional[int]:
+    # ветви из одной орбиты стабилизатора префикса дают одинаковые листья;
+    # автоморфизмы хранятся как словари сдвинутых точек
+    _, prefix, target, tried, parent, known = frame
+    if known < len(moved):
+        fixed = set(prefix)
+        for a in moved[known:]:
+            if fixed.isdisjoint(a.keys()):
+                if parent is None:
+                    parent = list(range(n))
+                for x, y in a.items():
+                    union(parent, x, y)
+        frame[4], frame[5] = parent, len(moved)
+    seen = {find(parent, t) for t in tried} if parent is not None else set(tried)
+    for v in target:
+        if v in tried:
+            continue
+        if parent is not None and find(parent, v) in seen:
+            continue
+        return v
+    return None
+
+
+def canonical_form(graph: CompactGraph, node_limit: int = CANON_NODE_LIMIT,
+                   checkpoint: Checkpoint = None) -> Optional[CanonicalForm]:
+    adj = graph.adjacency()
+    n = len(adj)
+    root = refine(adj, [list(range(n))]) if n else []
+
+    first_code = best_code = None
+    first_order = best_order = None
+    first_path = best_path = None
+    automorphisms: List[List[int]] = []
+    moved: List[Dict[int, int]] = []
+    nodes = 0
+    stack = [[root, [], None, [], None, 0]]
+
+    while stack:
+        frame = stack[-1]
+        cells, prefix, target, tried = frame[:4]
+        if target is None:
+            nodes += 1
+            if nodes > node_limit:
+                return None
+            if checkpoint is not None:
+                checkpoint(nodes, len(prefix))
+            cell = target_cell(cells)
+            if cell is None:
+                order = [c[0] for c in cells]
+                code = leaf_code(adj, order)
+                reference = None
+                if first_code is None:
+                    first_code, first_order, first_path = code, order, prefix
+                elif code == first_code:
+                    reference, reference_order = first_path, first_order
+                elif code == best_code:
+                    reference, reference_order = best_path, best_order
+                if best_code is None or code < best_code:
+                    best_code, best_order, best_path = code, order, prefix
+                if reference is None:
+                    stack.pop()
+                    continue
+                perm = _perm(reference_order, order)
+                automorphisms.append(perm)
+                moved.append({x: y for x, y in enumerate(perm) if x != y})
+                # найденный автоморфизм переводит уже пройденное поддерево в текущее,
+                # поэтому возвращаемся к общему предку
+                common = 0
+                while common < len(prefix) and prefix[common] == reference[common]:
+                    common += 1
+                del stack[common + 1:]
+                continue
+            frame[2] = target = sorted(cell)
+        v = next_child(frame, moved, n)
+        if v is None:
+            stack.pop()
+            continue
+        tried.append(v)
+        stack.append([individualize(adj, cells, v), prefix + [v], None, [], None, 0])
+
+    digest = hashlib.blake2b(repr((n, best_code)).encode(), digest_size=16).hexdigest()
+    return CanonicalForm(digest, best_order or [], automorphisms, group_size(n, first_path or [], moved))
+
+
+def group_size(n: int, first_path: List[int], moved: List[Dict[int, int]]) -> int:
+    # теорема об орбите и стабилизаторе вдоль первого пути дерева поиска
+    size = 1
+    for k, v in enumerate(first_path):
+        fixed = set(first_path[:k])
+        parent = list(range(n))
+        for a in moved:
+            if fixed.isdisjoint(a.keys()):
+                for x, y in a.items():
+                    union(parent, x, y)
+        root = find(parent, v)
+        size *= sum(1 for x in range(n) if find(parent, x) == root)
+    return size
+
+
+def _perm(source: List[int], target: List[int]) -> List[int]:
+    perm = [0] * len(source)
+    for a, b in zip(source, target):
+        perm[a] = b
+    return perm
+
+
+_forms: "OrderedDict[str, Optional[CanonicalForm]]" = OrderedDict()
+# формы ищут и SolverWorker, и CompareWorker из общего пула потоков
+_forms_lock = threading.Lock()
+
+
+def graph_digest(graph: CompactGraph) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for arr in (graph.indptr, graph.indices, graph.weights):
+        h.update(arr.typecode.encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def cached_canonical_form(graph: CompactGraph, checkpoint: Checkpoint = None) -> Optional[CanonicalForm]:
+    key = graph_digest(graph)
+    with _forms_lock:
+        if key in _forms:
+            _forms.move_to_end(key)
+            return _forms[key]
+    # сама канонизация долгая и идёт без блокировки; одну форму могут найти два потока сразу
+    try:
+        form = canonical_form(graph, checkpoint=checkpoint)
+    except GiveUp:
+        # не кэшируется: с другим запасом времени форма может найтись
+        return None
+    with _forms_lock:
+        _forms[key] = form
+        _forms.move_to_end(key)
+        if len(_forms) > FORM_CACHE_SIZE:
+            _forms.popitem(last=False)
+    return form
@@ -0,0 +1,127 @@
+from array import array
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+from graph_model import to_number
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _weight_array(values) -> array:
+    # целые веса, в том числе записанные как 2.0, хранятся как int64, чтобы
+    # сертификаты и кэши не различали одинаковые графы
+    if all(isinstance(w, int) or float(w).is_integer() for w in values):
+        return array('q', [int(w) for w in values])
+    return array('d', values)
+
+
+class CompactGraph:
+    def __init__(self, names: List[str], indptr: array, indices: array, weights: array):
+        self.names = names
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self._adjacency: Optional[List[Dict[int, float]]] = None
+
+    def __getstate__(self):
+        return self.names, self.indptr, self.indices, self.weights
+
+    def __setstate__(self, state):
+        self.names, self.indptr, self.indices, self.weights = state
+        self._adjacency = None
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def arc_count(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def from_adjacency(cls, adj: Mapping[Hashable, Mapping[Hashable, float]],
+                       keys: Sequence[Hashable] = None, names: Sequence[str] = None) -> "CompactGraph":
+        keys = list(adj.keys()) if keys is None else list(keys)
+        pos = {k: i for i, k in enumerate(keys)}
+        indptr = array('i', [0])
+        indices = array('i')
+        weights = []
+        for k in keys:
+            for v, w in adj[k].items():
+                indices.append(pos[v])
+                weights.append(w)
+            indptr.append(len(indices))
+        names = [str(k) for k in keys] if names is None else list(names)
+        return cls(names, indptr, indices, _weight_array(weights))
+
+    @classmethod
+    def from_matrix(cls, matrix) -> "CompactGraph":
+        size = len(matrix)
+        names = [str(i + 1) for i in range(size)]
+        if np is not None and isinstance(matrix, np.ndarray):
+            rows, cols = (matrix != 0).nonzero()
+            counts = np.bincount(rows, minlength=size)
+            indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int32)
+            values = matrix[rows, cols]
+            if values.dtype.kind == 'f' and np.all(values == np.round(values)):
+                values = values.astype(np.int64)
+            weights = array('q' if values.dtype.kind in "iu" else 'd', values.tolist())
+            return cls(names, array('i', indptr.tolist()), array('i', cols.astype(np.int32).tolist()), weights)
+
+        indptr = array('i', [0])
+        indices = array('i')
+        weights = []
+        for r in range(size):
+            for c in range(size):
+                val = matrix[r][c]
+                if isinstance(val, str):
+                    val = to_number(val)
+                    if val is None:
+                        continue
+                if val != 0:
+                    indices.append(c)
+                    weights.append(val)
+            indptr.append(len(indices))
+        return cls(names, indptr, indices, _weight_array(weights))
+
+    def degree(self, i: int) -> int:
+        return self.indptr[i + 1] - self.indptr[i]
+
+    def neighbors(self, i: int) -> List[Tuple[int, float]]:
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return list(zip(self.indices[lo:hi], self.weights[lo:hi]))
+
+    def adjacency(self) -> List[Dict[int, float]]:
+        if self._adjacency is None:
+            self._adjacency = [dict(self.neighbors(i)) for i in range(len(self))]
+        return self._adjacency
+
+    def index_of(self, name: str) -> Optional[int]:
+        try:
+            return self.names.index(name)
+        except ValueError:
+            return None
+
+    def max_weight(self) -> float:
+        return max(self.weights, default=0)
+
+    def is_unweighted(self) -> bool:
+        return all(w == 1 for w in self.weights)
+
+    def induced(self, vertices: Sequence[int]) -> "CompactGraph":
+        pos = {v: i for i, v in enumerate(vertices)}
+        indptr = array('i', [0])
+        indices = array('i')
+        weights = array(self.weights.typecode)
+        for u in vertices:
+            for k in range(self.indptr[u], self.indptr[u + 1]):
+                v = pos.get(self.indices[k])
+                if v is not None:
+                    indices.append(v)
+                    weights.append(self.weights[k])
+            indptr.append(len(indices))
+        return CompactGraph([self.names[u] for u in vertices], indptr, indices, weights)
+
+    def with_unit_weights(self) -> "CompactGraph":
+        return CompactGraph(self.names, self.indptr, self.indices, array('q', [1]) * len(self.weights))
@@ -0,0 +1,125 @@
+from collections import Counter
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+
+class MultisetDiff:
+    # разность двух мультимножеств; mismatched - число ключей с ненулевой разностью,
+    # так что равенство проверяется за O(1)
+    def __init__(self):
+        self.diff: Dict[Hashable, int] = {}
+        self.mismatched = 0
+
+    def add(self, key: Hashable, delta: int):
+        old = self.diff.get(key, 0)
+        new = old + delta
+        if new:
+            self.diff[key] = new
+        else:
+            self.diff.pop(key, None)
+        self.mismatched += (new != 0) - (old != 0)
+
+
+class Side:
+    # одна из сравниваемых сторон: рисунок (sign = 1) или матрица (sign = -1);
+    # ребро рисунка - две дуги, ненулевая клетка матрицы - одна
+    def __init__(self, tracker: "ConsistencyTracker", sign: int):
+        self.tracker = tracker
+        self.sign = sign
+        self.vertices = 0
+        self.arcs = 0
+        self.non_unit = 0
+        self.degrees: Counter = Counter()
+        self.weights: Counter = Counter()
+
+    def _degree(self, degree: int, delta: int):
+        self.degrees[degree] += delta
+        if not self.degrees[degree]:
+            del self.degrees[degree]
+        self.tracker.degrees.add(degree, self.sign * delta)
+
+    def _weight(self, weight, delta: int):
+        self.weights[weight] += delta
+        if not self.weights[weight]:
+            del self.weights[weight]
+        self.non_unit += delta * (weight != 1)
+        self.tracker.weights.add(weight, self.sign * delta)
+
+    def add_vertex(self, degree: int = 0):
+        self.vertices += 1
+        self._degree(degree, 1)
+        self.tracker.changed()
+
+    def remove_vertex(self, degree: int = 0):
+        self.vertices -= 1
+        self._degree(degree, -1)
+        self.tracker.changed()
+
+    def add_arc(self, degree: int, weight):
+        # degree - степень начала дуги до добавления
+        self.arcs += 1
+        self._degree(degree, -1)
+        self._degree(degree + 1, 1)
+        self._weight(weight, 1)
+        self.tracker.changed()
+
+    def remove_arc(self, degree: int, weight):
+        self.arcs -= 1
+        self._degree(degree, -1)
+        self._degree(degree - 1, 1)
+        self._weight(weight, -1)
+        self.tracker.changed()
+
+    def change_weight(self, old, new, arcs: int = 1):
+        self._weight(old, -arcs)
+        self._weight(new, arcs)
+        self.tracker.changed()
+
+    def clear(self):
+        for degree, count in self.degrees.items():
+            self.tracker.degrees.add(degree, -self.sign * count)
+        for weight, count in self.weights.items():
+            self.tracker.weights.add(weight, -self.sign * count)
+        self.vertices = self.arcs = self.non_unit = 0
+        self.degrees = Counter()
+        self.weights = Counter()
+        self.tracker.changed()
+
+    def load(self, degrees: Iterable[int], weights: Iterable):
+        self.clear()
+        for degree, count in Counter(degrees).items():
+            self.vertices += count
+            self.arcs += degree * count
+            self._degree(degree, count)
+        for weight, count in Counter(weights).items():
+            self._weight(weight, count)
+        self.tracker.changed()
+
+
+class ConsistencyTracker:
+    # необходимые условия изоморфизма рисунка и матрицы, поддерживаемые при каждой правке
+    def __init__(self, listener: Optional[Callable[[], None]] = None):
+        self.degrees = MultisetDiff()
+        self.weights = MultisetDiff()
+        self.scene = Side(self, 1)
+        self.matrix = Side(self, -1)
+        self.listener = listener
+        self.pending = False
+
+    def changed(self):
+        # слушатель вызывается один раз до следующего mismatch(), а не на каждую правку
+        if not self.pending and self.listener is not None:
+            self.pending = True
+            self.listener()
+
+    def mismatch(self) -> Optional[str]:
+        self.pending = False
+        if self.scene.vertices != self.matrix.vertices:
+            return "node counts differ"
+        if self.scene.arcs != self.matrix.arcs:
+            return "edge counts differ"
+        if self.degrees.mismatched:
+            return "degree sequences differ"
+        # рисунок без весов сравнивается с матрицей как невзвешенный, см. with_unit_weights
+        if self.scene.non_unit and self.weights.mismatched:
+            return "edge weights differ"
+        return None
@@ -0,0 +1,197 @@
+import gzip
+import json
+import struct
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from compact_graph import CompactGraph
+from graph_io import build_graph, open_text, read_graph
+from graph_model import parse_weight
+
+Adjacency = Dict[str, Dict[str, int]]
+
+EXTENSIONS = (".json", ".json.gz", ".dz9", ".dz9.gz")
+PARTS = ("graph", "matrix")
+FILE_FILTER = "Exercises (*.json *.json.gz *.dz9 *.dz9.gz);;JSON (*.json *.json.gz);;Binary (*.dz9 *.dz9.gz)"
+
+# двоичный контейнер: MAGIC, версия (uint16), длина заголовка (uint32), JSON-заголовок
+# с описанием массивов, затем сами массивы, выровненные по ALIGN байт
+MAGIC = b"DZ9EX\0"
+BINARY_VERSION = 1
+ALIGN = 64
+
+
+def graph_adjacency(g_data: dict) -> Adjacency:
+    names = {}
+    adj: Adjacency = {}
+    for n in g_data.get("nodes", []):
+        names[n["id"]] = n["name"]
+        adj[n["name"]] = {}
+    for e in g_data.get("edges", []):
+        u, v = names.get(e["u"]), names.get(e["v"])
+        if u is None or v is None or u == v or v in adj[u]:
+            continue
+        weight = parse_weight(e.get("w", ""))
+        adj[u][v] = weight
+        adj[v][u] = weight
+    return adj
+
+
+def is_binary(file_path: str) -> bool:
+    return file_path.endswith((".dz9", ".dz9.gz"))
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+def write_arrays(file_path: str, arrays: Dict[str, np.ndarray], meta: dict):
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, arr in arrays.items():
+        offset = _aligned(offset)
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += arr.nbytes
+    header = json.dumps({"meta": meta, "arrays": layout}).encode()
+    prefix = MAGIC + struct.pack("<HI", BINARY_VERSION, len(header)) + header
+    opener = gzip.open if file_path.endswith(".gz") else open
+    with opener(file_path, 'wb') as f:
+        f.write(prefix.ljust(_aligned(len(prefix)), b"\0"))
+        position = 0
+        for name, arr in arrays.items():
+            f.write(b"\0" * (layout[name]["offset"] - position))
+            f.write(arr.reshape(-1).view(np.uint8))
+            position = layout[name]["offset"] + arr.nbytes
+
+
+def read_arrays(file_path: str) -> Tuple[Dict[str, np.ndarray], dict]:
+    # несжатый файл отображается в память, массивы - представления без копирования
+    if file_path.endswith(".gz"):
+        with gzip.open(file_path, 'rb') as f:
+            buffer = f.read()
+    else:
+        buffer = np.memmap(file_path, dtype=np.uint8, mode='r')
+    start = len(MAGIC) + 6
+    if len(buffer) < start or bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError("not a binary exercise file")
+    version, size = struct.unpack_from("<HI", buffer, len(MAGIC))
+    if version > BINARY_VERSION:
+        raise ValueError(f"unsupported exercise format version {version}")
+    header = json.loads(bytes(buffer[start:start + size]))
+    base = _aligned(start + size)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        arrays[name] = np.frombuffer(buffer, dtype=np.dtype(spec["dtype"]), count=int(np.prod(shape)),
+                                     offset=base + spec["offset"]).reshape(shape)
+    return arrays, header["meta"]
+
+
+def pack_names(names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [name.encode('utf-8') for name in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_names(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    text = data.tobytes()
+    bounds = offsets.tolist()
+    return [text[a:b].decode('utf-8') for a, b in zip(bounds, bounds[1:])]
+
+
+def pack_weights(values) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    if np.all(values == np.round(values)):
+        return values.astype(np.int64)
+    return values
+
+
+def pack_matrix(matrix: np.ndarray) -> np.ndarray:
+    # целочисленная матрица хранится в самом узком подходящем типе
+    matrix = np.asarray(matrix)
+    if matrix.size == 0 or not np.all(matrix == np.round(matrix)):
+        return matrix.astype(float)
+    lo, hi = matrix.min(), matrix.max()
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return matrix.astype(dtype)
+    return matrix.astype(np.int64)
+
+
+def write_exercise_binary(file_path: str, names: Sequence[str], positions: np.ndarray, edges: np.ndarray,
+                          weights: Sequence[float], labeled: Sequence[bool], matrix: np.ndarray,
+                          node_counter: int = 0):
+    name_data, name_offsets = pack_names(names)
+    arrays = {
+        "node_names": name_data,
+        "node_name_offsets": name_offsets,
+        "node_xy": np.asarray(positions, dtype=float).reshape(-1, 2),
+        "edges": np.asarray(edges, dtype=np.int32).reshape(-1, 2),
+        "edge_weights": pack_weights(weights),
+        "edge_labeled": np.packbits(np.asarray(labeled, dtype=bool)),
+        "matrix": pack_matrix(matrix),
+    }
+    write_arrays(file_path, arrays, {"node_counter": node_counter})
+
+
+def read_exercise_binary(file_path: str) -> dict:
+    arrays, meta = read_arrays(file_path)
+    edges = arrays["edges"]
+    return {
+        "names": unpack_names(arrays["node_names"], arrays["node_name_offsets"]),
+        "positions": arrays["node_xy"],
+        "edges": edges,
+        "weights": arrays["edge_weights"],
+        "labeled": np.unpackbits(arrays["edge_labeled"], count=len(edges)).astype(bool),
+        "matrix": arrays["matrix"],
+        "node_counter": meta.get("node_counter", 0),
+    }
+
+
+def read_exercise_json(file_path: str) -> dict:
+    with open_text(file_path) as f:
+        return json.load(f)
+
+
+def read_exercise(file_path: str) -> Tuple[Adjacency, List[List[str]]]:
+    if is_binary(file_path):
+        data = read_exercise_binary(file_path)
+        names = data["names"]
+        adj: Adjacency = {name: {} for name in names}
+        for (u, v), w in zip(data["edges"].tolist(), data["weights"].tolist()):
+            if u != v and names[v] not in adj[names[u]]:
+                adj[names[u]][names[v]] = w
+                adj[names[v]][names[u]] = w
+        return adj, data["matrix"]
+    data = read_exercise_json(file_path)
+    return graph_adjacency(data.get("graph", {})), data.get("matrix", [])
+
+
+def read_exercise_graphs(file_path: str) -> Tuple[CompactGraph, CompactGraph]:
+    if is_binary(file_path):
+        data = read_exercise_binary(file_path)
+        edges = data["edges"]
+        graph = build_graph(data["names"], edges[:, 0], edges[:, 1], data["weights"])
+        return graph, CompactGraph.from_matrix(data["matrix"])
+    g_adj, matrix = read_exercise(file_path)
+    return CompactGraph.from_adjacency(g_adj), CompactGraph.from_matrix(matrix)
+
+
+def split_source(spec: str, part: str = "graph") -> Tuple[str, str]:
+    # "task.json#matrix" - матрица упражнения, без суффикса - нарисованный граф
+    path, sep, suffix = spec.rpartition("#")
+    if sep and suffix in PARTS:
+        return path, suffix
+    return spec, part
+
+
+def read_source(spec: str, part: str = "graph") -> CompactGraph:
+    path, part = split_source(spec, part)
+    if path.endswith(EXTENSIONS):
+        graph, matrix = read_exercise_graphs(path)
+        return matrix if part == "matrix" else graph
+    return read_graph(path)
@@ -0,0 +1,218 @@
+import gzip
+import math
+import os
+import xml.etree.ElementTree as ET
+from array import array
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+
+from compact_graph import CompactGraph
+
+FORMATS = {
+    "edgelist": "Edge list (*.txt *.edges *.el)",
+    "dimacs": "DIMACS shortest path (*.gr *.dimacs)",
+    "graphml": "GraphML (*.graphml)",
+}
+EXTENSIONS = {
+    ".txt": "edgelist", ".edges": "edgelist", ".el": "edgelist",
+    ".gr": "dimacs", ".dimacs": "dimacs",
+    ".graphml": "graphml",
+}
+WEIGHT_NAMES = ("weight", "w")
+
+# (u, v, weight); v is None for a vertex without edges
+Record = Tuple[str, Optional[str], float]
+
+
+def detect_format(path: str) -> str:
+    base = path[:-3] if path.endswith(".gz") else path
+    fmt = EXTENSIONS.get(os.path.splitext(base)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Unknown graph format: {os.path.basename(path)}")
+    return fmt
+
+
+def open_text(path: str, mode: str = 'r') -> TextIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def parse_number(text: str):
+    # как и graph_model.to_number, nan и inf весом не считаются
+    try:
+        return int(text)
+    except ValueError:
+        value = float(text)
+    if not math.isfinite(value):
+        raise ValueError(f"non-finite weight {text!r}")
+    return value
+
+
+def iter_edge_list(f: TextIO) -> Iterator[Record]:
+    for line_no, line in enumerate(f, 1):
+        parts = line.split()
+        if not parts or parts[0][0] in "#%":
+            continue
+        try:
+            if len(parts) == 1:
+                yield parts[0], None, 1
+            else:
+                yield parts[0], parts[1], parse_number(parts[2]) if len(parts) > 2 else 1
+        except ValueError:
+            raise ValueError(f"line {line_no}: bad weight {parts[2]!r}")
+
+
+def iter_dimacs(f: TextIO) -> Iterator[Record]:
+    for line_no, line in enumerate(f, 1):
+        parts = line.split()
+        if not parts or parts[0] == "c":
+            continue
+        try:
+            if parts[0] == "p":
+                for i in range(1, int(parts[2]) + 1):
+                    yield str(i), None, 1
+            elif parts[0] == "a":
+                yield parts[1], parts[2], parse_number(parts[3])
+            else:
+                raise ValueError(f"unknown line type {parts[0]!r}")
+        except (IndexError, ValueError) as e:
+            raise ValueError(f"line {line_no}: {e}")
+
+
+def iter_graphml(f: TextIO) -> Iterator[Record]:
+    weight_keys = set()
+    for _, elem in ET.iterparse(f, events=("end",)):
+        tag = elem.tag.rsplit('}', 1)[-1]
+        if tag == "key":
+            if elem.get("attr.name") in WEIGHT_NAMES and elem.get("for", "all") in ("edge", "all"):
+                weight_keys.add(elem.get("id"))
+        elif tag == "node":
+            yield elem.get("id"), None, 1
+            elem.clear()
+        elif tag == "edge":
+            weight = 1
+            for data in elem:
+                if data.get("key") in weight_keys and data.text:
+                    weight = parse_number(data.text.strip())
+            yield elem.get("source"), elem.get("target"), weight
+            elem.clear()
+
+
+READERS = {"edgelist": iter_edge_list, "dimacs": iter_dimacs, "graphml": iter_graphml}
+
+
+def _int_array(values: np.ndarray) -> array:
+    result = array('i')
+    result.frombytes(values.astype(np.int32).tobytes())
+    return result
+
+
+def build_graph(names: List[str], src, dst, weights) -> CompactGraph:
+    # неориентированный граф: повторы и петли отбрасываются, у ребра остаётся первый вес
+    n = len(names)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    weights = np.asarray(weights)
+    keep = src != dst
+    lo, hi, weights = np.minimum(src, dst)[keep], np.maximum(src, dst)[keep], weights[keep]
+    _, first = np.unique(lo * n + hi, return_index=True)
+    lo, hi, weights = lo[first], hi[first], weights[first]
+
+    rows = np.concatenate([lo, hi])
+    cols = np.concatenate([hi, lo])
+    values = np.concatenate([weights, weights])
+    order = np.lexsort((cols, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n))))
+    if values.dtype.kind == 'f' and np.all(values == np.round(values)):
+        values = values.astype(np.int64)
+    typed = array('q' if values.dtype.kind in "iub" else 'd')
+    typed.frombytes(values.astype(np.int64 if typed.typecode == 'q' else float).tobytes())
+    return CompactGraph(list(names), _int_array(indptr), _int_array(cols), typed)
+
+
+def read_records(records: Iterator[Record]) -> CompactGraph:
+    index: Dict[str, int] = {}
+    names: List[str] = []
+    src = array('q')
+    dst = array('q')
+    weights = []
+    for u, v, w in records:
+        iu = index.get(u)
+        if iu is None:
+            iu = index[u] = len(names)
+            names.append(u)
+        if v is None:
+            continue
+        iv = index.get(v)
+        if iv is None:
+            iv = index[v] = len(names)
+            names.append(v)
+        src.append(iu)
+        dst.append(iv)
+        weights.append(w)
+    return build_graph(names, np.frombuffer(src, dtype=np.int64), np.frombuffer(dst, dtype=np.int64), weights)
+
+
+def read_graph(path: str, fmt: str = None) -> CompactGraph:
+    fmt = fmt or detect_format(path)
+    with open_text(path) as f:
+        try:
+            return read_records(READERS[fmt](f))
+        except ET.ParseError as e:
+            raise ValueError(f"{os.path.basename(path)}: {e}")
+        except ValueError as e:
+            raise ValueError(f"{os.path.basename(path)}: {e}")
+
+
+def iter_edges(graph: CompactGraph) -> Iterator[Tuple[int, int, float]]:
+    for u in range(len(graph)):
+        for k in range(graph.indptr[u], graph.indptr[u + 1]):
+            v = graph.indices[k]
+            if u < v:
+                yield u, v, graph.weights[k]
+
+
+def write_edge_list(f: TextIO, graph: CompactGraph):
+    names = graph.names
+    linked = set()
+    for u, v, w in iter_edges(graph):
+        linked.update((u, v))
+        f.write(f"{names[u]} {names[v]} {w}\n")
+    for u in range(len(graph)):
+        if u not in linked:
+            f.write(f"{names[u]}\n")
+
+
+def write_dimacs(f: TextIO, graph: CompactGraph):
+    f.write(f"p sp {len(graph)} {graph.arc_count}\n")
+    for u in range(len(graph)):
+        for k in range(graph.indptr[u], graph.indptr[u + 1]):
+            f.write(f"a {u + 1} {graph.indices[k] + 1} {graph.weights[k]}\n")
+
+
+def write_graphml(f: TextIO, graph: CompactGraph):
+    kind = "long" if graph.weights.typecode == 'q' else "double"
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+            f'  <key id="w" for="edge" attr.name="weight" attr.type="{kind}"/>\n'
+            '  <graph edgedefault="undirected">\n')
+    for name in graph.names:
+        f.write(f'    <node id={quoteattr(name)}/>\n')
+    names = graph.names
+    for u, v, w in iter_edges(graph):
+        f.write(f'    <edge source={quoteattr(names[u])} target={quoteattr(names[v])}>'
+                f'<data key="w">{w}</data></edge>\n')
+    f.write('  </graph>\n</graphml>\n')
+
+
+WRITERS = {"edgelist": write_edge_list, "dimacs": write_dimacs, "graphml": write_graphml}
+
+
+def write_graph(path: str, graph: CompactGraph, fmt: str = None):
+    fmt = fmt or detect_format(path)
+    with open_text(path, 'w') as f:
+        WRITERS[fmt](f, graph)
@@ -0,0 +1,119 @@
+import math
+from typing import Dict, Hashable, List, Optional, Union
+
+Weight = Union[int, float]
+
+
+def to_number(text: str) -> Optional[Weight]:
+    text = text.strip().replace(",", ".")
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    if not math.isfinite(value):
+        return None
+    return int(value) if value.is_integer() else value
+
+
+def parse_weight(text: str) -> Weight:
+    value = to_number(text) if text else None
+    return 1 if value is None else value
+
+
+def format_weight(value: Weight) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class GraphModel:
+    def __init__(self):
+        self.nodes: Dict[str, Hashable] = {}
+        self.names: Dict[Hashable, str] = {}
+        self.adj: Dict[Hashable, Dict[Hashable, Weight]] = {}
+        self.edge_count = 0
+        self.negative_edges = 0
+        self.version = 0
+        # сторона ConsistencyTracker, которой сообщается о каждой правке
+        self.consistency = None
+
+    def clear(self):
+        self.nodes.clear()
+        self.names.clear()
+        self.adj.clear()
+        self.edge_count = 0
+        self.negative_edges = 0
+        self.version += 1
+        if self.consistency is not None:
+            self.consistency.clear()
+
+    def node_count(self) -> int:
+        return len(self.adj)
+
+    def get(self, name: str) -> Optional[Hashable]:
+        return self.nodes.get(name)
+
+    def keys(self) -> List[Hashable]:
+        return list(self.adj.keys())
+
+    def add_node(self, key: Hashable, name: str):
+        self.nodes[name] = key
+        self.names[key] = name
+        self.adj[key] = {}
+        self.version += 1
+        if self.consistency is not None:
+            self.consistency.add_vertex()
+
+    def remove_node(self, key: Hashable):
+        for neighbor in list(self.adj.get(key, {})):
+            self.remove_edge(key, neighbor)
+        name = self.names.pop(key, None)
+        if self.nodes.get(name) is key:
+            del self.nodes[name]
+        if self.adj.pop(key, None) is not None and self.consistency is not None:
+            self.consistency.remove_vertex()
+        self.version += 1
+
+    def has_edge(self, u: Hashable, v: Hashable) -> bool:
+        return v in self.adj.get(u, {})
+
+    def add_edge(self, u: Hashable, v: Hashable, weight: Weight):
+        if self.has_edge(u, v):
+            self.negative_edges -= self.adj[u][v] < 0
+            if self.consistency is not None:
+                self.consistency.change_weight(self.adj[u][v], weight, 2)
+        else:
+            self.edge_count += 1
+            if self.consistency is not None:
+                self.consistency.add_arc(len(self.adj[u]), weight)
+                self.consistency.add_arc(len(self.adj[v]), weight)
+        self.negative_edges += weight < 0
+        self.adj[u][v] = weight
+        self.adj[v][u] = weight
+        self.version += 1
+
+    def remove_edge(self, u: Hashable, v: Hashable):
+        if self.has_edge(u, v):
+            self.negative_edges -= self.adj[u][v] < 0
+            if self.consistency is not None:
+                self.consistency.remove_arc(len(self.adj[u]), self.adj[u][v])
+                self.consistency.remove_arc(len(self.adj[v]), self.adj[u][v])
+            del self.adj[u][v]
+            del self.adj[v][u]
+            self.edge_count -= 1
+            self.version += 1
+
+    def set_weight(self, u: Hashable, v: Hashable, weight: Weight):
+        if self.has_edge(u, v) and self.adj[u][v] != weight:
+            self.negative_edges += (weight < 0) - (self.adj[u][v] < 0)
+            if self.consistency is not None:
+                self.consistency.change_weight(self.adj[u][v], weight, 2)
+            self.adj[u][v] = weight
+            self.adj[v][u] = weight
+            self.version += 1
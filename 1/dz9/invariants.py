@@ -0,0 +1,149 @@
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from canonical import find, union
+from compact_graph import CompactGraph
+
+Keys = List[tuple]
+
+WALK_LENGTHS = 3
+# столько путей длины 2 за раз перебирает triangle_counts
+TRIANGLE_CHUNK = 1 << 20
+SPECTRUM_LIMIT = 400
+SPECTRUM_TOLERANCE = 1e-6
+
+
+def components(graph: CompactGraph) -> List[List[int]]:
+    n = len(graph)
+    parent = list(range(n))
+    for u in range(n):
+        for v in graph.indices[graph.indptr[u]:graph.indptr[u + 1]]:
+            union(parent, u, v)
+    groups: Dict[int, List[int]] = {}
+    for u in range(n):
+        groups.setdefault(find(parent, u), []).append(u)
+    return list(groups.values())
+
+
+def component_sizes(graph: CompactGraph) -> List[int]:
+    sizes = [0] * len(graph)
+    for comp in components(graph):
+        for u in comp:
+            sizes[u] = len(comp)
+    return sizes
+
+
+def _arrays(graph: CompactGraph):
+    indptr = np.asarray(graph.indptr, dtype=np.int64)
+    indices = np.asarray(graph.indices, dtype=np.int64)
+    weights = np.asarray(graph.weights, dtype=float)
+    return indptr, indices, weights
+
+
+def walk_counts(graph: CompactGraph) -> "np.ndarray":
+    # число маршрутов длины k из каждой вершины, A^k * 1 через CSR
+    n = len(graph)
+    indptr, indices, _ = _arrays(graph)
+    counts = np.empty((WALK_LENGTHS, n), dtype=np.int64)
+    walks = np.ones(n, dtype=np.int64)
+    nonempty = indptr[:-1] < indptr[1:]
+    for k in range(WALK_LENGTHS):
+        step = np.zeros(n, dtype=np.int64)
+        if len(indices):
+            step[nonempty] = np.add.reduceat(walks[indices], indptr[:-1][nonempty])
+        walks = step
+        counts[k] = walks
+    return counts
+
+
+def triangle_counts(graph: CompactGraph) -> "np.ndarray":
+    # (A * A^2) * 1 по CSR: для каждой дуги u -> v число путей u -> w -> v,
+    # найденных двоичным поиском среди отсортированных дуг; плотное произведение -
+    # только когда таких путей больше, чем клеток матрицы
+    n = len(graph)
+    indptr, indices, weights = _arrays(graph)
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    nonzero = weights != 0
+    rows, indices = rows[nonzero], indices[nonzero]
+    indptr = np.searchsorted(rows, np.arange(n + 1))
+    lengths = indptr[indices + 1] - indptr[indices]
+    ends = np.cumsum(lengths)
+    if len(ends) and ends[-1] > n * n:
+        binary = (dense(graph) != 0).astype(float)
+        return np.rint((binary * (binary @ binary)).sum(axis=1)).astype(np.int64)
+    codes = np.sort(rows * n + indices)
+    counts = np.zeros(n, dtype=np.int64)
+    start = 0
+    while start < len(rows):
+        stop = max(int(np.searchsorted(ends, ends[start] - lengths[start] + TRIANGLE_CHUNK, side="right")),
+                   start + 1)
+        first, middle, paths = rows[start:stop], indices[start:stop], lengths[start:stop]
+        total = int(paths.sum())
+        if total:
+            first = np.repeat(first, paths)
+            offsets = np.repeat(indptr[middle] - (np.cumsum(paths) - paths), paths) + np.arange(total)
+            path_codes = first * n + indices[offsets]
+            pos = np.minimum(np.searchsorted(codes, path_codes), len(codes) - 1)
+            counts += np.bincount(first[codes[pos] == path_codes], minlength=n)
+        start = stop
+    return counts
+
+
+def dense(graph: CompactGraph) -> "np.ndarray":
+    n = len(graph)
+    indptr, indices, weights = _arrays(graph)
+    matrix = np.zeros((n, n))
+    matrix[np.repeat(np.arange(n), np.diff(indptr)), indices] = weights
+    return matrix
+
+
+def vertex_keys(graph: CompactGraph) -> Keys:
+    n = len(graph)
+    weight_sets = [tuple(sorted(graph.weights[graph.indptr[u]:graph.indptr[u + 1]])) for u in range(n)]
+    components = component_sizes(graph)
+    if np is None:
+        return [((len(ws),), 0, ws, c) for ws, c in zip(weight_sets, components)]
+
+    columns = [walk_counts(graph).T.tolist(), triangle_counts(graph).tolist()]
+    return [(tuple(walks), tri, ws, c) for walks, tri, ws, c in zip(*columns, weight_sets, components)]
+
+
+def spectrum(graph: CompactGraph) -> Optional["np.ndarray"]:
+    if np is None or len(graph) > SPECTRUM_LIMIT:
+        return None
+    matrix = dense(graph)
+    if not np.array_equal(matrix, matrix.T):
+        return None
+    return np.linalg.eigvalsh(matrix)
+
+
+def compare(g: CompactGraph, m: CompactGraph) -> Tuple[Optional[str], Optional[Tuple[Keys, Keys]]]:
+    if len(g) != len(m):
+        return "node count", None
+    if g.arc_count != m.arc_count:
+        return "edge count", None
+    g_keys, m_keys = vertex_keys(g), vertex_keys(m)
+    g_count, m_count = Counter(g_keys), Counter(m_keys)
+    if g_count != m_count:
+        for name, pos in (("walk counts", 0), ("triangle counts", 1), ("weight multisets", 2),
+                          ("component sizes", 3)):
+            if Counter(k[pos] for k in g_keys) != Counter(k[pos] for k in m_keys):
+                return name, None
+        return "vertex invariants", None
+
+    if spectra_differ(g, m):
+        return "spectrum", None
+    return None, (g_keys, m_keys)
+
+
+def spectra_differ(g: CompactGraph, m: CompactGraph) -> bool:
+    g_spec, m_spec = spectrum(g), spectrum(m)
+    if g_spec is None or m_spec is None:
+        return False
+    scale = max(1.0, float(np.abs(g_spec).max(initial=0)))
+    return not np.allclose(g_spec, m_spec, atol=SPECTRUM_TOLERANCE * scale, rtol=0)
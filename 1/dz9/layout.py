@@ -0,0 +1,148 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+BARNES_HUT_THRESHOLD = 300
+BARNES_HUT_THETA = 0.8
+LAYOUT_ITERATIONS = 200
+FINAL_TEMPERATURE = 0.01
+# притяжение к центру, при котором n вершин занимают круг диаметра spacing * sqrt(n)
+GRAVITY = 4.0
+MIN_DISTANCE2 = 1e-4
+# глубже квадродерево не делится: вершины в одном листе почти совпадают,
+# и их отталкивание всё равно ограничено MIN_DISTANCE2
+MAX_TREE_DEPTH = 24
+
+
+def repulsion_exact(pos: np.ndarray, k2: float) -> np.ndarray:
+    delta = pos[:, None, :] - pos[None, :, :]
+    dist2 = np.maximum((delta ** 2).sum(axis=2), MIN_DISTANCE2)
+    np.fill_diagonal(dist2, np.inf)
+    return (delta * (k2 / dist2)[:, :, None]).sum(axis=1)
+
+
+def repulsion_barnes_hut(pos: np.ndarray, k2: float, theta: float = BARNES_HUT_THETA) -> np.ndarray:
+    # квадродерево строится по уровням регулярной сетки 2^L x 2^L, пока в каждом листе
+    # не останется по одной вершине: иначе соседи по плотному листу отталкивались бы
+    # от общего центра масс; обход ведётся сразу для всех вершин парами (вершина, клетка)
+    n = len(pos)
+    lo = pos.min(axis=0)
+    span = max(float((pos.max(axis=0) - lo).max()), 1e-9) * (1 + 1e-9)
+    levels = []
+    for depth in range(MAX_TREE_DEPTH + 1):
+        side = 1 << depth
+        cell = np.minimum(((pos - lo) / span * side).astype(np.int64), side - 1)
+        ids = cell[:, 0] * side + cell[:, 1]
+        uniq, inverse = np.unique(ids, return_inverse=True)
+        mass = np.bincount(inverse).astype(float)
+        com = np.stack([np.bincount(inverse, pos[:, 0]), np.bincount(inverse, pos[:, 1])], axis=1) / mass[:, None]
+        levels.append((uniq, mass, com, ids))
+        if depth >= 1 and mass.max() <= 1:
+            break
+
+    force = np.zeros_like(pos)
+    nodes = np.arange(n)
+    cells = np.zeros(n, dtype=np.int64)
+    for level in range(depth + 1):
+        uniq, mass, com, ids = levels[level]
+        cell_mass = mass[cells]
+        centers = com[cells]
+        own = ids[nodes] == uniq[cells]
+        if level == depth:
+            # в листе, где лежит сама вершина, её вклад вычитается из центра масс
+            rest = cell_mass - own
+            keep = rest > 0
+            centers = np.where(own[:, None], (centers * cell_mass[:, None] - pos[nodes]) / np.maximum(rest, 1)[:, None],
+                               centers)
+            nodes, centers, cell_mass = nodes[keep], centers[keep], rest[keep]
+            accept = np.ones(len(nodes), dtype=bool)
+        else:
+            size = span / (1 << level)
+            dist2 = ((pos[nodes] - centers) ** 2).sum(axis=1)
+            accept = ~own & (size * size < theta * theta * dist2)
+
+        delta = pos[nodes[accept]] - centers[accept]
+        dist2 = np.maximum((delta ** 2).sum(axis=1), MIN_DISTANCE2)
+        scale = k2 * cell_mass[accept] / dist2
+        force[:, 0] += np.bincount(nodes[accept], delta[:, 0] * scale, minlength=n)
+        force[:, 1] += np.bincount(nodes[accept], delta[:, 1] * scale, minlength=n)
+        if level == depth:
+            break
+
+        nodes, parents = nodes[~accept], uniq[cells[~accept]]
+        side = 1 << level
+        px, py = parents // side, parents % side
+        child_uniq = levels[level + 1][0]
+        next_nodes, next_cells = [], []
+        for dx in (0, 1):
+            for dy in (0, 1):
+                child = (2 * px + dx) * (2 * side) + (2 * py + dy)
+                idx = np.searchsorted(child_uniq, child)
+                idx_safe = np.minimum(idx, len(child_uniq) - 1)
+                exists = child_uniq[idx_safe] == child
+                next_nodes.append(nodes[exists])
+                next_cells.append(idx_safe[exists])
+        nodes = np.concatenate(next_nodes)
+        cells = np.concatenate(next_cells)
+    return force
+
+
+class ForceLayout:
+    def __init__(self, positions: np.ndarray, edges: np.ndarray, spacing: float,
+                 iterations: int = LAYOUT_ITERATIONS, seed: Optional[int] = None):
+        n = len(positions)
+        self.edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        self.k = spacing
+        self.width = spacing * math.sqrt(max(n, 1))
+        rng = np.random.default_rng(seed)
+        pos = np.asarray(positions, dtype=float).reshape(n, 2)
+        lo = pos.min(axis=0) if n else np.zeros(2)
+        extent = float((pos.max(axis=0) - lo).max()) if n else 0.0
+        if extent < 1e-9:
+            pos = rng.random((n, 2)) * self.width
+        else:
+            pos = (pos - lo) / extent * self.width
+        self.positions = pos
+        self.origin = lo
+        self.temperature = self.width / 10
+        self.cooling = FINAL_TEMPERATURE ** (1 / max(iterations, 1))
+        self.remaining = iterations if n > 1 else 0
+
+    @property
+    def done(self) -> bool:
+        return self.remaining <= 0
+
+    def step(self):
+        if self.done:
+            return
+        pos = self.positions
+        k2 = self.k * self.k
+        if len(pos) > BARNES_HUT_THRESHOLD:
+            force = repulsion_barnes_hut(pos, k2)
+        else:
+            force = repulsion_exact(pos, k2)
+        if len(self.edges):
+            u, v = self.edges[:, 0], self.edges[:, 1]
+            delta = pos[u] - pos[v]
+            pull = delta * (np.sqrt((delta ** 2).sum(axis=1)) / self.k)[:, None]
+            n = len(pos)
+            for axis in (0, 1):
+                force[:, axis] -= np.bincount(u, pull[:, axis], minlength=n)
+                force[:, axis] += np.bincount(v, pull[:, axis], minlength=n)
+        force -= GRAVITY * (pos - pos.mean(axis=0))
+        length = np.maximum(np.sqrt((force ** 2).sum(axis=1)), 1e-9)
+        pos += force * (np.minimum(length, self.temperature) / length)[:, None]
+        self.temperature *= self.cooling
+        self.remaining -= 1
+
+    def scene_positions(self, origin: Optional[np.ndarray] = None) -> np.ndarray:
+        return self.positions + (self.origin if origin is None else origin)
+
+
+def force_layout(n: int, edges: np.ndarray, spacing: float, iterations: int = LAYOUT_ITERATIONS,
+                 seed: Optional[int] = None) -> np.ndarray:
+    layout = ForceLayout(np.zeros((n, 2)), edges, spacing, iterations, seed)
+    while not layout.done:
+        layout.step()
+    return layout.positions
@@ -1,24 +1,70 @@
+import cProfile
 import json
+import os
 import sys
-import itertools
+import time
+from contextlib import ExitStack, closing, contextmanager
 from typing import Optional, List, Dict
-from heapq import heappush, heappop
 
-from PySide6.QtCore import Qt, QRectF, QLineF, QPointF, Signal, QObject
+import numpy as np
+from PySide6.QtCore import (Qt, QRectF, QLineF, QPointF, Signal, QObject, QAbstractTableModel, QModelIndex,
+                            QRunnable, QThreadPool, QTimer)
 from PySide6.QtGui import QPen, QBrush, QColor, QPainterPathStroker, QAction, QFont, QPainter
 from PySide6.QtWidgets import (QApplication, QGraphicsView, QGraphicsScene,
                                QGraphicsItem, QGraphicsEllipseItem,
-                               QGraphicsLineItem, QGraphicsTextItem,
+                               QGraphicsLineItem, QGraphicsSimpleTextItem,
                                QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
-                               QTableWidget, QTableWidgetItem, QHeaderView,
+                               QTableView, QHeaderView,
                                QFileDialog, QMessageBox, QLabel, QPushButton, QInputDialog, QGroupBox,
-                               QComboBox)
+                               QComboBox, QSpinBox, QCheckBox, QDialog, QDialogButtonBox, QFormLayout,
+                               QLineEdit)
+
+import batch
+import exercise
+import graph_io
+import matcher
+import subgraph
+from layout import ForceLayout, force_layout
+from compact_graph import CompactGraph
+from consistency import ConsistencyTracker, Side
+from result_cache import ResultCache
+from graph_model import GraphModel, format_weight, parse_weight, to_number
+from spatial_index import SpatialGrid
+from shortest_paths import ALGORITHMS, NegativeCycle, PathService, STRATEGIES, shortest_path
 
 class GraphConfig:
     NODE_DIAMETER = 30
     NODE_RADIUS = NODE_DIAMETER / 2
     EDGE_WIDTH = 2
     MIN_DISTANCE = 50
+    # None - минимальный вес на пиксель по рёбрам, пересчитывается после правок графа или раскладки
+    ASTAR_WEIGHT_PER_PIXEL = None
+    # пути по таблице Floyd-Warshall (NumPy, до FLOYD_WARSHALL_LIMIT вершин) вместо деревьев Dijkstra
+    ALL_PAIRS_TABLE = False
+    SOLVER_TIME_LIMIT = 30
+    RESULT_CACHE_SIZE = 1024
+    ENUMERATION_SAMPLE = 100
+    # путь к SQLite-файлу для сохранения результатов между запусками, None - только в памяти
+    RESULT_CACHE_PATH = None
+    # ниже этого масштаба подписи не рисуются и отключается сглаживание
+    LOD_LABEL_SCALE = 0.5
+    ZOOM_MIN = 0.05
+    ZOOM_MAX = 8.0
+    ZOOM_STEP = 1.15
+    FRAME_INTERVAL_MS = 16
+    LAYOUT_SPACING = 80
+    # сколько миллисекунд кадра отдаётся на итерации раскладки
+    LAYOUT_FRAME_BUDGET_MS = 12
+    SCENE_MARGIN = 100
+    GENERATE_LAYOUT_ITERATIONS = 60
+    # больше этого раскладка импортированного графа - решётка, а не силовая
+    LAYOUT_NODE_LIMIT = 2000
+    # графы крупнее по умолчанию не рисуются, а идут прямо в решатель
+    SCENE_NODE_LIMIT = 5000
+    SCENE_EDGE_LIMIT = 20000
+    IMPORT_CHUNK_SIZE = 500
+    # матрица n x n больше этого не создаётся по числу вершин на сцене
+    MATRIX_SIZE_LIMIT = 2000
 
     COLOR_BG = QColor(40, 40, 40)
     COLOR_NODE = QColor(0, 200, 255)
@@ -32,51 +78,105 @@ class GraphConfig:
     TABLE_TEXT = QColor(255, 255, 255)
     TABLE_DIAGONAL = QColor(80, 80, 80)
 
+    COLOR_CONSISTENT = QColor(120, 200, 120)
+    COLOR_INCONSISTENT = QColor(255, 110, 110)
+
+_fonts: Dict[int, QFont] = {}
+
+
+def label_font(point_size: int) -> QFont:
+    font = _fonts.get(point_size)
+    if font is None:
+        font = QFont()
+        font.setBold(True)
+        if point_size:
+            font.setPointSize(point_size)
+        _fonts[point_size] = font
+    return font
+
+class LabelItem(QGraphicsSimpleTextItem):
+    def __init__(self, text: str, color: QColor, font: QFont, parent: QGraphicsItem):
+        super().__init__(text, parent)
+        self.setBrush(QBrush(color))
+        self.setFont(font)
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+
+    def paint(self, painter, option, widget=None):
+        if option.levelOfDetailFromTransform(painter.worldTransform()) < GraphConfig.LOD_LABEL_SCALE:
+            return
+        super().paint(painter, option, widget)
+
+class EdgeUpdater(QObject):
+    def __init__(self):
+        super().__init__()
+        self.dirty: set = set()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(GraphConfig.FRAME_INTERVAL_MS)
+        self.timer.timeout.connect(self.flush)
+
+    def schedule(self, edges: List["EdgeItem"]):
+        self.dirty.update(edges)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        dirty, self.dirty = self.dirty, set()
+        for edge in dirty:
+            if edge.scene() is not None:
+                edge.update_geometry()
+
 class EdgeItem(QGraphicsLineItem):
     def __init__(self, source_item, dest_item, weight: str = ""):
         super().__init__()
         self.source = source_item
         self.dest = dest_item
         self.weight = weight
+        self.weight_value = parse_weight(weight)
+        self.graph: Optional[GraphModel] = None
         self.is_path = False
+        self.hit_shape = None
 
         self.setPen(QPen(GraphConfig.COLOR_EDGE, GraphConfig.EDGE_WIDTH))
         self.setZValue(0)
 
-        self.text_item = QGraphicsTextItem(weight, self)
-        self.text_item.setDefaultTextColor(GraphConfig.COLOR_WEIGHT_TEXT)
-        font = QFont()
-        font.setBold(True)
-        font.setPointSize(10)
-        self.text_item.setFont(font)
+        self.text_item = LabelItem(weight, GraphConfig.COLOR_WEIGHT_TEXT, label_font(10), self)
 
         self.update_geometry()
 
     def set_weight(self, value: str):
         self.weight = value
-        self.text_item.setPlainText(value)
+        self.weight_value = parse_weight(value)
+        if self.graph is not None:
+            self.graph.set_weight(self.source, self.dest, self.weight_value)
+        self.text_item.setText(value)
         self.update_geometry()
 
     def update_geometry(self):
         line = QLineF(self.source.scenePos(), self.dest.scenePos())
         self.setLine(line)
+        self.hit_shape = None
 
-        if self.text_item.toPlainText():
+        if self.text_item.text():
             center = line.center()
-            self.text_item.setPos(center.x() - 10, center.y() - 20)
+            self.text_item.setPos(center.x() - 6, center.y() - 16)
         else:
             self.text_item.setPos(line.center())
 
     def shape(self):
-        path = super().shape()
-        stroker = QPainterPathStroker()
-        stroker.setWidth(15)
-        return stroker.createStroke(path)
+        if self.hit_shape is None:
+            stroker = QPainterPathStroker()
+            stroker.setWidth(15)
+            self.hit_shape = stroker.createStroke(super().shape())
+        return self.hit_shape
 
     def mouseDoubleClickEvent(self, event):
         text, ok = QInputDialog.getText(None, "Вес ребра", "Введите вес (число):", text=self.weight)
         if ok:
-            self.set_weight(text)
+            if text.strip() and to_number(text) is None:
+                QMessageBox.warning(None, "Error", f"Invalid weight: {text}")
+            else:
+                self.set_weight(text.strip())
         super().mouseDoubleClickEvent(event)
 
     def set_as_path(self, is_path: bool):
@@ -84,6 +184,7 @@ class EdgeItem(QGraphicsLineItem):
         color = GraphConfig.COLOR_PATH if is_path else GraphConfig.COLOR_EDGE
         width = GraphConfig.EDGE_WIDTH * 2 if is_path else GraphConfig.EDGE_WIDTH
         self.setPen(QPen(color, width))
+        self.hit_shape = None
 
 class NodeItem(QGraphicsEllipseItem):
     def __init__(self, name: str, x: float, y: float):
@@ -93,6 +194,8 @@ class NodeItem(QGraphicsEllipseItem):
         self.name = name
         self.mapped_id = None
         self.edges: List[EdgeItem] = []
+        self.index: Optional[SpatialGrid] = None
+        self.edge_updater: Optional[EdgeUpdater] = None
 
         self.setBrush(QBrush(GraphConfig.COLOR_NODE))
         self.setPen(QPen(Qt.NoPen))
@@ -100,31 +203,23 @@ class NodeItem(QGraphicsEllipseItem):
         self.setZValue(1)
         self.setFlag(QGraphicsItem.ItemIsMovable)
         self.setFlag(QGraphicsItem.ItemSendsGeometryChanges)
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
 
         self._create_labels()
 
     def _create_labels(self):
-        self.label = QGraphicsTextItem(self.name, self)
-        self.label.setDefaultTextColor(Qt.black)
-        font = QFont()
-        font.setBold(True)
-        self.label.setFont(font)
-        self.label.setPos(-6, -10)
+        self.label = LabelItem(self.name, Qt.black, label_font(0), self)
+        self.label.setPos(-2, -6)
 
-        self.match_label = QGraphicsTextItem("", self)
-        self.match_label.setDefaultTextColor(QColor(100, 255, 100))
-        f2 = QFont()
-        f2.setBold(True)
-        f2.setPointSize(12)
-        self.match_label.setFont(f2)
-        self.match_label.setPos(10, -25)
+        self.match_label = LabelItem("", QColor(100, 255, 100), label_font(12), self)
+        self.match_label.setPos(14, -21)
 
     def set_mapped_id(self, id_str: str):
         self.mapped_id = id_str
         if id_str:
-            self.match_label.setPlainText(f"[{id_str}]")
+            self.match_label.setText(f"[{id_str}]")
         else:
-            self.match_label.setPlainText("")
+            self.match_label.setText("")
 
     def set_highlighted(self, is_active: bool):
         color = GraphConfig.COLOR_NODE_ACTIVE if is_active else GraphConfig.COLOR_NODE
@@ -139,8 +234,14 @@ class NodeItem(QGraphicsEllipseItem):
 
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemPositionHasChanged and self.scene():
-            for edge in self.edges:
-                edge.update_geometry()
+            # при перетаскивании рёбра пересчитываются один раз за кадр
+            if self.edge_updater is not None:
+                self.edge_updater.schedule(self.edges)
+            else:
+                for edge in self.edges:
+                    edge.update_geometry()
+            if self.index is not None:
+                self.index.move(self, value.x(), value.y())
         return super().itemChange(change, value)
 
 class ChainBuilder:
@@ -162,139 +263,137 @@ class ChainBuilder:
 
 class GraphSolver:
     @staticmethod
-    def solve(graph_items: List[NodeItem], matrix_data: List[List[str]]) -> Dict[str, int]:
-        g_adj = {node.name: {} for node in graph_items}
-        for node in graph_items:
-            for edge in node.edges:
-                neighbor = edge.dest if edge.source == node else edge.source
-                weight = 1
-                if edge.weight.isdigit():
-                    weight = int(edge.weight)
-                elif edge.weight == "":
-                    weight = 1 
-                g_adj[node.name][neighbor.name] = weight
-
-        size = len(matrix_data)
-        m_adj = {i: {} for i in range(size)}
-        for r in range(size):
-            for c in range(size):
-                val_str = matrix_data[r][c]
-                if val_str and val_str.isdigit():
-                    val = int(val_str)
-                    if val > 0:
-                        m_adj[r][c] = val
-
-        graph_has_weights = any(any(w > 1 for w in neighs.values()) for neighs in g_adj.values())
-        if not graph_has_weights:
-            for r in m_adj:
-                for c in m_adj[r]:
-                    m_adj[r][c] = 1
-
-        g_degrees = {name: len(neighs) for name, neighs in g_adj.items()}
-        m_degrees = {idx: len(neighs) for idx, neighs in m_adj.items()}
-
-        if sorted(g_degrees.values()) != sorted(m_degrees.values()):
-            return None
-
-        node_names = list(g_adj.keys())
-        matrix_indices = list(m_adj.keys())
-
-        if len(node_names) != len(matrix_indices):
-            return None
-
-        g_by_deg = {}
-        for n, deg in g_degrees.items():
-            g_by_deg.setdefault(deg, []).append(n)
-
-        m_by_deg = {}
-        for idx, deg in m_degrees.items():
-            m_by_deg.setdefault(deg, []).append(idx)
-
-        for deg in g_by_deg:
-            if deg not in m_by_deg or len(g_by_deg[deg]) != len(m_by_deg[deg]):
-                return None
-
-        keys_sorted_by_deg = sorted(g_by_deg.keys())
-        groups = []
-        for deg in keys_sorted_by_deg:
-            groups.append((g_by_deg[deg], m_by_deg[deg]))
-
-        def solve_recursive(group_idx, current_mapping):
-            if group_idx == len(groups):
-                return check_isomorphism(current_mapping)
-
-            g_nodes, m_indices = groups[group_idx]
-            for p in itertools.permutations(m_indices):
-                new_mapping = current_mapping.copy()
-                for i, node_name in enumerate(g_nodes):
-                    new_mapping[node_name] = p[i]
-                if solve_recursive(group_idx + 1, new_mapping):
-                    return new_mapping
-            return None
-
-        def check_isomorphism(mapping):
-            for u_name, neighbors in g_adj.items():
-                u_idx = mapping[u_name]
-                for v_name, weight in neighbors.items():
-                    v_idx = mapping[v_name]
-                    if v_idx not in m_adj[u_idx]:
-                        return False
-                    mat_weight = m_adj[u_idx][v_idx]
-                    if weight != mat_weight:
-                        return False
-            return True
-
-        final_mapping = solve_recursive(0, {})
-        if final_mapping:
-            return {k: v + 1 for k, v in final_mapping.items()}
-        return None
+    def to_compact(graph: GraphModel) -> CompactGraph:
+        keys = graph.keys()
+        return CompactGraph.from_adjacency(graph.adj, keys, [graph.names[k] for k in keys])
 
     @staticmethod
-    def find_shortest_path(graph_items: List[NodeItem], start_node: NodeItem, end_node: NodeItem) -> Optional[List[NodeItem]]:
-        graph = {}
-        for node in graph_items:
-            graph[node] = {}
-            for edge in node.edges:
-                neighbor = edge.dest if edge.source == node else edge.source
-                weight = 1
-                if edge.weight.isdigit():
-                    weight = int(edge.weight)
-                if neighbor in graph[node]:
-                    graph[node][neighbor] = min(graph[node][neighbor], weight)
-                else:
-                    graph[node][neighbor] = weight
-
-        distances = {node: float('inf') for node in graph}
-        distances[start_node] = 0
-        previous_nodes = {node: None for node in graph}
-        pq = [(0, id(start_node), start_node)]
+    def solve(graph: GraphModel, matrix_data: np.ndarray,
+              stats: Optional[matcher.SearchStats] = None) -> Optional[Dict[str, int]]:
+        # синхронная обёртка над matcher.solve_graphs; окно решает через SolverWorker
+        with matcher.timed(stats, "total"):
+            return matcher.solve_graphs(GraphSolver.to_compact(graph), CompactGraph.from_matrix(matrix_data),
+                                        stats=stats)
 
-        while pq:
-            current_distance, _, current_node = heappop(pq)
-
-            if current_distance > distances[current_node]:
-                continue
-            
-            if current_node == end_node:
-                break
-
-            for neighbor, weight in graph[current_node].items():
-                distance = current_distance + weight
-                if distance < distances[neighbor]:
-                    distances[neighbor] = distance
-                    previous_nodes[neighbor] = current_node
-                    heappush(pq, (distance, id(neighbor), neighbor))
-
-        if distances[end_node] == float('inf'):
-            return None
+    @staticmethod
+    def find_shortest_path(graph: GraphModel, start_node: NodeItem, end_node: NodeItem) -> Optional[List[NodeItem]]:
+        return shortest_path(graph.adj, start_node, end_node)
+
+class SolverSignals(QObject):
+    progress = Signal(int, int)
+    stats = Signal(dict)
+    finished = Signal(object)
+    enumerated = Signal(int, bool, list)
+    failed = Signal(str)
+
+class SolverWorker(QRunnable):
+    def __init__(self, graph: CompactGraph, matrix: CompactGraph, timeout: Optional[float],
+                 cache: Optional[ResultCache] = None, enumerate_limit: int = 0, mode: str = "isomorphism",
+                 profile_path: Optional[str] = None):
+        super().__init__()
+        self.graph = graph
+        self.matrix = matrix
+        self.timeout = timeout
+        self.cache = cache
+        self.enumerate_limit = enumerate_limit
+        self.mode = mode
+        self.profile_path = profile_path
+        self.signals = SolverSignals()
+        self.stats = matcher.SearchStats(self.publish_stats)
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, expanded: int, depth: int):
+        if self.cancelled:
+            raise matcher.SearchCancelled()
+        self.signals.progress.emit(expanded, depth)
+
+    def publish_stats(self, stats: matcher.SearchStats):
+        self.signals.stats.emit(stats.as_dict())
+
+    def solve(self):
+        induced = self.mode == "induced"
+        if self.enumerate_limit:
+            if self.mode == "isomorphism":
+                return matcher.enumerate_matches(self.graph, self.matrix, self.enumerate_limit, self.timeout,
+                                                 self.report, self.stats)
+            return subgraph.enumerate_embeddings(self.graph, self.matrix, induced, self.enumerate_limit,
+                                                 self.timeout, self.report, self.stats)
+        if self.mode == "isomorphism":
+            return matcher.solve_graphs(self.graph, self.matrix, self.timeout, self.report, self.cache, self.stats)
+        return subgraph.solve_subgraph(self.graph, self.matrix, induced, self.timeout, self.report, self.stats)
+
+    def run(self):
+        # профилировщик включается в потоке пула, где и идёт поиск
+        profiler = cProfile.Profile() if self.profile_path else None
+        message = None
+        try:
+            with matcher.timed(self.stats, "total"):
+                result = self.solve() if profiler is None else profiler.runcall(self.solve)
+        except matcher.SearchCancelled:
+            message = "Search cancelled."
+        except matcher.SearchTimeout:
+            message = f"No result within {self.timeout:g} s."
+        except Exception as e:
+            message = str(e)
+        if profiler is not None:
+            try:
+                profiler.dump_stats(self.profile_path)
+            except OSError as e:
+                message = message or f"Cannot write profile: {e}"
+        self.publish_stats(self.stats)
+        if message is not None:
+            self.signals.failed.emit(message)
+        elif self.enumerate_limit:
+            self.signals.enumerated.emit(*result)
+        else:
+            self.signals.finished.emit(result)
 
-        path = []
-        current = end_node
-        while current:
-            path.append(current)
-            current = previous_nodes[current]
-        path.reverse()
-        return path
+class CompareWorker(QRunnable):
+    # target - граф либо список файлов-работ, которые сверяются с эталоном в пуле процессов
+    def __init__(self, reference: CompactGraph, target, timeout: Optional[float],
+                 cache: Optional[ResultCache] = None, mode: str = "isomorphism", part: str = "graph"):
+        super().__init__()
+        self.reference = reference
+        self.target = target
+        self.timeout = timeout
+        self.cache = cache
+        self.mode = mode
+        self.part = part
+        self.signals = SolverSignals()
+        # общий с процессами пула флаг отмены
+        self.cancelled = matcher.MP_CONTEXT.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def report(self, expanded: int, depth: int):
+        if self.cancelled.is_set():
+            raise matcher.SearchCancelled()
+
+    def run(self):
+        try:
+            if isinstance(self.target, CompactGraph):
+                result = batch.compare_graphs(self.reference, self.target, self.mode, self.timeout,
+                                              self.report, self.cache)
+            else:
+                result = []
+                with closing(batch.run_comparisons(self.reference, self.target, self.part, self.timeout,
+                                                   mode=self.mode, cancel=self.cancelled)) as results:
+                    for item in results:
+                        self.report(len(result), 0)
+                        result.append(item)
+                result.sort(key=lambda r: r["file"])
+        except matcher.SearchCancelled:
+            self.signals.failed.emit("Comparison cancelled.")
+        except matcher.SearchTimeout:
+            self.signals.failed.emit(f"No result within {self.timeout:g} s.")
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
 
 class GraphManager(QObject):
     node_count_changed = Signal(int)
@@ -303,11 +402,44 @@ class GraphManager(QObject):
         super().__init__()
         self.scene = scene
         self.node_counter = 0
+        self.graph = GraphModel()
+        self.index = SpatialGrid(GraphConfig.MIN_DISTANCE)
+        self.paths = PathService(self.graph, self.index, GraphConfig.ALL_PAIRS_TABLE)
+        self.path_edges: List[EdgeItem] = []
+        self.edge_updater = EdgeUpdater()
+        self.bulk_depth = 0
+        self.bulk_dirty = False
 
     def reset(self):
         self.node_counter = 0
+        self.graph.clear()
+        self.index.clear()
+        self.path_edges.clear()
+        self.edge_updater.dirty.clear()
         self.scene.clear()
-        self.node_count_changed.emit(0)
+        self.notify_node_count()
+
+    @contextmanager
+    def bulk_update(self):
+        self.bulk_depth += 1
+        if self.bulk_depth == 1:
+            self.bulk_dirty = False
+            self.index_method = self.scene.itemIndexMethod()
+            self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        try:
+            yield self
+        finally:
+            self.bulk_depth -= 1
+            if self.bulk_depth == 0:
+                self.scene.setItemIndexMethod(self.index_method)
+                if self.bulk_dirty:
+                    self.node_count_changed.emit(self.get_node_count())
+
+    def notify_node_count(self):
+        if self.bulk_depth:
+            self.bulk_dirty = True
+        else:
+            self.node_count_changed.emit(self.get_node_count())
 
     def generate_name(self) -> str:
         n = self.node_counter
@@ -324,60 +456,213 @@ class GraphManager(QObject):
         
         node = NodeItem(name, pos.x(), pos.y())
         self.scene.addItem(node)
-        self.node_count_changed.emit(self.get_node_count())
+        self.graph.add_node(node, name)
+        self.index.insert(node, pos.x(), pos.y())
+        node.index = self.index
+        node.edge_updater = self.edge_updater
+        self.notify_node_count()
         return node
 
     def create_edge(self, u: NodeItem, v: NodeItem, weight: str = ""):
-        if u == v: return
-        for edge in u.edges:
-            if (edge.source == u and edge.dest == v) or (edge.source == v and edge.dest == u):
-                return
+        if u == v or self.graph.has_edge(u, v): return
         edge = EdgeItem(u, v, weight)
         self.scene.addItem(edge)
         u.add_connection(edge)
         v.add_connection(edge)
+        edge.graph = self.graph
+        self.graph.add_edge(u, v, edge.weight_value)
 
     def delete_item(self, item: QGraphicsItem):
         if isinstance(item, NodeItem):
             for edge in list(item.edges):
                 self.delete_item(edge)
+            self.graph.remove_node(item)
+            self.index.remove(item)
+            item.index = None
+            item.edge_updater = None
             self.scene.removeItem(item)
-            self.node_count_changed.emit(self.get_node_count())
+            self.notify_node_count()
         elif isinstance(item, EdgeItem):
             item.source.remove_connection(item)
             item.dest.remove_connection(item)
+            item.graph = None
+            self.graph.remove_edge(item.source, item.dest)
+            if item in self.path_edges:
+                self.path_edges.remove(item)
             self.scene.removeItem(item)
-        elif isinstance(item, QGraphicsTextItem):
+        elif isinstance(item, LabelItem):
             parent = item.parentItem()
             if isinstance(parent, EdgeItem):
                 self.delete_item(parent)
 
     def get_node_count(self) -> int:
-        return sum(1 for item in self.scene.items() if isinstance(item, NodeItem))
+        return self.graph.node_count()
 
     def is_position_valid(self, pos: QPointF) -> bool:
-        for item in self.scene.items():
-            if isinstance(item, NodeItem):
-                distance = QLineF(pos, item.scenePos()).length()
-                if distance < GraphConfig.MIN_DISTANCE:
-                    return False
-        return True
+        return not self.index.any_within(pos.x(), pos.y(), GraphConfig.MIN_DISTANCE)
+
+    def node_at(self, pos: QPointF, radius: float = GraphConfig.NODE_RADIUS) -> Optional[NodeItem]:
+        return self.index.nearest(pos.x(), pos.y(), radius)
 
     def get_nodes(self) -> List[NodeItem]:
-        return [i for i in self.scene.items() if isinstance(i, NodeItem)]
+        return self.graph.keys()
+
+    def apply_positions(self, nodes: List[NodeItem], positions: np.ndarray):
+        for node, (x, y) in zip(nodes, positions.tolist()):
+            node.setPos(x, y)
+        self.fit_scene(positions)
+
+    def fit_scene(self, positions: np.ndarray):
+        if len(positions):
+            margin = GraphConfig.SCENE_MARGIN
+            lo, hi = positions.min(axis=0) - margin, positions.max(axis=0) + margin
+            bounds = QRectF(QPointF(*lo.tolist()), QPointF(*hi.tolist()))
+            self.scene.setSceneRect(self.scene.sceneRect().united(bounds))
+
+    def populate_chunk(self, graph: CompactGraph, positions: np.ndarray, nodes: List[NodeItem],
+                       start: int, limit: int) -> int:
+        # вершины, затем рёбра; возвращает позицию, с которой продолжать
+        n = len(graph)
+        end = min(start + limit, n + graph.arc_count)
+        for i in range(start, min(end, n)):
+            x, y = positions[i].tolist()
+            nodes.append(self.create_node(QPointF(x, y), graph.names[i]))
+        if end > n:
+            u = int(np.searchsorted(graph.indptr, max(start, n) - n, side='right')) - 1
+            for k in range(max(start, n) - n, end - n):
+                while graph.indptr[u + 1] <= k:
+                    u += 1
+                v = graph.indices[k]
+                if u < v:
+                    self.create_edge(nodes[u], nodes[v], format_weight(graph.weights[k]))
+        return end
+
+    def build_from_matrix(self, matrix: np.ndarray, positions: np.ndarray) -> List[NodeItem]:
+        linked = (matrix != 0) | (matrix.T != 0)
+        rows, cols = np.nonzero(np.triu(linked, 1))
+        # несимметричная матрица: из двух ненулевых направлений берётся большее по значению
+        # (не по модулю: из -3 и 2 - 2, из -3 и -1 - -1), пустое направление не учитывается
+        upper, lower = matrix[rows, cols], matrix[cols, rows]
+        weights = np.where(upper == 0, lower, np.where(lower == 0, upper, np.maximum(upper, lower)))
+        with self.bulk_update():
+            self.reset()
+            nodes = [self.create_node(QPointF(x, y)) for x, y in positions.tolist()]
+            for u, v, w in zip(rows.tolist(), cols.tolist(), weights.tolist()):
+                self.create_edge(nodes[u], nodes[v], format_weight(w))
+        self.fit_scene(positions)
+        return nodes
 
     def reset_edge_styles(self):
-        for item in self.scene.items():
-            if isinstance(item, EdgeItem):
-                item.set_as_path(False)
+        for edge in self.path_edges:
+            edge.set_as_path(False)
+        self.path_edges.clear()
+
+    def highlight_path(self, path: List[NodeItem]):
+        for i in range(len(path) - 1):
+            u = path[i]
+            v = path[i + 1]
+            for edge in u.edges:
+                if edge.dest == v or edge.source == v:
+                    edge.set_as_path(True)
+                    self.path_edges.append(edge)
+                    break
+
+class WeightMatrixModel(QAbstractTableModel):
+    def __init__(self):
+        super().__init__()
+        self.matrix = np.zeros((0, 0))
+        # row_degrees[r] - ненулевые клетки строки r, чтобы правка стоила O(1)
+        self.row_degrees: List[int] = []
+        self.consistency: Optional[Side] = None
+        self.diagonal_brush = QBrush(GraphConfig.TABLE_DIAGONAL)
+        self.cell_brush = QBrush(GraphConfig.TABLE_BG)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.matrix.shape[0]
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.matrix.shape[1]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        r, c = index.row(), index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            val = self.matrix[r, c]
+            return format_weight(val) if val else ""
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role == Qt.BackgroundRole:
+            return self.diagonal_brush if r == c else self.cell_brush
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            return str(section + 1)
+        return None
 
-class WeightMatrixWidget(QTableWidget):
+    def flags(self, index):
+        if index.row() == index.column():
+            return Qt.ItemIsEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        text = str(value).strip()
+        number = to_number(text) if text else 0
+        if number is None:
+            return False
+        self.set_value(index.row(), index.column(), number)
+        return True
+
+    def set_value(self, row: int, col: int, value: float):
+        if row == col:
+            return
+        for r, c in ((row, col), (col, row)):
+            old = self.matrix[r, c]
+            if old == value:
+                continue
+            if self.consistency is not None:
+                if not old:
+                    self.consistency.add_arc(self.row_degrees[r], value)
+                elif not value:
+                    self.consistency.remove_arc(self.row_degrees[r], old.item())
+                else:
+                    self.consistency.change_weight(old.item(), value)
+            self.row_degrees[r] += (not old) - (not value)
+            self.matrix[r, c] = value
+        self.dataChanged.emit(self.index(row, col), self.index(row, col))
+        self.dataChanged.emit(self.index(col, row), self.index(col, row))
+
+    def resize(self, size: int):
+        old = self.matrix
+        keep = min(size, old.shape[0])
+        self.beginResetModel()
+        self.matrix = np.zeros((size, size))
+        self.matrix[:keep, :keep] = old[:keep, :keep]
+        self.reload_counts()
+        self.endResetModel()
+
+    def set_matrix(self, matrix: np.ndarray):
+        self.beginResetModel()
+        self.matrix = matrix
+        self.reload_counts()
+        self.endResetModel()
+
+    def reload_counts(self):
+        nonzero = self.matrix != 0
+        self.row_degrees = nonzero.sum(axis=1).tolist()
+        if self.consistency is not None:
+            self.consistency.load(self.row_degrees, self.matrix[nonzero].tolist())
+
+class WeightMatrixWidget(QTableView):
     def __init__(self):
         super().__init__()
-        self.setColumnCount(0)
-        self.setRowCount(0)
+        self.matrix_model = WeightMatrixModel()
+        self.setModel(self.matrix_model)
         self.setStyleSheet(f"""
-            QTableWidget {{
+            QTableView {{
                 background-color: {GraphConfig.TABLE_BG.name()};
                 color: {GraphConfig.TABLE_TEXT.name()};
                 gridline-color: #666;
@@ -391,70 +676,105 @@ class WeightMatrixWidget(QTableWidget):
             QLineEdit {{ color: white; background-color: #444; }}
             QTableCornerButton::section {{ background-color: #333; }}
         """)
-        self.itemChanged.connect(self.on_item_changed)
         self.horizontalHeader().setDefaultSectionSize(40)
         self.verticalHeader().setDefaultSectionSize(30)
 
     def update_size(self, node_count: int):
-        old_data = self.get_data()
-        self.setRowCount(node_count)
-        self.setColumnCount(node_count)
-        headers = [str(i + 1) for i in range(node_count)]
-        self.setHorizontalHeaderLabels(headers)
-        self.setVerticalHeaderLabels(headers)
-
-        self.blockSignals(True)
-        for r in range(node_count):
-            for c in range(node_count):
-                text = ""
-                if r < len(old_data) and c < len(old_data[r]):
-                    text = old_data[r][c]
-                item = QTableWidgetItem(text)
-                item.setTextAlignment(Qt.AlignCenter)
-                if r == c:
-                    item.setFlags(Qt.ItemIsEnabled)
-                    item.setBackground(QBrush(GraphConfig.TABLE_DIAGONAL))
-                else:
-                    item.setBackground(QBrush(GraphConfig.TABLE_BG))
-                self.setItem(r, c, item)
-        self.blockSignals(False)
-
-    def on_item_changed(self, item):
-        row, col = item.row(), item.column()
-        if row == col: return
-        text = item.text()
-        if text and not text.isdigit():
-            item.setText("")
-            return
-        self.blockSignals(True)
-        sym_item = self.item(col, row)
-        if sym_item:
-            sym_item.setText(text)
-        self.blockSignals(False)
+        self.matrix_model.resize(node_count)
+
+    def get_matrix(self) -> np.ndarray:
+        return self.matrix_model.matrix
 
     def get_data(self) -> List[List[str]]:
-        rows = self.rowCount()
-        data = []
-        for r in range(rows):
-            row_data = []
-            for c in range(rows):
-                item = self.item(r, c)
-                row_data.append(item.text() if item else "")
-            data.append(row_data)
-        return data
+        return [[format_weight(v) if v else "" for v in row] for row in self.matrix_model.matrix.tolist()]
 
     def set_data(self, data: List[List[str]]):
         size = len(data)
-        self.update_size(size)
-        self.blockSignals(True)
-        for r in range(size):
-            for c in range(size):
-                if r < len(data) and c < len(data[r]):
-                    val = data[r][c]
-                    item = self.item(r, c)
-                    if item:
-                        item.setText(val)
-        self.blockSignals(False)
+        matrix = np.zeros((size, size))
+        for r, row in enumerate(data):
+            values = [to_number(str(v)) or 0 for v in row[:size]]
+            matrix[r, :len(values)] = values
+        self.matrix_model.set_matrix(matrix)
+
+class SourcePicker(QWidget):
+    SOURCES = {"scene": "Scene graph", "matrix": "Weight matrix", "file": "File", "folder": "Folder of submissions"}
+
+    def __init__(self, kinds: List[str], default: str):
+        super().__init__()
+        self.kind_combo = QComboBox()
+        for kind in kinds:
+            self.kind_combo.addItem(self.SOURCES[kind], kind)
+        self.kind_combo.setCurrentIndex(kinds.index(default))
+        self.path_edit = QLineEdit()
+        self.path_edit.setPlaceholderText("task.json#matrix, graph.graphml, ...")
+        self.browse_btn = QPushButton("Browse...")
+        self.browse_btn.clicked.connect(self.browse)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.kind_combo)
+        layout.addWidget(self.path_edit, 1)
+        layout.addWidget(self.browse_btn)
+        self.kind_combo.currentIndexChanged.connect(self.update_path_enabled)
+        self.update_path_enabled()
+
+    def kind(self) -> str:
+        return self.kind_combo.currentData()
+
+    def path(self) -> str:
+        return self.path_edit.text().strip()
+
+    def update_path_enabled(self):
+        needs_path = self.kind() in ("file", "folder")
+        self.path_edit.setEnabled(needs_path)
+        self.browse_btn.setEnabled(needs_path)
+
+    def browse(self):
+        if self.kind() == "folder":
+            path = QFileDialog.getExistingDirectory(self, "Submissions Folder")
+        else:
+            filters = exercise.FILE_FILTER + ";;" + ";;".join(graph_io.FORMATS.values())
+            path, _ = QFileDialog.getOpenFileName(self, "Graph Source", "", filters)
+        if path:
+            self.path_edit.setText(path)
+
+class CompareDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Compare Graphs")
+        self.reference = SourcePicker(["scene", "matrix", "file"], "scene")
+        self.target = SourcePicker(["scene", "matrix", "file", "folder"], "file")
+        self.part_combo = QComboBox()
+        self.part_combo.addItem("Drawn graph", "graph")
+        self.part_combo.addItem("Matrix", "matrix")
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout = QFormLayout(self)
+        layout.addRow("Reference:", self.reference)
+        layout.addRow("Compare with:", self.target)
+        layout.addRow("Exercise part:", self.part_combo)
+        layout.addRow(buttons)
+        self.resize(560, self.sizeHint().height())
+
+class GraphView(QGraphicsView):
+    def __init__(self, scene: QGraphicsScene):
+        super().__init__(scene)
+        self.setRenderHint(QPainter.Antialiasing)
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+
+    def zoom(self) -> float:
+        return self.transform().m11()
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if not steps:
+            return super().wheelEvent(event)
+        current = self.zoom()
+        target = min(max(current * GraphConfig.ZOOM_STEP ** steps, GraphConfig.ZOOM_MIN), GraphConfig.ZOOM_MAX)
+        self.scale(target / current, target / current)
+        self.setRenderHint(QPainter.Antialiasing, target >= GraphConfig.LOD_LABEL_SCALE)
+        event.accept()
 
 class GraphScene(QGraphicsScene):
     def __init__(self, manager: GraphManager, parent=None):
@@ -470,13 +790,20 @@ class GraphScene(QGraphicsScene):
         super().keyReleaseEvent(event)
 
     def mousePressEvent(self, event):
+        # импорт по частям держит bulk_update между тиками и ссылается на уже созданные
+        # вершины, поэтому до его конца граф на сцене не правится
+        if self.manager.bulk_depth:
+            event.accept()
+            return
         pos = event.scenePos()
         item = self.itemAt(pos, self.views()[0].transform())
-        if isinstance(item, QGraphicsTextItem):
+        if isinstance(item, LabelItem):
             item = item.parentItem()
 
         if event.button() == Qt.LeftButton:
             if event.modifiers() & Qt.ShiftModifier:
+                if not isinstance(item, NodeItem):
+                    item = self.manager.node_at(pos) or item
                 if isinstance(item, NodeItem):
                     prev_node = self.chain_builder.start_or_continue(item)
                     if prev_node:
@@ -512,12 +839,22 @@ class MainWindow(QMainWindow):
         self.scene = GraphScene(self.graph_manager, self)
         self.graph_manager.scene = self.scene
 
-        self.view = QGraphicsView(self.scene)
-        self.view.setRenderHint(QPainter.Antialiasing)
-        self.view.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.view = GraphView(self.scene)
 
         self.matrix_widget = WeightMatrixWidget()
-        self.graph_manager.node_count_changed.connect(self.matrix_widget.update_size)
+        self.graph_manager.node_count_changed.connect(self.on_node_count_changed)
+
+        # инварианты рисунка и матрицы пересчитываются при каждой правке, а надпись -
+        # не чаще раза за проход цикла событий
+        self.consistency = ConsistencyTracker(lambda: QTimer.singleShot(0, self.update_consistency))
+        self.graph_manager.graph.consistency = self.consistency.scene
+        self.matrix_widget.matrix_model.consistency = self.consistency.matrix
+
+        # в режимах подграфа размер матрицы не привязан к числу вершин на рисунке
+        self.matrix_size_spin = QSpinBox()
+        self.matrix_size_spin.setRange(0, GraphConfig.MATRIX_SIZE_LIMIT)
+        self.matrix_size_spin.setEnabled(False)
+        self.matrix_size_spin.valueChanged.connect(self.matrix_widget.update_size)
 
         central_widget = QWidget()
         main_layout = QHBoxLayout(central_widget)
@@ -526,6 +863,10 @@ class MainWindow(QMainWindow):
         table_group = QGroupBox("Adjacency Matrix")
         table_layout = QVBoxLayout()
         table_layout.addWidget(self.matrix_widget)
+        h_size = QHBoxLayout()
+        h_size.addWidget(QLabel("Size:"))
+        h_size.addWidget(self.matrix_size_spin)
+        table_layout.addLayout(h_size)
         table_group.setLayout(table_layout)
 
         ctrl_group = QGroupBox("Tools")
@@ -536,8 +877,15 @@ class MainWindow(QMainWindow):
         self.start_node_combo.addItem("None")
         self.end_node_combo.addItem("None")
         
+        self.strategy_combo = QComboBox()
+        for key, title in STRATEGIES.items():
+            self.strategy_combo.addItem(title, key)
+        self.search_stats_label = QLabel("")
+        self.search_stats_label.setStyleSheet("color: #aaa; font-size: 11px;")
+
         self.start_node_combo.currentIndexChanged.connect(self.update_pathfinding)
         self.end_node_combo.currentIndexChanged.connect(self.update_pathfinding)
+        self.strategy_combo.currentIndexChanged.connect(self.update_pathfinding)
         self.graph_manager.node_count_changed.connect(self.update_combobox_items)
 
         path_layout = QVBoxLayout()
@@ -548,6 +896,11 @@ class MainWindow(QMainWindow):
         h_combo.addWidget(QLabel("End:"))
         h_combo.addWidget(self.end_node_combo)
         path_layout.addLayout(h_combo)
+        h_strategy = QHBoxLayout()
+        h_strategy.addWidget(QLabel("Search:"))
+        h_strategy.addWidget(self.strategy_combo)
+        path_layout.addLayout(h_strategy)
+        path_layout.addWidget(self.search_stats_label)
         ctrl_layout.addLayout(path_layout)
         
         ctrl_layout.addSpacing(10)
@@ -556,6 +909,35 @@ class MainWindow(QMainWindow):
         self.btn_solve.setStyleSheet("background-color: #2a82da; color: white; font-weight: bold; padding: 8px;")
         self.btn_solve.clicked.connect(self.run_solver)
 
+        self.time_limit_spin = QSpinBox()
+        self.time_limit_spin.setRange(0, 3600)
+        self.time_limit_spin.setSuffix(" s")
+        self.time_limit_spin.setSpecialValueText("No limit")
+        self.time_limit_spin.setValue(GraphConfig.SOLVER_TIME_LIMIT)
+
+        self.enumerate_check = QCheckBox("Find all labelings")
+
+        self.mode_combo = QComboBox()
+        for key, title in subgraph.MODES.items():
+            self.mode_combo.addItem(title, key)
+        self.mode_combo.currentIndexChanged.connect(self.on_mode_changed)
+
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.cancel_solver)
+
+        self.solver_status = QLabel("")
+        self.consistency_label = QLabel("")
+        self.consistency_label.setWordWrap(True)
+        self.data_graph: Optional[CompactGraph] = None
+        self.data_graph_label = QLabel("")
+        self.data_graph_label.setStyleSheet("color: #aaa; font-size: 11px;")
+        self.data_graph_label.setWordWrap(True)
+        self.solver_status.setStyleSheet("color: #aaa; font-size: 11px;")
+        self.solver_worker: Optional[SolverWorker] = None
+        self.compare_worker: Optional[CompareWorker] = None
+        self.result_cache = ResultCache(GraphConfig.RESULT_CACHE_SIZE, GraphConfig.RESULT_CACHE_PATH)
+
         self.btn_clear_res = QPushButton("Clear Results")
         self.btn_clear_res.clicked.connect(self.clear_results)
 
@@ -567,6 +949,20 @@ class MainWindow(QMainWindow):
         help_lbl.setStyleSheet("color: #aaa; font-size: 11px;")
 
         ctrl_layout.addWidget(self.btn_solve)
+        h_solver = QHBoxLayout()
+        h_solver.addWidget(QLabel("Time limit:"))
+        h_solver.addWidget(self.time_limit_spin)
+        h_solver.addWidget(self.btn_cancel)
+        ctrl_layout.addLayout(h_solver)
+        h_mode = QHBoxLayout()
+        h_mode.addWidget(QLabel("Mode:"))
+        h_mode.addWidget(self.mode_combo)
+        ctrl_layout.addLayout(h_mode)
+        ctrl_layout.addWidget(self.enumerate_check)
+        ctrl_layout.addWidget(self.solver_status)
+        ctrl_layout.addWidget(self.consistency_label)
+        self.update_consistency()
+        ctrl_layout.addWidget(self.data_graph_label)
         ctrl_layout.addWidget(self.btn_clear_res)
         ctrl_layout.addWidget(self.btn_clear_weights)
         ctrl_layout.addWidget(help_lbl)
@@ -583,6 +979,17 @@ class MainWindow(QMainWindow):
         main_layout.addLayout(right_layout, 3)
 
         self.setCentralWidget(central_widget)
+        self.stats_label = QLabel("")
+        self.stats_label.setStyleSheet("color: #aaa; font-size: 11px;")
+        self.statusBar().addPermanentWidget(self.stats_label)
+        self.force_layout: Optional[ForceLayout] = None
+        self.layout_nodes: List[NodeItem] = []
+        self.layout_timer = QTimer(self)
+        self.layout_timer.setInterval(GraphConfig.FRAME_INTERVAL_MS)
+        self.layout_timer.timeout.connect(self.layout_tick)
+        self.import_job = None
+        self.import_timer = QTimer(self)
+        self.import_timer.timeout.connect(self.import_tick)
         self.create_menu()
 
     def create_menu(self):
@@ -594,13 +1001,33 @@ class MainWindow(QMainWindow):
         load_action = QAction("Load JSON...", self)
         load_action.triggered.connect(self.load_exercise)
         file_menu.addAction(load_action)
+        import_action = QAction("Import Graph...", self)
+        import_action.triggered.connect(self.import_graph)
+        file_menu.addAction(import_action)
+        export_action = QAction("Export Graph...", self)
+        export_action.triggered.connect(self.export_graph)
+        file_menu.addAction(export_action)
+        profile_action = QAction("Profile Solver Run...", self)
+        profile_action.triggered.connect(self.profile_solver)
+        file_menu.addAction(profile_action)
         clear_action = QAction("Clear All", self)
         clear_action.triggered.connect(self.clear_all)
         file_menu.addAction(clear_action)
 
+        graph_menu = menu.addMenu("Graph")
+        graph_menu.aboutToShow.connect(self.update_graph_menu)
+        self.layout_action = QAction("Auto Layout", self)
+        self.layout_action.triggered.connect(self.toggle_layout)
+        graph_menu.addAction(self.layout_action)
+        generate_action = QAction("Generate Graph from Matrix", self)
+        generate_action.triggered.connect(self.generate_from_matrix)
+        graph_menu.addAction(generate_action)
+        compare_action = QAction("Compare Graphs...", self)
+        compare_action.triggered.connect(self.compare_sources)
+        graph_menu.addAction(compare_action)
+
     def update_combobox_items(self):
-        nodes = self.graph_manager.get_nodes()
-        names = sorted([n.name for n in nodes])
+        names = sorted(self.graph_manager.graph.nodes)
         
         cur_start = self.start_node_combo.currentText()
         cur_end = self.end_node_combo.currentText()
@@ -628,45 +1055,240 @@ class MainWindow(QMainWindow):
 
     def update_pathfinding(self):
         self.graph_manager.reset_edge_styles()
+        self.search_stats_label.setText("")
         start_name = self.start_node_combo.currentText()
         end_name = self.end_node_combo.currentText()
         
         if start_name == "None" or end_name == "None" or start_name == end_name:
             return
 
-        nodes = self.graph_manager.get_nodes()
-        start_node = next((n for n in nodes if n.name == start_name), None)
-        end_node = next((n for n in nodes if n.name == end_name), None)
+        graph = self.graph_manager.graph
+        start_node = graph.get(start_name)
+        end_node = graph.get(end_name)
         
         if start_node and end_node:
-            path = GraphSolver.find_shortest_path(nodes, start_node, end_node)
+            paths = self.graph_manager.paths
+            scale = GraphConfig.ASTAR_WEIGHT_PER_PIXEL
+            try:
+                path = paths.search(start_node, end_node, self.strategy_combo.currentData(), scale)
+            except NegativeCycle as e:
+                self.graph_manager.highlight_path(e.cycle)
+                self.search_stats_label.setText(
+                    "Negative cycle: " + " → ".join(graph.names[node] for node in e.cycle))
+                return
             if path:
-                for i in range(len(path) - 1):
-                    u = path[i]
-                    v = path[i+1]
-                    for edge in u.edges:
-                        if edge.dest == v or edge.source == v:
-                            edge.set_as_path(True)
-                            break
+                self.graph_manager.highlight_path(path)
+            if graph.negative_edges:
+                self.search_stats_label.setText(f"Negative weights: {ALGORITHMS[paths.algorithm()]}")
+                return
+            settled = paths.compare(start_node, end_node, scale)
+            self.search_stats_label.setText(
+                "Settled: " + ", ".join(f"{STRATEGIES[key]} {n}" for key, n in settled.items()))
+
+    def source_graph(self, kind: str, path: str, part: str = "graph") -> CompactGraph:
+        if kind == "scene":
+            return self.current_graph()
+        if kind == "matrix":
+            return CompactGraph.from_matrix(self.matrix_widget.get_matrix())
+        if not path:
+            raise ValueError("No file selected.")
+        return exercise.read_source(path, part)
+
+    def compare_sources(self):
+        if self.compare_worker is not None:
+            return
+        dialog = CompareDialog(self)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        part = dialog.part_combo.currentData()
+        try:
+            reference = self.source_graph(dialog.reference.kind(), dialog.reference.path(), part)
+            if dialog.target.kind() == "folder":
+                if not os.path.isdir(dialog.target.path()):
+                    raise ValueError("No folder selected.")
+                target = batch.collect_files([dialog.target.path()], batch.SOURCE_EXTENSIONS)
+            else:
+                target = self.source_graph(dialog.target.kind(), dialog.target.path(), part)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
+        worker = CompareWorker(reference, target, self.time_limit_spin.value() or None, self.result_cache,
+                               self.mode_combo.currentData(), part)
+        worker.signals.finished.connect(self.on_compare_finished)
+        worker.signals.failed.connect(self.on_compare_failed)
+        self.compare_worker = worker
+        self.btn_cancel.setEnabled(True)
+        self.solver_status.setText("Comparing...")
+        QThreadPool.globalInstance().start(worker)
+
+    def compare_done(self):
+        self.compare_worker = None
+        self.btn_cancel.setEnabled(self.solver_worker is not None)
+        self.solver_status.setText("")
+
+    def on_compare_failed(self, message: str):
+        self.compare_done()
+        QMessageBox.warning(self, "Stopped", message)
+
+    def on_compare_finished(self, result):
+        self.compare_done()
+        if isinstance(result, list):
+            matched = sum(1 for r in result if r["status"] == "ok")
+            box = QMessageBox(QMessageBox.Information, "Comparison",
+                              f"{matched} of {len(result)} submissions match the reference.", parent=self)
+            box.setDetailedText("\n".join(f"{os.path.basename(r['file'])}: {r['status']}"
+                                           + (f" ({r['error']})" if "error" in r else "") for r in result))
+            box.exec()
+        elif result:
+            pairs = "\n".join(f"{a} -> {b}" for a, b in sorted(result.items()))
+            QMessageBox.information(self, "Comparison", "Graphs match!\n\n" + pairs)
+        else:
+            QMessageBox.critical(self, "Comparison", self.no_match_text())
 
     def run_solver(self):
-        nodes = self.graph_manager.get_nodes()
-        matrix = self.matrix_widget.get_data()
-        if not nodes:
+        self.start_solver()
+
+    def profile_solver(self):
+        if self.solver_worker is not None:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Profile Solver Run", "solver.prof",
+                                                   "Profile data (*.prof *.pstats)")
+        if file_path:
+            self.start_solver(file_path)
+
+    def start_solver(self, profile_path: Optional[str] = None):
+        if self.solver_worker is not None:
+            return
+        graph = self.current_graph()
+        if not len(graph):
             QMessageBox.warning(self, "Error", "Graph is empty.")
             return
-        mapping = GraphSolver.solve(nodes, matrix)
+        timeout = self.time_limit_spin.value() or None
+        enumerate_limit = GraphConfig.ENUMERATION_SAMPLE if self.enumerate_check.isChecked() else 0
+        worker = SolverWorker(graph,
+                              CompactGraph.from_matrix(self.matrix_widget.get_matrix()), timeout,
+                              self.result_cache, enumerate_limit, self.mode_combo.currentData(), profile_path)
+        worker.signals.progress.connect(self.on_solver_progress)
+        worker.signals.stats.connect(self.on_solver_stats)
+        worker.signals.finished.connect(self.on_solver_finished)
+        worker.signals.enumerated.connect(self.on_solver_enumerated)
+        worker.signals.failed.connect(self.on_solver_failed)
+        self.solver_worker = worker
+        self.btn_solve.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.solver_status.setText("Searching...")
+        self.stats_label.setText("")
+        QThreadPool.globalInstance().start(worker)
+
+    def cancel_solver(self):
+        if self.solver_worker is not None:
+            self.solver_worker.cancel()
+        if self.compare_worker is not None:
+            self.compare_worker.cancel()
+
+    def solver_done(self):
+        self.solver_worker = None
+        self.btn_solve.setEnabled(True)
+        self.btn_cancel.setEnabled(self.compare_worker is not None)
+        self.solver_status.setText("")
+
+    def on_solver_progress(self, expanded: int, depth: int):
+        if self.solver_worker is not None:
+            total = len(self.solver_worker.graph)
+            self.solver_status.setText(f"Searching... {expanded} nodes expanded, depth {depth}/{total}")
+
+    def on_solver_stats(self, stats: dict):
+        pruned = ", ".join(f"{rule} {count:,}" for rule, count in
+                           sorted(stats["pruned"].items(), key=lambda item: -item[1]))
+        stages = ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in stats["stages"].items())
+        parts = [f"Nodes {stats['nodes']:,}", f"tried {stats['candidates']:,}",
+                 f"backtracks {stats['backtracks']:,}"]
+        if pruned:
+            parts.append(f"pruned: {pruned}")
+        if stages:
+            parts.append(stages)
+        self.stats_label.setText(" | ".join(parts))
+
+    def sync_matrix_size(self):
+        self.matrix_size_spin.blockSignals(True)
+        self.matrix_size_spin.setValue(self.matrix_widget.matrix_model.rowCount())
+        self.matrix_size_spin.blockSignals(False)
+
+    def on_node_count_changed(self, count: int):
+        if self.mode_combo.currentData() == "isomorphism" and count <= GraphConfig.MATRIX_SIZE_LIMIT:
+            self.matrix_widget.update_size(count)
+            self.sync_matrix_size()
+
+    def on_mode_changed(self):
+        isomorphism = self.mode_combo.currentData() == "isomorphism"
+        self.matrix_size_spin.setEnabled(not isomorphism)
+        if isomorphism:
+            self.on_node_count_changed(self.graph_manager.get_node_count())
+        self.update_consistency()
+
+    def update_consistency(self):
+        # только необходимые условия: "fits so far" ещё не означает, что изоморфизм есть
+        reason = self.consistency.mismatch()
+        if self.mode_combo.currentData() != "isomorphism" or self.data_graph is not None:
+            self.consistency_label.setText("")
+        elif reason is None:
+            self.consistency_label.setText("Matrix fits the drawing so far")
+            self.consistency_label.setStyleSheet(
+                f"color: {GraphConfig.COLOR_CONSISTENT.name()}; font-size: 11px;")
+        else:
+            self.consistency_label.setText(f"No match possible: {reason}")
+            self.consistency_label.setStyleSheet(
+                f"color: {GraphConfig.COLOR_INCONSISTENT.name()}; font-size: 11px;")
+
+    def no_match_text(self) -> str:
+        if self.mode_combo.currentData() == "isomorphism":
+            return "No valid isomorphism found."
+        return "No valid embedding found."
+
+    def on_solver_failed(self, message: str):
+        self.solver_done()
+        QMessageBox.warning(self, "Stopped", message)
+
+    def apply_mapping(self, mapping: Dict[str, int]) -> str:
+        graph = self.graph_manager.graph
+        self.clear_results()
+        msg_text = ""
+        for name, idx in sorted(mapping.items(), key=lambda x: x[0]):
+            msg_text += f"{name} -> {idx}\n"
+            node = graph.get(name)
+            if node is not None:
+                node.set_mapped_id(str(idx))
+        return msg_text
+
+    def on_solver_finished(self, mapping: Optional[Dict[str, int]]):
+        self.solver_done()
         if mapping:
-            msg_text = "Match Found!\n\n"
-            sorted_map = sorted(mapping.items(), key=lambda x: x[0])
-            for name, idx in sorted_map:
-                msg_text += f"{name} -> {idx}\n"
-                for node in nodes:
-                    if node.name == name:
-                        node.set_mapped_id(str(idx))
-            QMessageBox.information(self, "Success", msg_text)
+            QMessageBox.information(self, "Success", "Match Found!\n\n" + self.apply_mapping(mapping))
         else:
-            QMessageBox.critical(self, "Failed", "No valid isomorphism found.")
+            QMessageBox.critical(self, "Failed", self.no_match_text())
+
+    def on_solver_enumerated(self, count: int, exact: bool, sample: list):
+        self.solver_done()
+        if not count:
+            QMessageBox.critical(self, "Failed", self.no_match_text())
+            return
+        if count == 1 and exact:
+            header = "Unique match!"
+        else:
+            header = f"{count}{'' if exact else '+'} valid labelings (showing {len(sample)})."
+        box = QMessageBox(QMessageBox.Information, "Success", header + "\n\n" + self.apply_mapping(sample[0]), parent=self)
+        if len(sample) > 1:
+            details = []
+            for i, mapping in enumerate(sample, 1):
+                pairs = ", ".join(f"{name}->{idx}" for name, idx in sorted(mapping.items()))
+                details.append(f"#{i}: {pairs}")
+            box.setDetailedText("\n".join(details))
+        box.exec()
+
+    def closeEvent(self, event):
+        self.cancel_solver()
+        QThreadPool.globalInstance().waitForDone()
+        super().closeEvent(event)
 
     def clear_results(self):
         for node in self.graph_manager.get_nodes():
@@ -677,13 +1299,181 @@ class MainWindow(QMainWindow):
             if isinstance(item, EdgeItem):
                 item.set_weight("")
 
+    def update_graph_menu(self):
+        # во время bulk_update (импорт по тикам) вершины ещё добавляются в сцену
+        self.layout_action.setEnabled(not self.graph_manager.bulk_depth)
+
+    def start_layout(self):
+        nodes = self.graph_manager.get_nodes()
+        if len(nodes) < 2 or self.graph_manager.bulk_depth:
+            return
+        pos = {node: i for i, node in enumerate(nodes)}
+        positions = np.array([(node.x(), node.y()) for node in nodes])
+        edges = [(pos[u], pos[v]) for u in nodes for v in self.graph_manager.graph.adj[u] if pos[u] < pos[v]]
+        self.layout_nodes = nodes
+        self.force_layout = ForceLayout(positions, np.array(edges), GraphConfig.LAYOUT_SPACING)
+        # пока все вершины двигаются каждый кадр, BSP-индекс сцены только мешает
+        self.layout_index_method = self.scene.itemIndexMethod()
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        self.layout_tick_end = time.perf_counter()
+        self.layout_timer.start()
+
+    def stop_layout(self):
+        if self.force_layout is None:
+            return
+        self.layout_timer.stop()
+        self.force_layout = None
+        self.layout_nodes = []
+        self.scene.setItemIndexMethod(self.layout_index_method)
+
+    def toggle_layout(self):
+        if self.force_layout is not None:
+            self.stop_layout()
+        else:
+            self.start_layout()
+
+    def layout_tick(self):
+        layout = self.force_layout
+        if layout is None:
+            return
+        started = time.perf_counter()
+        # на больших графах отрисовка кадра дорогая, поэтому считаем не меньше, чем рисуем
+        budget = max(GraphConfig.LAYOUT_FRAME_BUDGET_MS / 1000, started - self.layout_tick_end)
+        while not layout.done and time.perf_counter() - started < budget:
+            layout.step()
+        self.graph_manager.apply_positions(self.layout_nodes, layout.scene_positions())
+        self.layout_tick_end = time.perf_counter()
+        if layout.done:
+            self.stop_layout()
+
+    def generate_from_matrix(self):
+        matrix = self.matrix_widget.get_matrix().copy()
+        if not len(matrix):
+            QMessageBox.warning(self, "Error", "Matrix is empty.")
+            return
+        self.release_scene()
+        edges = np.argwhere(np.triu((matrix != 0) | (matrix.T != 0), 1))
+        positions = force_layout(len(matrix), edges, GraphConfig.LAYOUT_SPACING,
+                                 GraphConfig.GENERATE_LAYOUT_ITERATIONS, seed=0)
+        positions += GraphConfig.SCENE_MARGIN - positions.min(axis=0)
+        self.scene.chain_builder.reset()
+        self.graph_manager.build_from_matrix(matrix, positions)
+        # прерванный импорт сообщает своё число вершин и мог обрезать матрицу
+        self.matrix_widget.matrix_model.set_matrix(matrix)
+        self.sync_matrix_size()
+
+    def current_graph(self) -> CompactGraph:
+        # импортированный без отрисовки граф заменяет нарисованный
+        if self.data_graph is not None:
+            return self.data_graph
+        return GraphSolver.to_compact(self.graph_manager.graph)
+
+    def set_data_graph(self, graph: Optional[CompactGraph], source: str = ""):
+        self.data_graph = graph
+        self.update_consistency()
+        if graph is None:
+            self.data_graph_label.setText("")
+        else:
+            self.data_graph_label.setText(
+                f"Solving {source}: {len(graph)} nodes, {graph.arc_count // 2} edges (not drawn)")
+
+    def import_graph(self):
+        filters = ";;".join(list(graph_io.FORMATS.values()) + ["All Files (*)"])
+        file_path, _ = QFileDialog.getOpenFileName(self, "Import Graph", "", filters)
+        if not file_path: return
+        try:
+            graph = graph_io.read_graph(file_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        name = os.path.basename(file_path)
+        if len(graph) > GraphConfig.SCENE_NODE_LIMIT or graph.arc_count // 2 > GraphConfig.SCENE_EDGE_LIMIT:
+            answer = QMessageBox.question(
+                self, "Large Graph",
+                f"{name} has {len(graph)} nodes and {graph.arc_count // 2} edges.\n"
+                "Draw it in the editor? Otherwise it is only loaded for matching.",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if answer != QMessageBox.Yes:
+                self.clear_all()
+                self.set_data_graph(graph, name)
+                return
+        self.populate_scene(graph)
+
+    def populate_scene(self, graph: CompactGraph):
+        self.clear_all()
+        n = len(graph)
+        if n <= GraphConfig.LAYOUT_NODE_LIMIT:
+            edges = np.array([(u, v) for u, v, _ in graph_io.iter_edges(graph)])
+            positions = force_layout(n, edges, GraphConfig.LAYOUT_SPACING,
+                                     GraphConfig.GENERATE_LAYOUT_ITERATIONS, seed=0)
+            positions += GraphConfig.SCENE_MARGIN - positions.min(axis=0)
+        else:
+            side = int(np.ceil(np.sqrt(n)))
+            cells = np.arange(n)
+            positions = np.stack([cells % side, cells // side], axis=1) * float(GraphConfig.LAYOUT_SPACING)
+            positions += GraphConfig.SCENE_MARGIN
+        # весь импорт идёт одним bulk_update, растянутым на несколько тиков таймера
+        stack = ExitStack()
+        stack.enter_context(self.graph_manager.bulk_update())
+        self.import_job = (graph, positions, [], stack)
+        self.import_cursor = 0
+        self.graph_manager.fit_scene(positions)
+        self.import_timer.start()
+
+    def import_tick(self):
+        graph, positions, nodes, stack = self.import_job
+        try:
+            self.import_cursor = self.graph_manager.populate_chunk(graph, positions, nodes, self.import_cursor,
+                                                                   GraphConfig.IMPORT_CHUNK_SIZE)
+        except Exception as e:
+            # иначе тот же тик падал бы снова и снова, а сцена осталась бы в bulk_update
+            self.finish_import()
+            QMessageBox.critical(self, "Error", f"Import stopped: {e}")
+            return
+        total = len(graph) + graph.arc_count
+        self.solver_status.setText(f"Importing... {100 * self.import_cursor // max(total, 1)}%")
+        if self.import_cursor >= total:
+            self.finish_import()
+
+    def finish_import(self):
+        if self.import_job is None:
+            return
+        self.import_timer.stop()
+        stack = self.import_job[3]
+        self.import_job = None
+        self.solver_status.setText("")
+        stack.close()
+
+    def export_graph(self):
+        filters = ";;".join(graph_io.FORMATS.values())
+        file_path, selected = QFileDialog.getSaveFileName(self, "Export Graph", "", filters)
+        if not file_path: return
+        fmt = next((key for key, title in graph_io.FORMATS.items() if title == selected), None)
+        try:
+            graph_io.write_graph(file_path, self.current_graph(), fmt)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+
+    def release_scene(self):
+        # останавливает всё, что ещё пишет в сцену или подменяет нарисованный граф
+        self.finish_import()
+        self.set_data_graph(None)
+        self.stop_layout()
+
     def clear_all(self):
+        self.release_scene()
         self.graph_manager.reset()
         self.matrix_widget.update_size(0)
+        self.sync_matrix_size()
 
     def save_exercise(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save File", "", "JSON Files (*.json)")
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save File", "", exercise.FILE_FILTER)
         if not file_path: return
+        if not file_path.endswith(exercise.EXTENSIONS):
+            file_path += ".json"
+        if exercise.is_binary(file_path):
+            self.save_exercise_binary(file_path)
+            return
         nodes = self.graph_manager.get_nodes()
         nodes_data = []
         node_id_map = {node: i for i, node in enumerate(nodes)}
@@ -704,35 +1494,72 @@ class MainWindow(QMainWindow):
             "matrix": self.matrix_widget.get_data()
         }
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
+            with graph_io.open_text(file_path, 'w') as f:
                 json.dump(data, f, indent=4)
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    def save_exercise_binary(self, file_path: str):
+        nodes = self.graph_manager.get_nodes()
+        node_id_map = {node: i for i, node in enumerate(nodes)}
+        edges, weights, labeled = [], [], []
+        for node in nodes:
+            for edge in node.edges:
+                if edge.source is node and edge.dest in node_id_map:
+                    edges.append((node_id_map[node], node_id_map[edge.dest]))
+                    weights.append(edge.weight_value)
+                    labeled.append(bool(edge.weight))
+        positions = np.array([(node.pos().x(), node.pos().y()) for node in nodes], dtype=float)
+        try:
+            exercise.write_exercise_binary(file_path, [node.name for node in nodes], positions, edges, weights,
+                                           labeled, self.matrix_widget.get_matrix(),
+                                           self.graph_manager.node_counter)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+
     def load_exercise(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Open File", "", "JSON Files (*.json)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open File", "", exercise.FILE_FILTER)
         if not file_path: return
+        if exercise.is_binary(file_path):
+            self.load_exercise_binary(file_path)
+            return
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = exercise.read_exercise_json(file_path)
             self.clear_all()
             g_data = data.get("graph", {})
             
             id_map = {}
-            for n in g_data.get("nodes", []):
-                node = self.graph_manager.create_node(QPointF(n["x"], n["y"]), n["name"])
-                id_map[n["id"]] = node
-            for e in g_data.get("edges", []):
-                u, v = id_map.get(e["u"]), id_map.get(e["v"])
-                if u and v:
-                    self.graph_manager.create_edge(u, v, e.get("w", ""))
+            with self.graph_manager.bulk_update():
+                for n in g_data.get("nodes", []):
+                    node = self.graph_manager.create_node(QPointF(n["x"], n["y"]), n["name"])
+                    id_map[n["id"]] = node
+                for e in g_data.get("edges", []):
+                    u, v = id_map.get(e["u"]), id_map.get(e["v"])
+                    if u and v:
+                        self.graph_manager.create_edge(u, v, e.get("w", ""))
             self.matrix_widget.set_data(data.get("matrix", []))
+            self.sync_matrix_size()
             
             self.graph_manager.node_counter = g_data.get("node_counter", 0)
 
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    def load_exercise_binary(self, file_path: str):
+        try:
+            data = exercise.read_exercise_binary(file_path)
+            self.clear_all()
+            with self.graph_manager.bulk_update():
+                nodes = [self.graph_manager.create_node(QPointF(x, y), name)
+                         for name, (x, y) in zip(data["names"], data["positions"].tolist())]
+                for (u, v), w, labeled in zip(data["edges"].tolist(), data["weights"].tolist(), data["labeled"]):
+                    self.graph_manager.create_edge(nodes[u], nodes[v], format_weight(w) if labeled else "")
+            self.matrix_widget.matrix_model.set_matrix(np.array(data["matrix"], dtype=float))
+            self.sync_matrix_size()
+            self.graph_manager.node_counter = data["node_counter"]
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
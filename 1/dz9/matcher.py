@@ -0,0 +1,599 @@
+import heapq
+import multiprocessing
+import os
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import canonical
+import invariants
+from compact_graph import CompactGraph
+from result_cache import ResultCache
+
+CHECK_EVERY = 1024
+# дольше канонизация для кэша не идёт: на трудных для неё графах быстрее сразу искать отображение
+CANON_TIME_LIMIT = 1.0
+# крупнее канонизация почти всегда упирается в лимит (regular-500 - 2.9 s, дерево из 1000 вершин
+# исчерпывает node_limit), поэтому такие графы сразу идут в поиск
+CANON_VERTEX_LIMIT = 250
+PARALLEL_COMPONENT_SIZE = 200
+# batch.py сам распределяет файлы по процессам и выставляет здесь 1
+COMPONENT_WORKERS = os.cpu_count() or 1
+# пулы процессов создаются и из потоков Qt: fork унаследовал бы блокировки, захваченные
+# другими потоками, поэтому все пулы и их Event берутся из контекста spawn
+MP_CONTEXT = multiprocessing.get_context("spawn")
+
+# multiprocessing.Event пула компонент: выставленный, прерывает поиск в процессах-исполнителях
+_part_cancel = None
+
+Progress = Callable[[int, int], None]
+Seeds = Tuple[List[tuple], List[tuple]]
+# [сертификат, каноническая нумерация] - то, что хранится в ResultCache по дайджесту графа
+Labeling = list
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchCancelled(Exception):
+    pass
+
+
+class SearchStats:
+    # счётчики поиска; hook вызывается на тех же контрольных точках, что и progress
+    def __init__(self, hook: Optional[Callable[["SearchStats"], None]] = None):
+        self.nodes = 0
+        self.candidates = 0
+        self.backtracks = 0
+        self.pruned: Dict[str, int] = {}
+        self.stages: Dict[str, float] = {}
+        self.hook = hook
+
+    def __getstate__(self):
+        return self.nodes, self.candidates, self.backtracks, self.pruned, self.stages
+
+    def __setstate__(self, state):
+        self.nodes, self.candidates, self.backtracks, self.pruned, self.stages = state
+        self.hook = None
+
+    def prune(self, rule: str, count: int = 1):
+        if count:
+            self.pruned[rule] = self.pruned.get(rule, 0) + count
+
+    def record(self, nodes: int, candidates: int, backtracks: int, pruned: Sequence[Tuple[str, int]]):
+        self.nodes += nodes
+        self.candidates += candidates
+        self.backtracks += backtracks
+        for rule, count in pruned:
+            self.prune(rule, count)
+        if self.hook is not None:
+            self.hook(self)
+
+    def merge(self, other: "SearchStats"):
+        self.record(other.nodes, other.candidates, other.backtracks, list(other.pruned.items()))
+        for stage, seconds in other.stages.items():
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def as_dict(self) -> dict:
+        return {"nodes": self.nodes, "candidates": self.candidates, "backtracks": self.backtracks,
+                "pruned": dict(self.pruned), "stages": {k: round(v, 6) for k, v in self.stages.items()}}
+
+
+@contextmanager
+def timed(stats: Optional[SearchStats], stage: str):
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.stages[stage] = stats.stages.get(stage, 0.0) + time.perf_counter() - started
+
+
+# правила отсечения в search_indexed, по индексу в счётчике
+PRUNE_RULES = ("used", "adjacency", "extra edge", "refinement")
+
+
+def refine_colors(g: List[Dict[int, int]], m: List[Dict[int, int]],
+                  seeds: Seeds = None) -> Optional[Tuple[List[int], List[int]]]:
+    # общая палитра для обоих графов, чтобы цвета были сравнимы
+    if seeds is None:
+        seeds = [len(n) for n in g], [len(n) for n in m]
+    palette: Dict[tuple, int] = {}
+    g_col = [palette.setdefault(key, len(palette)) for key in seeds[0]]
+    m_col = [palette.setdefault(key, len(palette)) for key in seeds[1]]
+    classes = len(set(g_col))
+
+    while True:
+        if sorted(g_col) != sorted(m_col):
+            return None
+        palette = {}
+        new_g = [palette.setdefault((g_col[u], tuple(sorted((g_col[v], w) for v, w in g[u].items()))), len(palette))
+                 for u in range(len(g))]
+        new_m = [palette.setdefault((m_col[u], tuple(sorted((m_col[v], w) for v, w in m[u].items()))), len(palette))
+                 for u in range(len(m))]
+        g_col, m_col = new_g, new_m
+        new_classes = len(set(g_col))
+        if new_classes == classes:
+            if sorted(g_col) != sorted(m_col):
+                return None
+            return g_col, m_col
+        classes = new_classes
+
+
+Coloring = Tuple[List[int], List[int], Dict[int, int]]
+
+
+def individualize_pair(g: List[Dict[int, int]], m: List[Dict[int, int]], coloring: Coloring,
+                       u: int, v: int) -> Optional[Coloring]:
+    # u и v получают новый общий цвет, и раскраска уточняется только от изменившихся вершин:
+    # пересчитываются сигнатуры соседей тех, кто сменил цвет, а большая часть класса,
+    # не задетая изменениями, сохраняет прежний цвет; None - раскраски разошлись
+    g_col, m_col, sizes = list(coloring[0]), list(coloring[1]), dict(coloring[2])
+    fresh = len(sizes)
+    sizes[g_col[u]] -= 1
+    sizes[fresh] = 1
+    g_col[u] = m_col[v] = fresh
+    changed_g, changed_m = [u], [v]
+    while changed_g:
+        splits = []
+        for adj, col, changed in ((g, g_col, changed_g), (m, m_col, changed_m)):
+            groups: Dict[int, Dict[tuple, List[int]]] = {}
+            for x in {x for y in changed for x in adj[y]}:
+                sig = tuple(sorted((col[y], w) for y, w in adj[x].items()))
+                groups.setdefault(col[x], {}).setdefault(sig, []).append(x)
+            splits.append(groups)
+        g_groups, m_groups = splits
+        if g_groups.keys() != m_groups.keys():
+            return None
+        changed_g, changed_m = [], []
+        for c in sorted(g_groups):
+            by_sig, m_by_sig = g_groups[c], m_groups[c]
+            if by_sig.keys() != m_by_sig.keys() or any(len(by_sig[k]) != len(m_by_sig[k]) for k in by_sig):
+                return None
+            keys = sorted(by_sig)
+            # если задет весь класс, его цвет остаётся у первой группы
+            if sum(len(xs) for xs in by_sig.values()) == sizes[c]:
+                keys = keys[1:]
+            for key in keys:
+                fresh = len(sizes)
+                sizes[fresh] = len(by_sig[key])
+                sizes[c] -= len(by_sig[key])
+                for x in by_sig[key]:
+                    g_col[x] = fresh
+                    changed_g.append(x)
+                for x in m_by_sig[key]:
+                    m_col[x] = fresh
+                    changed_m.append(x)
+    return g_col, m_col, sizes
+
+
+def _class_sizes(colors: List[int]) -> Dict[int, int]:
+    sizes: Dict[int, int] = {}
+    for c in colors:
+        sizes[c] = sizes.get(c, 0) + 1
+    return sizes
+
+
+def _search_order(g: List[Dict[int, int]], g_col: List[int]) -> List[int]:
+    # сначала вершины с наибольшим числом уже расставленных соседей,
+    # затем из самых маленьких цветовых классов; куча с ленивым удалением:
+    # при росте links вершина кладётся заново, устаревшие записи пропускаются
+    class_size = _class_sizes(g_col)
+
+    order: List[int] = []
+    placed = [False] * len(g)
+    links = [0] * len(g)
+    heap = [(0, class_size[g_col[u]], -len(g[u]), u) for u in range(len(g))]
+    heapq.heapify(heap)
+    while heap:
+        neg_links, _, _, best = heapq.heappop(heap)
+        if placed[best] or -neg_links != links[best]:
+            continue
+        placed[best] = True
+        order.append(best)
+        for v in g[best]:
+            if not placed[v]:
+                links[v] += 1
+                heapq.heappush(heap, (-links[v], class_size[g_col[v]], -len(g[v]), v))
+    return order
+
+
+def search_indexed(g: List[Dict[int, int]], m: List[Dict[int, int]],
+                   timeout: Optional[float] = None, progress: Progress = None,
+                   seeds: Seeds = None, stats: Optional[SearchStats] = None) -> Iterator[List[int]]:
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    if len(g) != len(m):
+        return
+    if sum(len(n) for n in g) != sum(len(n) for n in m):
+        return
+
+    with timed(stats, "refinement"):
+        colors = refine_colors(g, m, seeds)
+    if colors is None:
+        if stats is not None:
+            stats.prune("refinement")
+        return
+    g_col, m_col = colors
+
+    by_color: Dict[int, List[int]] = {}
+    for v, c in enumerate(m_col):
+        by_color.setdefault(c, []).append(v)
+
+    order = _search_order(g, g_col)
+    n = len(order)
+    position = [0] * n
+    for d, u in enumerate(order):
+        position[u] = d
+    # anchor[d] - расставленный раньше сосед order[d] наименьшей степени с дугой в order[d]:
+    # кандидаты берутся только среди соседей его образа (терминальное множество VF2),
+    # а не из всего цветового класса
+    anchor = [-1] * n
+    for d, u in enumerate(order):
+        for x in g[u]:
+            if position[x] < d and u in g[x] and (anchor[d] < 0 or len(g[x]) < len(g[anchor[d]])):
+                anchor[d] = x
+    core_g = [-1] * len(g)
+    core_m = [-1] * len(m)
+    # coloring[d] - раскраски обоих графов и размеры классов, действующие на глубине d;
+    # выбор в неодноэлементном классе индивидуализирует пару, и раскраска уточняется заново,
+    # иначе равномерные разбиения регулярных графов не расщепляются
+    coloring: List[Coloring] = [(g_col, m_col, _class_sizes(g_col))] * n
+
+    def candidates_at(d: int) -> Iterator[int]:
+        u = order[d]
+        d_g, d_m, _ = coloring[d]
+        c = d_g[u]
+        source = by_color[g_col[u]] if anchor[d] < 0 else m[core_g[anchor[d]]]
+        return (v for v in source if d_m[v] == c)
+
+    def split(d: int, u: int, v: int) -> Optional[Coloring]:
+        d_g, _, sizes = coloring[d]
+        # одиночный класс ничего не расщепляет, как и вершина, все соседи которой уже одиночные
+        if sizes[d_g[u]] == 1 or all(sizes[d_g[x]] == 1 for x in g[u]):
+            return coloring[d]
+        return individualize_pair(g, m, coloring[d], u, v)
+
+    def feasible(u: int, v: int) -> int:
+        # 0 - подходит, иначе номер сработавшего правила из PRUNE_RULES
+        mapped = 0
+        for nu, w in g[u].items():
+            nv = core_g[nu]
+            if nv < 0:
+                continue
+            if m[v].get(nv) != w:
+                return 1
+            mapped += 1
+        # у кандидата не должно быть лишних рёбер в уже сопоставленную часть
+        for nv in m[v]:
+            if core_m[nv] >= 0:
+                mapped -= 1
+        return 0 if mapped == 0 else 2
+
+    # итеративный перебор, чтобы не упираться в лимит рекурсии на больших графах
+    candidates = [iter(())] * n
+    depth = 0
+    steps = 0
+    # счётчики копятся в локальных переменных и сбрасываются в stats на контрольных точках;
+    # проверенных кандидатов столько, сколько отсечений плюс удачных шагов
+    reported = backtracks = 0
+    pruned = [0] * len(PRUNE_RULES)
+    if n:
+        candidates[0] = candidates_at(0)
+    while depth >= 0:
+        if depth == n:
+            if stats is not None:
+                stats.record(steps - reported, sum(pruned) + steps - reported - backtracks, backtracks,
+                             list(zip(PRUNE_RULES, pruned)))
+                reported, backtracks, pruned = steps, 0, [0] * len(PRUNE_RULES)
+            if progress is not None:
+                progress(steps, depth)
+            yield list(core_g)
+            depth -= 1
+            continue
+        steps += 1
+        if steps % CHECK_EVERY == 0:
+            if deadline is not None and time.monotonic() > deadline:
+                raise SearchTimeout(f"search exceeded {timeout} s")
+            if stats is not None:
+                stats.record(steps - reported, sum(pruned) + steps - reported - backtracks, backtracks,
+                             list(zip(PRUNE_RULES, pruned)))
+                reported, backtracks, pruned = steps, 0, [0] * len(PRUNE_RULES)
+            if progress is not None:
+                progress(steps, depth)
+        u = order[depth]
+        if core_g[u] >= 0:
+            core_m[core_g[u]] = -1
+            core_g[u] = -1
+        for v in candidates[depth]:
+            if core_m[v] >= 0:
+                pruned[0] += 1
+                continue
+            rule = feasible(u, v)
+            if not rule:
+                refined = split(depth, u, v)
+                if refined is not None:
+                    core_g[u], core_m[v] = v, u
+                    break
+                rule = 3
+            pruned[rule] += 1
+        else:
+            backtracks += 1
+            depth -= 1
+            continue
+        depth += 1
+        if depth < n:
+            coloring[depth] = refined
+            candidates[depth] = candidates_at(depth)
+    if stats is not None:
+        stats.record(steps - reported, sum(pruned) + steps - reported - backtracks, backtracks,
+                     list(zip(PRUNE_RULES, pruned)))
+    if progress is not None:
+        progress(steps, 0)
+
+
+def match_indexed(g: List[Dict[int, int]], m: List[Dict[int, int]],
+                  timeout: Optional[float] = None, progress: Progress = None,
+                  seeds: Seeds = None, stats: Optional[SearchStats] = None) -> Optional[List[int]]:
+    return next(search_indexed(g, m, timeout, progress, seeds, stats), None)
+
+
+def pair_components(g: CompactGraph, m: CompactGraph, seeds: Seeds) -> Optional[List[Tuple[list, list]]]:
+    groups: Dict[tuple, Tuple[list, list]] = {}
+    for side, graph in enumerate((g, m)):
+        keys = seeds[side]
+        for comp in invariants.components(graph):
+            signature = (len(comp), tuple(sorted(keys[u] for u in comp)))
+            groups.setdefault(signature, ([], []))[side].append(comp)
+    if any(len(g_comps) != len(m_comps) for g_comps, m_comps in groups.values()):
+        return None
+    return list(groups.values())
+
+
+def _match_part(g: CompactGraph, m: CompactGraph, seeds: Seeds, timeout: Optional[float],
+                progress: Progress = None, stats: Optional[SearchStats] = None) -> Optional[List[int]]:
+    # ключи вершин зависят только от своей компоненты и берутся из ключей всего графа,
+    # а спектр компоненты проверяется отдельно: для всего графа он мог не считаться
+    with timed(stats, "invariants"):
+        mismatch = invariants.spectra_differ(g, m)
+    if mismatch:
+        if stats is not None:
+            stats.prune("spectrum")
+        return None
+    return match_indexed(g.adjacency(), m.adjacency(), timeout, progress, seeds, stats)
+
+
+def _init_part_worker(cancel):
+    global _part_cancel
+    _part_cancel = cancel
+
+
+def _check_part_cancel(expanded: int, depth: int):
+    if _part_cancel is not None and _part_cancel.is_set():
+        raise SearchCancelled()
+
+
+def _match_part_counted(g: CompactGraph, m: CompactGraph, seeds: Seeds,
+                        timeout: Optional[float]) -> Tuple[Optional[List[int]], SearchStats]:
+    # для процесса-исполнителя: счётчики возвращаются вместе с результатом,
+    # отмену и истёкший срок поиск замечает на тех же контрольных точках, что и progress
+    stats = SearchStats()
+    return _match_part(g, m, seeds, timeout, _check_part_cancel, stats), stats
+
+
+def match_components(g: CompactGraph, m: CompactGraph, timeout: Optional[float] = None,
+                     progress: Progress = None, seeds: Seeds = None,
+                     stats: Optional[SearchStats] = None) -> Optional[List[int]]:
+    if seeds is None:
+        with timed(stats, "invariants"):
+            seeds = invariants.vertex_keys(g), invariants.vertex_keys(m)
+    groups = pair_components(g, m, seeds)
+    if groups is None:
+        if stats is not None:
+            stats.prune("components")
+        return None
+    if len(groups) == 1 and len(groups[0][0]) == 1:
+        return match_indexed(g.adjacency(), m.adjacency(), timeout, progress, seeds, stats)
+
+    deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def remaining() -> Optional[float]:
+        if deadline is None:
+            return None
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise SearchTimeout(f"search exceeded {timeout} s")
+        return left
+
+    def part_args(gc: List[int], mc: List[int]):
+        part_seeds = [seeds[0][u] for u in gc], [seeds[1][v] for v in mc]
+        return g.induced(gc), m.induced(mc), part_seeds, remaining()
+
+    # компоненты внутри группы сопоставляются жадно: изоморфизм - отношение
+    # эквивалентности, поэтому первая подошедшая пара никому не мешает
+    attempts: Dict[Tuple[int, int], Optional[List[int]]] = {}
+    large = [(id(gc), id(mc), gc, mc) for g_comps, m_comps in groups
+             for gc, mc in zip(g_comps, m_comps) if len(gc) >= PARALLEL_COMPONENT_SIZE]
+    if COMPONENT_WORKERS > 1 and len(large) > 1:
+        cancel = MP_CONTEXT.Event()
+        pool = ProcessPoolExecutor(max_workers=min(COMPONENT_WORKERS, len(large)), mp_context=MP_CONTEXT,
+                                   initializer=_init_part_worker, initargs=(cancel,))
+        try:
+            futures = {pool.submit(_match_part_counted, *part_args(gc, mc)): (gi, mi) for gi, mi, gc, mc in large}
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                # ждущие очереди компоненты получили срок при отправке, общий срок следит этот цикл
+                remaining()
+                if progress is not None:
+                    progress(len(futures) - len(pending), 0)
+            for future, key in futures.items():
+                attempts[key], part_stats = future.result()
+                if stats is not None:
+                    stats.merge(part_stats)
+        finally:
+            # при отмене, истёкшем сроке или ошибке идущие в процессах поиски выходят
+            # на ближайшей контрольной точке, иначе выход интерпретатора ждал бы их без конца
+            cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    mapping = [-1] * len(g)
+    for g_comps, m_comps in groups:
+        free = list(m_comps)
+        for gc in g_comps:
+            for mc in free:
+                if len(gc) == 1:
+                    part = [0]
+                elif (id(gc), id(mc)) in attempts:
+                    part = attempts[(id(gc), id(mc))]
+                else:
+                    part = _match_part(*part_args(gc, mc), progress, stats)
+                if part is not None:
+                    break
+            else:
+                return None
+            free.remove(mc)
+            for i, j in enumerate(part):
+                mapping[gc[i]] = mc[j]
+    return mapping
+
+
+def _compare(g: CompactGraph, m: CompactGraph, stats: Optional[SearchStats]) -> Optional[Seeds]:
+    with timed(stats, "invariants"):
+        mismatch, seeds = invariants.compare(g, m)
+    if mismatch and stats is not None:
+        stats.prune(mismatch)
+    return seeds
+
+
+def _checkpoint(deadline: Optional[float], timeout: Optional[float], progress: Progress) -> canonical.Checkpoint:
+    # канонизация подчиняется тому же лимиту времени и отмене, что и сам поиск
+    give_up = time.monotonic() + CANON_TIME_LIMIT
+
+    def check(nodes: int, depth: int):
+        now = time.monotonic()
+        if deadline is not None and now > deadline:
+            raise SearchTimeout(f"search exceeded {timeout} s")
+        if now > give_up:
+            raise canonical.GiveUp()
+        if progress is not None:
+            progress(nodes, depth)
+    return check
+
+
+def _labeling_key(graph: CompactGraph) -> str:
+    return "canon:" + canonical.graph_digest(graph)
+
+
+def canonical_labeling(graph: CompactGraph, cache: ResultCache, key: str,
+                       checkpoint: canonical.Checkpoint = None) -> Optional[Labeling]:
+    form = canonical.cached_canonical_form(graph, checkpoint)
+    if form is None:
+        return None
+    labeling = [form.certificate, form.order]
+    cache.put(key, labeling)
+    return labeling
+
+
+def map_labelings(g: CompactGraph, g_label: Labeling, m_label: Labeling) -> Optional[Dict[str, int]]:
+    # равные сертификаты означают изоморфизм, совмещающий канонические нумерации
+    if g_label[0] != m_label[0]:
+        return None
+    return {g.names[u]: v + 1 for u, v in zip(g_label[1], m_label[1])}
+
+
+def solve_graphs(g: CompactGraph, m: CompactGraph, timeout: Optional[float] = None,
+                 progress: Progress = None, cache: ResultCache = None,
+                 stats: Optional[SearchStats] = None, strict_weights: bool = False) -> Optional[Dict[str, int]]:
+    # strict_weights - веса сравниваются как есть, даже если у g их нет (сравнение двух графов)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    if g.is_unweighted() and not strict_weights:
+        m = m.with_unit_weights()
+    if cache is not None:
+        # уже встречавшиеся графы решаются по кэшу, без инвариантов и поиска
+        keys = _labeling_key(g), _labeling_key(m)
+        labels = [cache.get(key)[1] for key in keys]
+        if None not in labels:
+            return map_labelings(g, *labels)
+    seeds = _compare(g, m, stats)
+    if seeds is None:
+        return None
+    if cache is not None and len(g) <= CANON_VERTEX_LIMIT:
+        checkpoint = _checkpoint(deadline, timeout, progress)
+        with timed(stats, "canonical"):
+            if labels[0] is None:
+                labels[0] = canonical_labeling(g, cache, keys[0], checkpoint)
+            if labels[0] is not None and labels[1] is None:
+                labels[1] = canonical_labeling(m, cache, keys[1], checkpoint)
+        if None not in labels:
+            return map_labelings(g, *labels)
+    left = max(deadline - time.monotonic(), 0) if deadline is not None else None
+    mapping = match_components(g, m, left, progress, seeds, stats)
+    if mapping:
+        return {g.names[u]: v + 1 for u, v in enumerate(mapping)}
+    return None
+
+
+def group_elements(generators: List[List[int]], n: int, limit: int) -> List[List[int]]:
+    identity = tuple(range(n))
+    seen = {identity}
+    queue = [identity]
+    for perm in queue:
+        if len(seen) >= limit:
+            break
+        for gen in generators:
+            image = tuple(gen[x] for x in perm)
+            if image not in seen:
+                seen.add(image)
+                queue.append(image)
+                if len(seen) >= limit:
+                    break
+    return [list(p) for p in queue[:limit]]
+
+
+def enumerate_matches(g: CompactGraph, m: CompactGraph, limit: int = 100, timeout: Optional[float] = None,
+                      progress: Progress = None, stats: Optional[SearchStats] = None,
+                      strict_weights: bool = False) -> Tuple[int, bool, List[Dict[str, int]]]:
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    if g.is_unweighted() and not strict_weights:
+        m = m.with_unit_weights()
+    if not len(g):
+        return 0, True, []
+    seeds = _compare(g, m, stats)
+    if seeds is None:
+        return 0, True, []
+    left = max(deadline - time.monotonic(), 0) if deadline is not None else None
+    first = match_components(g, m, left, progress, seeds, stats)
+    if first is None:
+        return 0, True, []
+
+    def named(mapping: List[int]) -> Dict[str, int]:
+        return {g.names[u]: v + 1 for u, v in enumerate(mapping)}
+
+    # все изоморфизмы - это первый найденный, скомпонованный с автоморфизмами графа
+    try:
+        with timed(stats, "canonical"):
+            form = canonical.cached_canonical_form(g, _checkpoint(deadline, timeout, progress))
+    except SearchTimeout:
+        return 1, False, [named(first)]
+    if form is not None:
+        sample = [[first[s[u]] for u in range(len(g))] for s in group_elements(form.automorphisms, len(g), limit)]
+        return form.group_size, True, [named(p) for p in sample]
+
+    sample = []
+    total = 0
+    exact = True
+    left = max(deadline - time.monotonic(), 0) if deadline is not None else None
+    try:
+        for mapping in search_indexed(g.adjacency(), m.adjacency(), left, progress, seeds, stats):
+            total += 1
+            if len(sample) < limit:
+                sample.append(mapping)
+    except SearchTimeout:
+        exact = False
+        if not sample:
+            total, sample = 1, [first]
+    return total, exact, [named(p) for p in sample]
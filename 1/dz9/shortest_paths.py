@@ -0,0 +1,382 @@
+from collections import deque
+from heapq import heappush, heappop
+from itertools import count
+from math import hypot
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from compact_graph import CompactGraph
+from graph_model import GraphModel
+from spatial_index import SpatialGrid
+
+Adjacency = Dict[Hashable, Dict[Hashable, float]]
+Positions = Dict[Hashable, Tuple[float, float]]
+Tree = Tuple[Dict[Hashable, float], Dict[Hashable, Hashable]]
+SearchResult = Tuple[Optional[List[Hashable]], int]
+
+STRATEGIES = {
+    "dijkstra": "Dijkstra",
+    "bidirectional": "Bidirectional",
+    "astar": "A*",
+}
+
+ALGORITHMS = {
+    "dijkstra": "Dijkstra",
+    "bellman_ford": "Bellman-Ford",
+}
+
+FLOYD_WARSHALL_LIMIT = 1500
+
+class NegativeCycle(Exception):
+    def __init__(self, cycle: List[Hashable]):
+        super().__init__("graph contains a negative cycle")
+        self.cycle = cycle
+
+
+def dijkstra(adj: Adjacency, source: Hashable, target: Hashable = None) -> Tree:
+    distances = {source: 0}
+    previous = {}
+    tie = count()
+    pq = [(0, next(tie), source)]
+    settled = set()
+
+    while pq:
+        current_distance, _, current = heappop(pq)
+        if current in settled:
+            continue
+        settled.add(current)
+        if current == target:
+            break
+        for neighbor, weight in adj[current].items():
+            distance = current_distance + weight
+            if distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = distance
+                previous[neighbor] = current
+                heappush(pq, (distance, next(tie), neighbor))
+    return distances, previous
+
+
+def walk_back(previous: Dict[Hashable, Hashable], source: Hashable, target: Hashable) -> List[Hashable]:
+    path = [target]
+    while path[-1] != source:
+        path.append(previous[path[-1]])
+    path.reverse()
+    return path
+
+
+def has_negative_weights(adj: Adjacency) -> bool:
+    # словарь GraphModel.adj или список CompactGraph.adjacency()
+    rows = adj.values() if isinstance(adj, dict) else adj
+    return any(w < 0 for neighbors in rows for w in neighbors.values())
+
+
+def _cycle_from(previous: Dict[Hashable, Hashable], node: Hashable) -> List[Hashable]:
+    seen = {}
+    chain = []
+    while node not in seen:
+        if node not in previous:
+            return [node]
+        seen[node] = len(chain)
+        chain.append(node)
+        node = previous[node]
+    cycle = chain[seen[node]:]
+    cycle.reverse()
+    return cycle + [cycle[0]]
+
+
+def _relax_all(adj: Adjacency, distances: Dict[Hashable, float], previous: Dict[Hashable, Hashable]):
+    # очередь Bellman-Ford (SPFA); путь из n рёбер в дереве предков означает цикл
+    n = len(adj)
+    edges = dict.fromkeys(distances, 0)
+    queue = deque(distances)
+    queued = set(distances)
+    while queue:
+        current = queue.popleft()
+        queued.discard(current)
+        current_distance = distances[current]
+        for neighbor, weight in adj[current].items():
+            distance = current_distance + weight
+            if distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = distance
+                previous[neighbor] = current
+                edges[neighbor] = edges[current] + 1
+                if edges[neighbor] >= n:
+                    raise NegativeCycle(_cycle_from(previous, neighbor))
+                if neighbor not in queued:
+                    queued.add(neighbor)
+                    queue.append(neighbor)
+
+
+def bellman_ford(adj: Adjacency, source: Hashable) -> Tree:
+    distances = {source: 0}
+    previous = {}
+    _relax_all(adj, distances, previous)
+    return distances, previous
+
+
+def shortest_path(adj: Adjacency, source: Hashable, target: Hashable) -> Optional[List[Hashable]]:
+    if has_negative_weights(adj):
+        distances, previous = bellman_ford(adj, source)
+    else:
+        distances, previous = dijkstra(adj, source, target)
+    if target not in distances:
+        return None
+    return walk_back(previous, source, target)
+
+
+def _best_first(adj: Adjacency, source: Hashable, target: Hashable,
+                heuristic: Callable[[Hashable], float]) -> SearchResult:
+    distances = {source: 0}
+    previous = {}
+    tie = count()
+    pq = [(heuristic(source), next(tie), source)]
+    settled = set()
+
+    while pq:
+        _, _, current = heappop(pq)
+        if current in settled:
+            continue
+        settled.add(current)
+        if current == target:
+            return walk_back(previous, source, target), len(settled)
+        current_distance = distances[current]
+        for neighbor, weight in adj[current].items():
+            distance = current_distance + weight
+            if distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = distance
+                previous[neighbor] = current
+                heappush(pq, (distance + heuristic(neighbor), next(tie), neighbor))
+    return None, len(settled)
+
+
+def dijkstra_search(adj: Adjacency, source: Hashable, target: Hashable) -> SearchResult:
+    return _best_first(adj, source, target, lambda node: 0)
+
+
+def min_weight_per_pixel(adj: Adjacency, positions: Positions) -> float:
+    scale = float('inf')
+    for u, neighbors in adj.items():
+        ux, uy = positions[u]
+        for v, w in neighbors.items():
+            vx, vy = positions[v]
+            length = hypot(ux - vx, uy - vy)
+            if length == 0:
+                return 0.0
+            scale = min(scale, w / length)
+    return 0.0 if scale == float('inf') else max(scale, 0.0)
+
+
+def astar_search(adj: Adjacency, source: Hashable, target: Hashable,
+                 positions: Positions, weight_per_pixel: Optional[float] = None) -> SearchResult:
+    if weight_per_pixel is None:
+        weight_per_pixel = min_weight_per_pixel(adj, positions)
+    tx, ty = positions[target]
+
+    def heuristic(node: Hashable) -> float:
+        x, y = positions[node]
+        return weight_per_pixel * hypot(x - tx, y - ty)
+
+    return _best_first(adj, source, target, heuristic)
+
+
+def bidirectional_search(adj: Adjacency, source: Hashable, target: Hashable,
+                         reverse_adj: Adjacency = None) -> SearchResult:
+    if source == target:
+        return [source], 1
+    graphs = (adj, reverse_adj if reverse_adj is not None else adj)
+    distances = ({source: 0}, {target: 0})
+    previous = ({}, {})
+    settled = (set(), set())
+    tie = count()
+    queues = ([(0, next(tie), source)], [(0, next(tie), target)])
+    best = float('inf')
+    meeting = None
+
+    while queues[0] and queues[1]:
+        if queues[0][0][0] + queues[1][0][0] >= best:
+            break
+        side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+        other = 1 - side
+        current_distance, _, current = heappop(queues[side])
+        if current in settled[side]:
+            continue
+        settled[side].add(current)
+        for neighbor, weight in graphs[side][current].items():
+            distance = current_distance + weight
+            if distance < distances[side].get(neighbor, float('inf')):
+                distances[side][neighbor] = distance
+                previous[side][neighbor] = current
+                heappush(queues[side], (distance, next(tie), neighbor))
+            if neighbor in distances[other]:
+                total = distances[side][neighbor] + distances[other][neighbor]
+                if total < best:
+                    best, meeting = total, neighbor
+
+    count_settled = len(settled[0]) + len(settled[1])
+    if meeting is None:
+        return None, count_settled
+    forward = walk_back(previous[0], source, meeting)
+    backward = walk_back(previous[1], target, meeting)
+    backward.reverse()
+    return forward + backward[1:], count_settled
+
+
+def find_path(adj: Adjacency, source: Hashable, target: Hashable, strategy: str = "dijkstra",
+              positions: Positions = None, weight_per_pixel: Optional[float] = None) -> SearchResult:
+    if strategy == "bidirectional":
+        return bidirectional_search(adj, source, target)
+    if strategy == "astar":
+        return astar_search(adj, source, target, positions, weight_per_pixel)
+    return dijkstra_search(adj, source, target)
+
+
+def floyd_warshall_graph(graph: CompactGraph) -> Tuple["np.ndarray", "np.ndarray"]:
+    if np is None:
+        raise RuntimeError("NumPy is required for the all-pairs table")
+    n = len(graph)
+    rows = np.repeat(np.arange(n), np.diff(np.asarray(graph.indptr)))
+    cols = np.asarray(graph.indices, dtype=np.intp)
+
+    dist = np.full((n, n), np.inf)
+    np.minimum.at(dist, (rows, cols), np.asarray(graph.weights, dtype=float))
+    np.fill_diagonal(dist, 0)
+    pred = np.where(np.isfinite(dist), np.arange(n)[:, None], -1).astype(np.int32)
+    np.fill_diagonal(pred, -1)
+
+    for k in range(n):
+        via = dist[:, k, None] + dist[None, k, :]
+        better = via < dist
+        dist = np.where(better, via, dist)
+        pred = np.where(better, pred[k][None, :], pred)
+    return dist, pred
+
+
+def floyd_warshall(adj: Adjacency) -> Tuple[List[Hashable], "np.ndarray", "np.ndarray"]:
+    keys = list(adj.keys())
+    dist, pred = floyd_warshall_graph(CompactGraph.from_adjacency(adj, keys))
+    negative = np.flatnonzero(np.diag(dist) < 0)
+    if len(negative):
+        bellman_ford(adj, keys[negative[0]])
+        raise NegativeCycle([keys[negative[0]]])
+    return keys, dist, pred
+
+
+def table_path(pred: "np.ndarray", source: int, target: int) -> Optional[List[int]]:
+    if source == target:
+        return [source]
+    if pred[source, target] < 0:
+        return None
+    path = [target]
+    while path[-1] != source:
+        path.append(int(pred[source, path[-1]]))
+    path.reverse()
+    return path
+
+
+class PathService:
+    def __init__(self, graph: GraphModel, index: SpatialGrid, all_pairs: bool = False):
+        self.graph = graph
+        self.index = index
+        # all_pairs - отвечать на запросы по таблице Floyd-Warshall, пока граф не больше лимита
+        self.use_table = all_pairs and np is not None
+        self.version = -1
+        self.layout_version = -1
+        self.trees: Dict[Hashable, Tree] = {}
+        self.table = None
+        self.positions: Dict[Hashable, int] = {}
+        # зависят и от рёбер, и от координат вершин
+        self.scale: Optional[float] = None
+        self.comparisons: Dict[Tuple[Hashable, Hashable, Optional[float]], Dict[str, int]] = {}
+
+    def _sync(self):
+        if self.version != self.graph.version:
+            self.trees.clear()
+            self.table = None
+            self.version = self.graph.version
+            self.layout_version = -1
+        if self.layout_version != self.index.version:
+            self.scale = None
+            self.comparisons.clear()
+            self.layout_version = self.index.version
+
+    def algorithm(self) -> str:
+        self._sync()
+        return "bellman_ford" if self.graph.negative_edges else "dijkstra"
+
+    def tree(self, source: Hashable) -> Tree:
+        self._sync()
+        tree = self.trees.get(source)
+        if tree is None:
+            # граф неориентированный: отрицательное ребро в компоненте источника - уже
+            # отрицательный цикл, и Bellman-Ford сообщит о нём через NegativeCycle
+            if self.graph.negative_edges:
+                tree = bellman_ford(self.graph.adj, source)
+            else:
+                tree = dijkstra(self.graph.adj, source)
+            self.trees[source] = tree
+        return tree
+
+    def all_pairs(self):
+        self._sync()
+        if self.table is None:
+            if self.graph.node_count() > FLOYD_WARSHALL_LIMIT:
+                raise ValueError(f"All-pairs table is limited to {FLOYD_WARSHALL_LIMIT} nodes")
+            self.table = floyd_warshall(self.graph.adj)
+            self.positions = {k: i for i, k in enumerate(self.table[0])}
+        return self.table
+
+    def _table_ready(self) -> bool:
+        return (self.use_table and not self.graph.negative_edges
+                and self.graph.node_count() <= FLOYD_WARSHALL_LIMIT)
+
+    def distance(self, source: Hashable, target: Hashable) -> float:
+        if self._table_ready():
+            _, dist, _ = self.all_pairs()
+            return float(dist[self.positions[source], self.positions[target]])
+        return self.tree(source)[0].get(target, float('inf'))
+
+    def path(self, source: Hashable, target: Hashable) -> Optional[List[Hashable]]:
+        if source not in self.graph.adj or target not in self.graph.adj:
+            return None
+        if self._table_ready():
+            keys, _, pred = self.all_pairs()
+            path = table_path(pred, self.positions[source], self.positions[target])
+            return None if path is None else [keys[i] for i in path]
+        distances, previous = self.tree(source)
+        if target not in distances:
+            return None
+        return walk_back(previous, source, target)
+
+    def weight_per_pixel(self) -> float:
+        self._sync()
+        if self.scale is None:
+            self.scale = min_weight_per_pixel(self.graph.adj, self.index.positions)
+        return self.scale
+
+    def search(self, source: Hashable, target: Hashable, strategy: str,
+               weight_per_pixel: Optional[float] = None) -> Optional[List[Hashable]]:
+        if strategy == "dijkstra" or self.graph.negative_edges:
+            return self.path(source, target)
+        if weight_per_pixel is None:
+            weight_per_pixel = self.weight_per_pixel()
+        return find_path(self.graph.adj, source, target, strategy, self.index.positions, weight_per_pixel)[0]
+
+    def compare(self, source: Hashable, target: Hashable,
+                weight_per_pixel: Optional[float] = None) -> Dict[str, int]:
+        # повторный выбор той же пары не перезапускает три поиска
+        if self.graph.negative_edges:
+            return {}
+        if weight_per_pixel is None:
+            weight_per_pixel = self.weight_per_pixel()
+        key = (source, target, weight_per_pixel)
+        settled = self.comparisons.get(key)
+        if settled is None:
+            settled = self.comparisons[key] = {
+                strategy: find_path(self.graph.adj, source, target, strategy, self.index.positions,
+                                    weight_per_pixel)[1]
+                for strategy in STRATEGIES}
+        return settled
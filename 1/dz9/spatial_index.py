@@ -0,0 +1,90 @@
+from math import floor, hypot
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+Cell = Tuple[int, int]
+
+
+class SpatialGrid:
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells: Dict[Cell, Set[Hashable]] = {}
+        self.positions: Dict[Hashable, Tuple[float, float]] = {}
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _cell(self, x: float, y: float) -> Cell:
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def clear(self):
+        self.cells.clear()
+        self.positions.clear()
+        self.version += 1
+
+    def insert(self, key: Hashable, x: float, y: float):
+        if key in self.positions:
+            self.remove(key)
+        self.positions[key] = (x, y)
+        self.cells.setdefault(self._cell(x, y), set()).add(key)
+        self.version += 1
+
+    def remove(self, key: Hashable):
+        pos = self.positions.pop(key, None)
+        if pos is None:
+            return
+        self.version += 1
+        cell = self._cell(*pos)
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[cell]
+
+    def move(self, key: Hashable, x: float, y: float):
+        old = self.positions.get(key)
+        if old is None:
+            return
+        old_cell = self._cell(*old)
+        new_cell = self._cell(x, y)
+        self.positions[key] = (x, y)
+        self.version += 1
+        if old_cell != new_cell:
+            bucket = self.cells[old_cell]
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[old_cell]
+            self.cells.setdefault(new_cell, set()).add(key)
+
+    def query(self, x: float, y: float, radius: float) -> List[Hashable]:
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        found = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for key in self.cells.get((cx, cy), ()):
+                    px, py = self.positions[key]
+                    if hypot(px - x, py - y) < radius:
+                        found.append(key)
+        return found
+
+    def any_within(self, x: float, y: float, radius: float) -> bool:
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for key in self.cells.get((cx, cy), ()):
+                    px, py = self.positions[key]
+                    if hypot(px - x, py - y) < radius:
+                        return True
+        return False
+
+    def nearest(self, x: float, y: float, radius: float) -> Optional[Hashable]:
+        best = None
+        best_dist = radius
+        for key in self.query(x, y, radius):
+            px, py = self.positions[key]
+            dist = hypot(px - x, py - y)
+            if dist < best_dist:
+                best, best_dist = key, dist
+        return best
@@ -0,0 +1,305 @@
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from compact_graph import CompactGraph
+from matcher import CHECK_EVERY, Progress, SearchStats, SearchTimeout
+
+MODES = {
+    "isomorphism": "Isomorphism",
+    "induced": "Induced subgraph",
+    "subgraph": "Subgraph",
+}
+
+Bits = Dict[float, int]
+
+
+def _arcs(graph: CompactGraph) -> Tuple[List[Dict[int, float]], List[Dict[int, float]]]:
+    out = graph.adjacency()
+    into: List[Dict[int, float]] = [{} for _ in range(len(graph))]
+    for u, row in enumerate(out):
+        for v, w in row.items():
+            into[v][u] = w
+    return out, into
+
+
+def _bitsets(rows: List[Dict[int, float]]) -> Tuple[List[Bits], List[int]]:
+    # by_weight[x][w] - вершины, связанные с x дугой веса w
+    by_weight: List[Bits] = []
+    any_weight: List[int] = []
+    for row in rows:
+        bits: Bits = {}
+        union = 0
+        for v, w in row.items():
+            bits[w] = bits.get(w, 0) | (1 << v)
+            union |= 1 << v
+        by_weight.append(bits)
+        any_weight.append(union)
+    return by_weight, any_weight
+
+
+def _contains(big: Counter, small: Counter) -> bool:
+    return all(big[w] >= c for w, c in small.items())
+
+
+def initial_domains(g_out, g_in, m_out, m_in, induced: bool) -> List[int]:
+    m_profiles = [(Counter(m_out[v].values()), Counter(m_in[v].values()), m_out[v].get(v)) for v in range(len(m_out))]
+    domains = []
+    for u in range(len(g_out)):
+        out_u, in_u, loop = Counter(g_out[u].values()), Counter(g_in[u].values()), g_out[u].get(u)
+        bits = 0
+        for v, (out_v, in_v, loop_v) in enumerate(m_profiles):
+            if loop != loop_v and (induced or loop is not None):
+                continue
+            if _contains(out_v, out_u) and _contains(in_v, in_u):
+                bits |= 1 << v
+        domains.append(bits)
+    return domains
+
+
+def _support(bits: int, rows: List[Bits], w: float) -> int:
+    # вершины, связанные дугой веса w хотя бы с одной вершиной из bits
+    result = 0
+    while bits:
+        low = bits & -bits
+        bits ^= low
+        result |= rows[low.bit_length() - 1].get(w, 0)
+    return result
+
+
+def refine_domains(g_out, g_in, from_bits: List[Bits], into_bits: List[Bits], domains: List[int]) -> bool:
+    # уточнение Ульмана до неподвижной точки: v остаётся в D(u), только если у каждого
+    # соседа x вершины u есть кандидат среди соседей v с тем же весом дуги;
+    # False - какой-то домен опустел
+    queue = list(range(len(domains)))
+    queued = [True] * len(domains)
+    while queue:
+        u = queue.pop()
+        queued[u] = False
+        kept = domains[u]
+        for x, w in g_out[u].items():
+            if x != u:
+                kept &= _support(domains[x], into_bits, w)
+        for x, w in g_in[u].items():
+            if x != u:
+                kept &= _support(domains[x], from_bits, w)
+        if kept == domains[u]:
+            continue
+        if not kept:
+            return False
+        domains[u] = kept
+        for x in set(g_out[u]) | set(g_in[u]):
+            if not queued[x]:
+                queued[x] = True
+                queue.append(x)
+    return True
+
+
+def _next_vertex(domains: List[int], used: int, free: Iterable[int], links: List[int], degrees: List[int]) -> int:
+    # как в VF2++, но порядок динамический: сначала самый узкий домен (forward_check
+    # уже сузил его по расставленным соседям), затем больше расставленных соседей и степень
+    best, best_key = -1, None
+    for x in free:
+        key = (bin(domains[x] & ~used).count("1"), -links[x], -degrees[x])
+        if best_key is None or key < best_key:
+            best, best_key = x, key
+    return best
+
+
+def search_embeddings(g: CompactGraph, m: CompactGraph, induced: bool = False,
+                      timeout: Optional[float] = None, progress: Progress = None,
+                      stats: Optional[SearchStats] = None) -> Iterator[List[int]]:
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    n = len(g)
+    if n > len(m) or g.arc_count > m.arc_count:
+        if stats is not None:
+            stats.prune("size")
+        return
+    g_out, g_in = _arcs(g)
+    m_out, m_in = _arcs(m)
+    # into_bits[x][w]: вершины v с дугой v -> x веса w, from_bits - дуги x -> v
+    into_bits, into_any = _bitsets(m_in)
+    from_bits, from_any = _bitsets(m_out)
+
+    domains = initial_domains(g_out, g_in, m_out, m_in, induced)
+    if not all(domains) or not refine_domains(g_out, g_in, from_bits, into_bits, domains):
+        if stats is not None:
+            stats.prune("domains")
+        return
+    degrees = [len(g_out[u]) + len(g_in[u]) for u in range(n)]
+    # arcs[u]: (сосед, вес дуги u -> x или None, вес дуги x -> u или None)
+    arcs = [[(x, g_out[u].get(x), g_in[u].get(x)) for x in set(g_out[u]) | set(g_in[u]) if x != u]
+            for u in range(n)]
+    links = [0] * n
+    core = [-1] * n
+    free = list(range(n))
+    # нерасставленные вершины с расставленными соседями: следующая берётся из них,
+    # пока они есть, так что на больших разреженных образцах выбор не обходит все вершины
+    frontier = set()
+    used = 0
+
+    # trail[d]: (вершина, прежний домен) для доменов, суженных на глубине d
+    trail: List[List[Tuple[int, int]]] = [[] for _ in range(n)]
+
+    def undo(level: int):
+        changes = trail[level]
+        while changes:
+            x, bits = changes.pop()
+            domains[x] = bits
+
+    def forward_check(u: int, v: int) -> bool:
+        # домены нерасставленных соседей u сужаются до свободных соседей v, в индуцированном
+        # режиме домены не-соседей - до свободных не-соседей v; ни один не должен опустеть,
+        # а соседям u вместе должно хватать кандидатов (проверка остаточной степени)
+        changes = trail[depth]
+        out_v, in_v = from_bits[v], into_bits[v]
+        free_bits = ~(used | (1 << v))
+        not_out = ~from_any[v] if induced else -1
+        not_in = ~into_any[v] if induced else -1
+        needed = reach = 0
+        for x, w_out, w_in in arcs[u]:
+            if core[x] >= 0:
+                continue
+            bits = domains[x] & free_bits
+            bits &= not_out if w_out is None else out_v.get(w_out, 0)
+            bits &= not_in if w_in is None else in_v.get(w_in, 0)
+            if not bits:
+                return False
+            if bits != domains[x]:
+                changes.append((x, domains[x]))
+                domains[x] = bits
+            needed += 1
+            reach |= bits
+        if induced:
+            free_bits &= not_out & not_in
+            out_u, in_u = g_out[u], g_in[u]
+            for x in free:
+                if x != u and x not in out_u and x not in in_u:
+                    bits = domains[x] & free_bits
+                    if not bits:
+                        return False
+                    if bits != domains[x]:
+                        changes.append((x, domains[x]))
+                        domains[x] = bits
+        return needed <= 1 or bin(reach).count("1") >= needed
+
+    def place(u: int, v: int):
+        nonlocal used
+        core[u] = v
+        used |= 1 << v
+        free.remove(u)
+        frontier.discard(u)
+        for x, _, _ in arcs[u]:
+            links[x] += 1
+            if core[x] < 0:
+                frontier.add(x)
+
+    def unplace(u: int):
+        nonlocal used
+        used &= ~(1 << core[u])
+        core[u] = -1
+        free.append(u)
+        for x, _, _ in arcs[u]:
+            links[x] -= 1
+            if not links[x]:
+                frontier.discard(x)
+        if links[u]:
+            frontier.add(u)
+
+    chosen = [-1] * n
+    pending = [0] * n
+    depth = 0
+    steps = 0
+    reported = tried = backtracks = rejected = 0
+    if n:
+        chosen[0] = _next_vertex(domains, used, free, links, degrees)
+        pending[0] = domains[chosen[0]] & ~used
+    while depth >= 0:
+        if depth == n:
+            if stats is not None:
+                stats.record(steps - reported, tried, backtracks, [("forward check", rejected)])
+                reported, tried, backtracks, rejected = steps, 0, 0, 0
+            yield list(core)
+            depth -= 1
+            continue
+        steps += 1
+        if steps % CHECK_EVERY == 0:
+            if deadline is not None and time.monotonic() > deadline:
+                raise SearchTimeout(f"search exceeded {timeout} s")
+            if stats is not None:
+                stats.record(steps - reported, tried, backtracks, [("forward check", rejected)])
+                reported, tried, backtracks, rejected = steps, 0, 0, 0
+            if progress is not None:
+                progress(steps, depth)
+        u = chosen[depth]
+        if core[u] >= 0:
+            unplace(u)
+            undo(depth)
+        bits = pending[depth]
+        while bits:
+            low = bits & -bits
+            bits ^= low
+            v = low.bit_length() - 1
+            tried += 1
+            if forward_check(u, v):
+                break
+            undo(depth)
+            rejected += 1
+        else:
+            backtracks += 1
+            depth -= 1
+            continue
+        pending[depth] = bits
+        place(u, v)
+        depth += 1
+        if depth < n:
+            chosen[depth] = _next_vertex(domains, used, frontier or free, links, degrees)
+            pending[depth] = domains[chosen[depth]] & ~used
+    if stats is not None:
+        stats.record(steps - reported, tried, backtracks, [("forward check", rejected)])
+
+
+def _prepare(g: CompactGraph, m: CompactGraph,
+             strict_weights: bool = False) -> Tuple[CompactGraph, CompactGraph, bool]:
+    if g.is_unweighted() and not strict_weights:
+        m = m.with_unit_weights()
+    # если в матрице меньше вершин, чем на рисунке, вкладываем матрицу в рисунок
+    if len(g) > len(m):
+        return m, g, True
+    return g, m, False
+
+
+def _named(g: CompactGraph, m: CompactGraph, swapped: bool, mapping: List[int]) -> Dict[str, int]:
+    if swapped:
+        return {m.names[v]: u + 1 for u, v in enumerate(mapping)}
+    return {g.names[u]: v + 1 for u, v in enumerate(mapping)}
+
+
+def solve_subgraph(g: CompactGraph, m: CompactGraph, induced: bool = False, timeout: Optional[float] = None,
+                   progress: Progress = None, stats: Optional[SearchStats] = None,
+                   strict_weights: bool = False) -> Optional[Dict[str, int]]:
+    pattern, target, swapped = _prepare(g, m, strict_weights)
+    mapping = next(search_embeddings(pattern, target, induced, timeout, progress, stats), None)
+    if mapping is None:
+        return None
+    return _named(pattern, target, swapped, mapping)
+
+
+def enumerate_embeddings(g: CompactGraph, m: CompactGraph, induced: bool = False, limit: int = 100,
+                         timeout: Optional[float] = None, progress: Progress = None,
+                         stats: Optional[SearchStats] = None,
+                         strict_weights: bool = False) -> Tuple[int, bool, List[Dict[str, int]]]:
+    pattern, target, swapped = _prepare(g, m, strict_weights)
+    sample = []
+    total = 0
+    exact = True
+    try:
+        for mapping in search_embeddings(pattern, target, induced, timeout, progress, stats):
+            total += 1
+            if len(sample) < limit:
+                sample.append(_named(pattern, target, swapped, mapping))
+    except SearchTimeout:
+        if not total:
+            raise
+        exact = False
+    return total, exact, sample
@@ -0,0 +1,68 @@
+import json
+import random
+
+import batch
+import graph_io
+
+
+def write_exercise(path, edges, matrix):
+    names = sorted({name for u, v, _ in edges for name in (u, v)})
+    data = {
+        "graph": {
+            "nodes": [{"id": i, "name": name} for i, name in enumerate(names)],
+            "edges": [{"u": names.index(u), "v": names.index(v), "w": str(w)} for u, v, w in edges],
+        },
+        "matrix": matrix,
+    }
+    path.write_text(json.dumps(data), encoding='utf-8')
+    return str(path)
+
+
+def test_run_task_path(tmp_path):
+    file_path = write_exercise(tmp_path / "task.json", [("A", "B", 2), ("B", "C", 3), ("A", "C", 7)],
+                               [["", "2", "7"], ["2", "", "3"], ["7", "3", ""]])
+    result = batch.run_task(file_path, [("A", "C"), ("A", "X")], timeout=5)
+    assert result["status"] == "ok"
+    assert result["paths"][0] == {"from": "A", "to": "C", "path": ["A", "B", "C"], "length": 5}
+    assert result["paths"][1]["path"] is None
+
+
+def test_run_task_path_negative_cycle(tmp_path):
+    # в неориентированном графе отрицательное ребро - уже отрицательный цикл
+    file_path = write_exercise(tmp_path / "task.json", [("A", "B", -1), ("B", "C", 3)],
+                               [["", "-1", ""], ["-1", "", "3"], ["", "3", ""]])
+    result = batch.run_task(file_path, [("A", "C")], timeout=5)
+    assert result["status"] != "error", result.get("error")
+    query = result["paths"][0]
+    assert query["path"] is None
+    assert set(query["negative_cycle"]) == {"A", "B"}
+
+
+def test_run_task_paths_from_table(tmp_path):
+    # несколько запросов решаются таблицей Floyd-Warshall, длины - как у Dijkstra
+    rng = random.Random(5)
+    names = [f"N{i}" for i in range(40)]
+    edges = {}
+    for _ in range(90):
+        u, v = rng.sample(names, 2)
+        edges[tuple(sorted((u, v)))] = rng.randint(1, 9)
+    file_path = write_exercise(tmp_path / "task.json", [(u, v, w) for (u, v), w in edges.items()], [])
+    queries = [tuple(rng.sample(names, 2)) for _ in range(20)]
+    table = batch.run_task(file_path, queries, timeout=5)["paths"]
+    single = [batch.run_task(file_path, [query], timeout=5)["paths"][0] for query in queries]
+    assert [q["length"] for q in table] == [q["length"] for q in single]
+    for query in table:
+        if query["path"]:
+            assert query["path"][0] == query["from"] and query["path"][-1] == query["to"]
+
+
+def test_compare_graphs_weights_are_symmetric():
+    # невзвешенный эталон не принимает взвешенную работу той же формы, и наоборот
+    names = ["A", "B", "C"]
+    plain = graph_io.build_graph(names, [0, 1], [1, 2], [1, 1])
+    weighted = graph_io.build_graph(names, [0, 1], [1, 2], [2, 5])
+    for mode in ("isomorphism", "subgraph"):
+        assert batch.compare_graphs(plain, weighted, mode) is None
+        assert batch.compare_graphs(weighted, plain, mode) is None
+        assert batch.compare_graphs(plain, plain, mode) is not None
+        assert batch.compare_graphs(weighted, weighted, mode) is not None
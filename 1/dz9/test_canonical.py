@@ -0,0 +1,160 @@
+import itertools
+import random
+import threading
+
+import pytest
+
+import canonical
+import matcher
+from compact_graph import CompactGraph
+from result_cache import ResultCache
+
+
+def make_graph(n, edges, weights=None, perm=None):
+    perm = perm or list(range(n))
+    adj = {i: {} for i in range(n)}
+    for k, (u, v) in enumerate(edges):
+        w = weights[k] if weights else 1
+        adj[perm[u]][perm[v]] = adj[perm[v]][perm[u]] = w
+    return CompactGraph.from_adjacency(adj, names=[f"N{i}" for i in range(n)])
+
+
+def shuffled(n, edges, rng, weights=None):
+    perm = list(range(n))
+    rng.shuffle(perm)
+    return make_graph(n, edges, weights, perm)
+
+
+PETERSEN = (10, [(i, (i + 1) % 5) for i in range(5)] + [(5 + i, 5 + (i + 2) % 5) for i in range(5)]
+            + [(i, i + 5) for i in range(5)])
+CUBE = (8, [(u, u ^ b) for u in range(8) for b in (1, 2, 4) if u < u ^ b])
+K33 = (6, [(u, v) for u in range(3) for v in range(3, 6)])
+PRISM = (6, [(0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3), (0, 3), (1, 4), (2, 5)])
+CYCLE6 = (6, [(i, (i + 1) % 6) for i in range(6)])
+TRIANGLES = (6, [(0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3)])
+
+
+@pytest.mark.parametrize("n, edges", [PETERSEN, CUBE, K33, PRISM])
+def test_shuffled_copies_have_equal_forms(n, edges):
+    rng = random.Random(n)
+    weights = [rng.randint(1, 3) for _ in edges]
+    for w in (None, weights):
+        forms = [canonical.canonical_form(shuffled(n, edges, rng, w)) for _ in range(4)]
+        assert len({form.certificate for form in forms}) == 1
+
+
+@pytest.mark.parametrize("first, second", [(K33, PRISM), (CYCLE6, TRIANGLES)])
+def test_same_degrees_different_forms(first, second):
+    # одинаковые последовательности степеней, но графы не изоморфны
+    assert canonical.canonical_form(make_graph(*first)).certificate != \
+        canonical.canonical_form(make_graph(*second)).certificate
+
+
+@pytest.mark.parametrize("graph, size", [(PETERSEN, 120), (CUBE, 48), (K33, 72), (PRISM, 12), (CYCLE6, 12)])
+def test_group_size(graph, size):
+    assert canonical.canonical_form(make_graph(*graph)).group_size == size
+
+
+def brute_force(g, m):
+    # изоморфизм с учётом весов; невзвешенный g сравнивается с m без весов, как в solve_graphs
+    g_adj, m_adj = g.adjacency(), m.adjacency()
+    plain = g.is_unweighted()
+    for perm in itertools.permutations(range(len(g))):
+        if all({perm[v]: 1 if plain else w for v, w in g_adj[u].items()} ==
+               {v: 1 if plain else w for v, w in m_adj[perm[u]].items()} for u in range(len(g))):
+            return True
+    return False
+
+
+def is_isomorphism(g, m, mapping):
+    pos = {name: i - 1 for name, i in mapping.items()}
+    plain = g.is_unweighted()
+    return sorted(pos.values()) == list(range(len(m))) and all(
+        {pos[g.names[v]]: 1 if plain else w for v, w in g.adjacency()[u].items()} ==
+        {v: 1 if plain else w for v, w in m.adjacency()[pos[g.names[u]]].items()} for u in range(len(g)))
+
+
+def test_solve_graphs_with_cache_agrees_with_brute_force():
+    rng = random.Random(3)
+    cache = ResultCache()
+    for _ in range(150):
+        n = rng.randint(1, 6)
+        edges = [e for e in itertools.combinations(range(n), 2) if rng.random() < 0.5]
+        weights = [rng.randint(1, 2) for _ in edges] if rng.random() < 0.5 else None
+        g = make_graph(n, edges, weights)
+        if rng.random() < 0.5:
+            m = shuffled(n, edges, rng, weights)
+        else:
+            other = [e for e in itertools.combinations(range(n), 2) if rng.random() < 0.5]
+            m = shuffled(n, other, rng, [rng.randint(1, 2) for _ in other] if weights else None)
+        expected = brute_force(g, m)
+        for mapping in (matcher.solve_graphs(g, m), matcher.solve_graphs(g, m, cache=cache)):
+            assert (mapping is not None) == expected
+            if mapping is not None:
+                assert is_isomorphism(g, m, mapping)
+
+
+def test_cached_forms_shared_between_threads(monkeypatch):
+    # маленький кэш, чтобы потоки постоянно вытесняли записи друг друга
+    monkeypatch.setattr(canonical, "FORM_CACHE_SIZE", 2)
+    monkeypatch.setattr(canonical, "_forms", canonical.OrderedDict())
+    graphs = [make_graph(n, edges) for n, edges in (PETERSEN, CUBE, K33, PRISM, CYCLE6, TRIANGLES)]
+    expected = [canonical.canonical_form(g).certificate for g in graphs]
+    errors = []
+
+    def work(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(300):
+                i = rng.randrange(len(graphs))
+                assert canonical.cached_canonical_form(graphs[i]).certificate == expected[i]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(seed,)) for seed in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(canonical._forms) <= 2
+
+
+def random_cubic(n, rng):
+    # модель паросочетаний: повторяем, пока не выйдет простой граф
+    while True:
+        points = [u for u in range(n) for _ in range(3)]
+        rng.shuffle(points)
+        edges = {tuple(sorted(points[i:i + 2])) for i in range(0, len(points), 2)}
+        if len(edges) == 3 * n // 2 and all(u != v for u, v in edges):
+            return sorted(edges)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_solve_graphs_cubic_12(seed):
+    # у кубического графа все степени равны, различать вершины приходится перебором
+    rng = random.Random(seed)
+    edges = random_cubic(12, rng)
+    g, m = make_graph(12, edges), shuffled(12, edges, rng)
+    mapping = matcher.solve_graphs(g, m, timeout=2)
+    assert mapping is not None and is_isomorphism(g, m, mapping)
+
+
+def test_solve_graphs_weight_mismatch():
+    # те же рёбра и тот же набор весов, но веса переставлены так, что графы не изоморфны
+    rng = random.Random(1)
+    edges = random_cubic(12, rng)
+    weights = [1] * 6 + [2] * 6 + [3] * 6
+    g = make_graph(12, edges, weights)
+    changed = list(weights)
+    while canonical.canonical_form(make_graph(12, edges, changed)).certificate == \
+            canonical.canonical_form(g).certificate:
+        rng.shuffle(changed)
+    assert matcher.solve_graphs(g, shuffled(12, edges, rng, changed), timeout=2) is None
+
+
+def test_solve_graphs_returns_names_and_positions():
+    # ключи - имена вершин рисунка, значения - номера строк матрицы с единицы
+    g = CompactGraph.from_adjacency({0: {1: 5}, 1: {0: 5, 2: 7}, 2: {1: 7}}, names=["A", "B", "C"])
+    m = CompactGraph.from_adjacency({0: {1: 7}, 1: {0: 7, 2: 5}, 2: {1: 5}}, names=["1", "2", "3"])
+    assert matcher.solve_graphs(g, m) == {"A": 3, "B": 2, "C": 1}
@@ -0,0 +1,81 @@
+import random
+
+import matcher
+from compact_graph import CompactGraph
+
+
+def make_graph(n, edges, perm=None):
+    perm = perm or list(range(n))
+    adj = {i: {} for i in range(n)}
+    for u, v in edges:
+        adj[perm[u]][perm[v]] = adj[perm[v]][perm[u]] = 1
+    return CompactGraph.from_adjacency(adj, names=[f"N{i}" for i in range(n)])
+
+
+def disjoint(*parts):
+    # parts - (число вершин, рёбра); вершины частей нумеруются подряд
+    edges, start = [], 0
+    for n, part in parts:
+        edges += [(start + u, start + v) for u, v in part]
+        start += n
+    return start, edges
+
+
+def cycle(n):
+    return n, [(i, (i + 1) % n) for i in range(n)]
+
+
+def grid(rows, cols):
+    return rows * cols, [(r * cols + c, r * cols + c + d) for r in range(rows) for c in range(cols)
+                         for d in (1, cols) if (d == 1 and c + 1 < cols) or (d == cols and r + 1 < rows)]
+
+
+CUBE = 8, [(u, u ^ b) for u in range(8) for b in (1, 2, 4) if u < u ^ b]
+WAGNER = 8, cycle(8)[1] + [(i, i + 4) for i in range(4)]
+
+
+def solve_shuffled(n, edges, seed, **kwargs):
+    perm = list(range(n))
+    random.Random(seed).shuffle(perm)
+    g, m = make_graph(n, edges), make_graph(n, edges, perm)
+    mapping = matcher.solve_graphs(g, m, **kwargs)
+    assert mapping is not None
+    pos = [mapping[name] - 1 for name in g.names]
+    assert sorted(pos) == list(range(n))
+    m_adj = m.adjacency()
+    assert all(pos[v] in m_adj[pos[u]] for u, row in enumerate(g.adjacency()) for v in row)
+
+
+def test_components_assembled_into_one_mapping():
+    # две одинаковые компоненты, одна другая и изолированная вершина
+    solve_shuffled(*disjoint(cycle(5), grid(2, 3), cycle(5), (1, [])), seed=1)
+
+
+def test_same_sizes_different_shapes():
+    # куб и граф Вагнера: 3-регулярны, без треугольников и с одинаковыми ключами вершин,
+    # различает их только спектр компоненты
+    g = make_graph(*disjoint(CUBE, CUBE))
+    m = make_graph(*disjoint(CUBE, WAGNER))
+    stats = matcher.SearchStats()
+    assert matcher.match_components(g, m, stats=stats) is None
+    assert stats.pruned == {"spectrum": 1}
+    assert matcher.solve_graphs(g, m) is None
+
+
+class RecordingPool(matcher.ProcessPoolExecutor):
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        RecordingPool.created += 1
+        super().__init__(*args, **kwargs)
+
+
+def test_large_components_solved_in_parallel(monkeypatch):
+    monkeypatch.setattr(matcher, "COMPONENT_WORKERS", 2)
+    monkeypatch.setattr(matcher, "ProcessPoolExecutor", RecordingPool)
+    size = matcher.PARALLEL_COMPONENT_SIZE
+    stats = matcher.SearchStats()
+    solve_shuffled(*disjoint(grid(size // 10, 10), cycle(size), cycle(5)), seed=2, stats=stats)
+    assert RecordingPool.created == 1
+    # счётчики из процессов-исполнителей сложены в общие
+    assert stats.nodes >= 2 * size
@@ -0,0 +1,53 @@
+from consistency import ConsistencyTracker, MultisetDiff
+
+
+def triangle(side, weights=(1, 1, 1)):
+    # каждое ребро - две дуги, у каждой вершины степень 2
+    side.load([2, 2, 2], [w for w in weights for _ in range(2)])
+
+
+def test_multiset_diff_counts_mismatched_keys():
+    diff = MultisetDiff()
+    diff.add("a", 2)
+    diff.add("b", -1)
+    assert diff.mismatched == 2
+    diff.add("a", -2)
+    diff.add("b", 1)
+    assert diff.mismatched == 0 and diff.diff == {}
+
+
+def test_remove_and_readd_arc():
+    tracker = ConsistencyTracker()
+    triangle(tracker.scene)
+    triangle(tracker.matrix)
+    assert tracker.mismatch() is None
+    # клетка (0, 2) матрицы стирается: две дуги, у вершин 0 и 2 степень падает до 1
+    tracker.matrix.remove_arc(2, 1)
+    tracker.matrix.remove_arc(2, 1)
+    assert tracker.mismatch() == "edge counts differ"
+    tracker.matrix.add_arc(1, 1)
+    tracker.matrix.add_arc(1, 1)
+    assert tracker.mismatch() is None
+
+
+def test_weights_ignored_for_unit_drawing():
+    tracker = ConsistencyTracker()
+    triangle(tracker.scene)
+    triangle(tracker.matrix, (2, 3, 4))
+    assert tracker.mismatch() is None
+    tracker.scene.change_weight(1, 3, arcs=2)
+    assert tracker.mismatch() == "edge weights differ"
+    tracker.scene.change_weight(1, 2, arcs=2)
+    tracker.scene.change_weight(1, 4, arcs=2)
+    assert tracker.mismatch() is None
+
+
+def test_listener_called_once_per_check():
+    calls = []
+    tracker = ConsistencyTracker(lambda: calls.append(1))
+    triangle(tracker.scene)
+    tracker.matrix.add_vertex()
+    assert len(calls) == 1
+    tracker.mismatch()
+    tracker.matrix.add_vertex()
+    assert len(calls) == 2
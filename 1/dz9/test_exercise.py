@@ -0,0 +1,107 @@
+import gzip
+import json
+import struct
+
+import numpy as np
+import pytest
+
+import exercise
+import graph_io
+from compact_graph import CompactGraph
+
+NAMES = ["A", "B", "Вершина", "D"]
+POSITIONS = np.array([[0.0, 0.0], [120.5, 40.0], [-3.25, 200.0], [60.0, 60.0]])
+EDGES = [(0, 1), (1, 2), (0, 2)]
+WEIGHTS = [2, 1.5, 1]
+LABELED = [True, True, False]
+
+
+def write_binary(path, matrix):
+    exercise.write_exercise_binary(str(path), NAMES, POSITIONS, EDGES, WEIGHTS, LABELED, matrix, node_counter=7)
+    return str(path)
+
+
+@pytest.mark.parametrize("suffix", [".dz9", ".dz9.gz"])
+@pytest.mark.parametrize("matrix", [
+    np.array([[0, 2, 1, 0], [2, 0, 0, 0], [1, 0, 0, -300], [0, 0, -300, 0]]),
+    np.array([[0, 2.5, 0, 0], [2.5, 0, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]]),
+    np.zeros((0, 0)),
+])
+def test_binary_round_trip(tmp_path, suffix, matrix):
+    data = exercise.read_exercise_binary(write_binary(tmp_path / f"task{suffix}", matrix))
+    assert data["names"] == NAMES
+    assert np.array_equal(data["positions"], POSITIONS)
+    assert data["edges"].tolist() == [list(e) for e in EDGES]
+    assert data["weights"].tolist() == WEIGHTS
+    assert data["labeled"].tolist() == LABELED
+    assert np.array_equal(data["matrix"], matrix)
+    assert data["node_counter"] == 7
+
+
+def test_binary_graphs_match_json(tmp_path):
+    matrix = np.array([[0, 2, 1, 0], [2, 0, 1.5, 0], [1, 1.5, 0, 0], [0, 0, 0, 0]])
+    binary = exercise.read_exercise_graphs(write_binary(tmp_path / "task.dz9", matrix))
+    text = {
+        "graph": {"nodes": [{"id": i, "name": name} for i, name in enumerate(NAMES)],
+                  "edges": [{"u": u, "v": v, "w": str(w) if labeled else ""}
+                            for (u, v), w, labeled in zip(EDGES, WEIGHTS, LABELED)]},
+        "matrix": [[str(v) if v else "" for v in row] for row in matrix.tolist()],
+    }
+    (tmp_path / "task.json").write_text(json.dumps(text), encoding='utf-8')
+    json_graphs = exercise.read_exercise_graphs(str(tmp_path / "task.json"))
+    for a, b in zip(binary, json_graphs):
+        assert named_adjacency(a) == named_adjacency(b)
+
+
+def test_binary_rejects_newer_version(tmp_path):
+    path = write_binary(tmp_path / "task.dz9", np.zeros((0, 0)))
+    with open(path, 'r+b') as f:
+        f.seek(len(exercise.MAGIC))
+        f.write(struct.pack("<H", exercise.BINARY_VERSION + 1))
+    with pytest.raises(ValueError, match="version"):
+        exercise.read_exercise_binary(path)
+
+
+def test_binary_rejects_other_files(tmp_path):
+    path = tmp_path / "task.dz9.gz"
+    with gzip.open(path, 'wb') as f:
+        f.write(b'{"graph": {}}')
+    with pytest.raises(ValueError, match="not a binary exercise"):
+        exercise.read_exercise_binary(str(path))
+
+
+def named_adjacency(graph: CompactGraph) -> dict:
+    adj = graph.adjacency()
+    return {graph.names[u]: {graph.names[v]: w for v, w in adj[u].items()} for u in range(len(graph))}
+
+
+@pytest.mark.parametrize("fmt, suffix", [
+    ("edgelist", ".txt"), ("edgelist", ".el.gz"), ("graphml", ".graphml"), ("graphml", ".graphml.gz"),
+])
+def test_graph_io_round_trip(tmp_path, fmt, suffix):
+    # вершина без рёбер и дробный вес тоже должны вернуться
+    graph = graph_io.build_graph(["a", "b", "c", "lonely"], [0, 1, 0], [1, 2, 2], [2.0, 1.5, 7.0])
+    path = str(tmp_path / f"graph{suffix}")
+    graph_io.write_graph(path, graph, fmt)
+    assert named_adjacency(graph_io.read_graph(path)) == named_adjacency(graph)
+
+
+def test_graph_io_dimacs_round_trip(tmp_path):
+    # DIMACS хранит только номера вершин 1..n
+    graph = graph_io.build_graph(["1", "2", "3", "4"], [0, 1, 0], [1, 2, 2], [2, 3, 7])
+    path = str(tmp_path / "graph.gr")
+    graph_io.write_graph(path, graph)
+    assert named_adjacency(graph_io.read_graph(path)) == named_adjacency(graph)
+
+
+@pytest.mark.parametrize("name, text", [
+    ("bad.txt", "a b x\n"),
+    ("bad.gr", "p sp 2 1\nq 1 2 3\n"),
+    ("bad.graphml", "<graphml><graph><node id='a'/>"),
+    ("bad.txt", "a b nan\n"),
+])
+def test_graph_io_rejects_malformed(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    with pytest.raises(ValueError):
+        graph_io.read_graph(str(path))
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+import invariants
+import matcher
+from compact_graph import CompactGraph
+
+
+def make_graph(n, arcs, perm=None, directed=False):
+    perm = perm or list(range(n))
+    adj = {i: {} for i in range(n)}
+    for u, v, w in arcs:
+        adj[perm[u]][perm[v]] = w
+        if not directed:
+            adj[perm[v]][perm[u]] = w
+    return CompactGraph.from_adjacency(adj, names=[f"N{i}" for i in range(n)])
+
+
+def cycles(*lengths):
+    edges, start = [], 0
+    for k in lengths:
+        edges += [(start + i, start + (i + 1) % k, 1) for i in range(k)]
+        start += k
+    return edges
+
+
+PRISM = cycles(3, 3) + [(0, 3, 1), (1, 4, 1), (2, 5, 1)]
+K33 = [(u, v, 1) for u in range(3) for v in range(3, 6)]
+CUBE = [(u, u ^ b, 1) for u in range(8) for b in (1, 2, 4) if u < u ^ b]
+WAGNER = cycles(8) + [(i, i + 4, 1) for i in range(4)]
+
+
+@pytest.mark.parametrize("n, first, second, reason", [
+    (6, cycles(6), cycles(3, 3), "triangle counts"),
+    (6, K33, PRISM, "triangle counts"),
+    (8, cycles(8), cycles(4, 4), "component sizes"),
+    (8, CUBE, WAGNER, "spectrum"),
+])
+def test_equal_degrees_rejected_before_search(n, first, second, reason):
+    # все вершины одной степени, графы отличаются только инвариантами посложнее
+    g, m = make_graph(n, first), make_graph(n, second)
+    assert invariants.compare(g, m)[0] == reason
+    stats = matcher.SearchStats()
+    assert matcher.solve_graphs(g, m, stats=stats) is None
+    assert stats.nodes == 0
+    assert stats.pruned == {reason: 1}
+
+
+def random_arcs(n, p, rng, directed, weights):
+    return [(u, v, rng.choice(weights)) for u in range(n) for v in range(n)
+            if (directed and u != v or u < v) and rng.random() < p]
+
+
+@pytest.mark.parametrize("chunk", [invariants.TRIANGLE_CHUNK, 7])
+def test_relabelled_graphs_never_rejected(monkeypatch, chunk):
+    # мелкие порции проверяют склейку triangle_counts по кускам
+    monkeypatch.setattr(invariants, "TRIANGLE_CHUNK", chunk)
+    rng = random.Random(chunk)
+    for _ in range(60):
+        n = rng.randint(1, 40)
+        directed = rng.random() < 0.3
+        arcs = random_arcs(n, rng.choice([0.05, 0.2, 0.6, 0.95]), rng, directed, rng.choice([(1,), (1, 2, 5)]))
+        perm = list(range(n))
+        rng.shuffle(perm)
+        g, m = make_graph(n, arcs, directed=directed), make_graph(n, arcs, perm, directed)
+        reason, seeds = invariants.compare(g, m)
+        assert reason is None
+        g_keys, m_keys = seeds
+        assert all(g_keys[u] == m_keys[perm[u]] for u in range(n))
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import layout
+
+
+def positions(kind, n, rng):
+    if kind == "uniform":
+        return rng.uniform(0, 1000, (n, 2))
+    if kind == "clusters":
+        # плотные скопления, как у сообществ графа после раскладки
+        centers = rng.uniform(0, 1000, (4, 2))
+        return np.concatenate([rng.normal(c, 15, (n // 4, 2)) for c in centers])
+    # часть вершин в одной точке, как после вставки без раскладки
+    pos = rng.uniform(0, 1000, (n, 2))
+    pos[:n // 10] = pos[0]
+    return pos
+
+
+@pytest.mark.parametrize("kind", ["uniform", "clusters", "coincident"])
+@pytest.mark.parametrize("n", [50, 600])
+def test_barnes_hut_close_to_exact(kind, n):
+    rng = np.random.default_rng(n)
+    pos = positions(kind, n, rng)
+    exact = layout.repulsion_exact(pos, 100.0)
+    for theta, tolerance in ((layout.BARNES_HUT_THETA, 0.05), (0.3, 0.005)):
+        approx = layout.repulsion_barnes_hut(pos, 100.0, theta)
+        assert np.linalg.norm(approx - exact) <= tolerance * np.linalg.norm(exact)
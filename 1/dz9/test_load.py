@@ -0,0 +1,198 @@
+import json
+import os
+import random
+import time
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+
+import graph_io
+import main
+
+LOAD_NODES = 2000
+LOAD_TIME_LIMIT = 10.0
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def write_exercise(path, n, rng):
+    # разреженный граф со средней степенью около 3 и матрица того же графа
+    edges = {(u, v) for u, v in (sorted(rng.sample(range(n), 2)) for _ in range(3 * n // 2))}
+    matrix = [[""] * n for _ in range(n)]
+    for u, v in edges:
+        matrix[u][v] = matrix[v][u] = "1"
+    side = int(n ** 0.5) + 1
+    data = {
+        "graph": {
+            "nodes": [{"id": i, "name": str(i + 1), "x": 60.0 * (i % side), "y": 60.0 * (i // side)}
+                      for i in range(n)],
+            "edges": [{"u": u, "v": v, "w": ""} for u, v in sorted(edges)],
+            "node_counter": n,
+        },
+        "matrix": matrix,
+    }
+    path.write_text(json.dumps(data), encoding='utf-8')
+    return str(path), len(edges)
+
+
+def test_load_exercise_2000_nodes(app, tmp_path, monkeypatch):
+    file_path, edge_count = write_exercise(tmp_path / "big.json", LOAD_NODES, random.Random(0))
+    window = main.MainWindow()
+    monkeypatch.setattr(main.QFileDialog, "getOpenFileName", lambda *args, **kwargs: (file_path, ""))
+    monkeypatch.setattr(main.QMessageBox, "critical", lambda *args: pytest.fail(args[-1]))
+
+    started = time.perf_counter()
+    window.load_exercise()
+    app.processEvents()
+    elapsed = time.perf_counter() - started
+
+    assert window.graph_manager.get_node_count() == LOAD_NODES
+    assert window.graph_manager.graph.edge_count == edge_count
+    assert window.matrix_widget.matrix_model.rowCount() == LOAD_NODES
+    assert elapsed < LOAD_TIME_LIMIT, f"loading {LOAD_NODES} nodes took {elapsed:.1f} s"
+
+
+def grid_graph(side):
+    edges = [(r * side + c, r * side + c + 1) for r in range(side) for c in range(side - 1)]
+    edges += [(r * side + c, (r + 1) * side + c) for r in range(side - 1) for c in range(side)]
+    return graph_io.build_graph([str(i + 1) for i in range(side * side)],
+                                [u for u, _ in edges], [v for _, v in edges], [1] * len(edges))
+
+
+TRIANGLE = np.array([[0, 2, 3], [2, 0, 4], [3, 4, 0]], dtype=float)
+
+
+def test_generate_from_matrix_replaces_data_graph(app):
+    window = main.MainWindow()
+    window.set_data_graph(grid_graph(10), "grid.txt")
+    window.matrix_widget.matrix_model.set_matrix(TRIANGLE.copy())
+
+    window.generate_from_matrix()
+
+    assert window.data_graph is None
+    assert window.data_graph_label.text() == ""
+    assert len(window.current_graph()) == 3
+    assert window.current_graph().arc_count == 6
+
+
+def test_generate_from_matrix_stops_import(app):
+    window = main.MainWindow()
+    window.populate_scene(grid_graph(40))
+    window.import_tick()
+    window.matrix_widget.matrix_model.set_matrix(TRIANGLE.copy())
+
+    window.generate_from_matrix()
+
+    assert window.import_job is None
+    assert window.graph_manager.bulk_depth == 0
+    assert window.graph_manager.get_node_count() == 3
+    assert np.array_equal(window.matrix_widget.get_matrix(), TRIANGLE)
+
+
+def test_import_tick_error_ends_import(app, monkeypatch):
+    window = main.MainWindow()
+    errors = []
+    monkeypatch.setattr(main.QMessageBox, "critical", lambda *args: errors.append(args[-1]))
+    window.populate_scene(grid_graph(40))
+    window.import_tick()
+    window.graph_manager.delete_item(window.graph_manager.get_nodes()[0])
+
+    for _ in range(100):
+        if window.import_job is None:
+            break
+        window.import_tick()
+
+    assert window.import_job is None
+    assert window.graph_manager.bulk_depth == 0
+    assert len(errors) == 1
+
+
+@pytest.mark.parametrize("suffix", [".json", ".json.gz", ".dz9", ".dz9.gz"])
+def test_save_and_load_round_trip(app, tmp_path, monkeypatch, suffix):
+    # целые, дробные и пустые веса рёбер, дробные координаты и матрица с дробями
+    file_path = str(tmp_path / f"task{suffix}")
+    monkeypatch.setattr(main.QFileDialog, "getSaveFileName", lambda *args, **kwargs: (file_path, ""))
+    monkeypatch.setattr(main.QFileDialog, "getOpenFileName", lambda *args, **kwargs: (file_path, ""))
+    monkeypatch.setattr(main.QMessageBox, "critical", lambda *args: pytest.fail(args[-1]))
+    matrix = np.array([[0, 2, 0], [2, 0, 1.5], [0, 1.5, 0]])
+
+    window = main.MainWindow()
+    manager = window.graph_manager
+    a = manager.create_node(main.QPointF(10.5, 20.0), "A")
+    b = manager.create_node(main.QPointF(200.0, 40.25), "B")
+    c = manager.create_node(main.QPointF(90.0, 300.0), "C")
+    manager.create_edge(a, b, "2")
+    manager.create_edge(b, c, "1.5")
+    manager.create_edge(a, c, "")
+    window.matrix_widget.matrix_model.set_matrix(matrix.copy())
+    window.save_exercise()
+
+    loaded = main.MainWindow()
+    loaded.load_exercise()
+
+    def snapshot(w):
+        nodes = {n.name: (n.pos().x(), n.pos().y()) for n in w.graph_manager.get_nodes()}
+        edges = {(e.source.name, e.dest.name, e.weight) for n in w.graph_manager.get_nodes() for e in n.edges}
+        return nodes, edges, w.graph_manager.node_counter
+
+    assert snapshot(loaded) == snapshot(window)
+    assert np.array_equal(loaded.matrix_widget.get_matrix(), matrix)
+
+
+def test_consistency_label_follows_matrix_edits(app):
+    window = main.MainWindow()
+    manager = window.graph_manager
+    a, b, c = (manager.create_node(main.QPointF(80.0 * i, 0.0)) for i in range(3))
+    for u, v in ((a, b), (b, c), (a, c)):
+        manager.create_edge(u, v)
+    model = window.matrix_widget.matrix_model
+
+    def edit(row, col, text):
+        model.setData(model.index(row, col), text)
+        app.processEvents()
+        return window.consistency_label.text()
+
+    fits, differ = "Matrix fits the drawing so far", "No match possible: edge counts differ"
+    edit(0, 1, "1")
+    # рисунок без весов: веса матрицы не учитываются
+    assert [edit(1, 2, "7"), edit(0, 2, "5"), edit(0, 2, ""), edit(0, 2, "2")] == [differ, fits, differ, fits]
+    a.edges[0].set_weight("3")
+    app.processEvents()
+    assert window.consistency_label.text() == "No match possible: edge weights differ"
+
+
+def test_graph_solver_solve_returns_matrix_rows(app):
+    window = main.MainWindow()
+    manager = window.graph_manager
+    a, b, c = (manager.create_node(main.QPointF(80.0 * i, 0.0), name) for i, name in enumerate("ABC"))
+    manager.create_edge(a, b, "4")
+    manager.create_edge(b, c, "2")
+    manager.create_edge(a, c, "3")
+    # {имя вершины: номер строки матрицы с единицы}
+    assert main.GraphSolver.solve(manager.graph, TRIANGLE.copy()) == {"A": 3, "B": 2, "C": 1}
+    assert main.GraphSolver.solve(manager.graph, np.zeros((3, 3))) is None
+    assert main.GraphSolver.find_shortest_path(manager.graph, a, c) == [a, c]
+
+
+def test_layout_disabled_during_import(app):
+    window = main.MainWindow()
+    window.populate_scene(grid_graph(40))
+    window.import_tick()
+    window.update_graph_menu()
+    assert not window.layout_action.isEnabled()
+    window.toggle_layout()
+    assert window.force_layout is None
+
+    while window.import_job is not None:
+        window.import_tick()
+    window.update_graph_menu()
+    assert window.layout_action.isEnabled()
+    window.toggle_layout()
+    assert window.force_layout is not None
+    window.stop_layout()
@@ -0,0 +1,81 @@
+import math
+import random
+
+import pytest
+
+import shortest_paths as sp
+
+
+def random_graph(n, p, rng, low=1, high=20):
+    # ориентированный граф, у вершин случайные координаты для A*
+    adj = {u: {} for u in range(n)}
+    for u in range(n):
+        for v in range(n):
+            if u != v and rng.random() < p:
+                adj[u][v] = rng.randint(low, high)
+    positions = {u: (rng.uniform(0, 500), rng.uniform(0, 500)) for u in range(n)}
+    return adj, positions
+
+
+def reverse(adj):
+    result = {u: {} for u in adj}
+    for u, row in adj.items():
+        for v, w in row.items():
+            result[v][u] = w
+    return result
+
+
+def length(adj, path):
+    assert all(path[i + 1] in adj[path[i]] for i in range(len(path) - 1))
+    return sum(adj[path[i]][path[i + 1]] for i in range(len(path) - 1))
+
+
+def test_searches_agree_with_dijkstra():
+    rng = random.Random(4)
+    for _ in range(40):
+        adj, positions = random_graph(rng.randint(2, 30), rng.choice([0.05, 0.15, 0.4]), rng)
+        back = reverse(adj)
+        for source in rng.sample(sorted(adj), min(3, len(adj))):
+            distances, _ = sp.dijkstra(adj, source)
+            assert sp.bellman_ford(adj, source)[0] == distances
+            for target in adj:
+                expected = distances.get(target)
+                for path, _ in (sp.dijkstra_search(adj, source, target),
+                                sp.astar_search(adj, source, target, positions),
+                                sp.bidirectional_search(adj, source, target, back)):
+                    assert (path is None) == (expected is None)
+                    if path is not None:
+                        assert path[0] == source and path[-1] == target
+                        assert length(adj, path) == expected
+
+
+def test_bellman_ford_with_negative_weights():
+    # ациклический граф с отрицательными весами сверяется с таблицей Флойда-Уоршелла
+    rng = random.Random(8)
+    for _ in range(20):
+        n = rng.randint(2, 25)
+        adj = {u: {v: rng.randint(-10, 10) for v in range(u + 1, n) if rng.random() < 0.3} for u in range(n)}
+        keys, dist, pred = sp.floyd_warshall(adj)
+        for source in range(n):
+            distances, _ = sp.bellman_ford(adj, source)
+            for target in range(n):
+                path = sp.shortest_path(adj, source, target)
+                if math.isinf(dist[source, target]):
+                    assert target not in distances and path is None
+                else:
+                    assert distances[target] == dist[source, target] == length(adj, path)
+
+
+@pytest.mark.parametrize("search", [
+    lambda adj: sp.bellman_ford(adj, "s"),
+    lambda adj: sp.shortest_path(adj, "s", "t"),
+    lambda adj: sp.floyd_warshall(adj),
+])
+def test_negative_cycle_reported(search):
+    adj = {"s": {"a": 2}, "a": {"b": 1}, "b": {"c": -4}, "c": {"a": 1, "t": 3}, "t": {}}
+    with pytest.raises(sp.NegativeCycle) as info:
+        search(adj)
+    cycle = info.value.cycle
+    # цикл замкнут и проходит ровно по вершинам a, b, c
+    assert cycle[0] == cycle[-1] and sorted(cycle[:-1]) == ["a", "b", "c"]
+    assert length(adj, cycle) < 0
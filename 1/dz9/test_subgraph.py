@@ -0,0 +1,81 @@
+import itertools
+import random
+
+import pytest
+
+import matcher
+import subgraph
+from compact_graph import CompactGraph
+
+
+def random_adjacency(n, p, rng, directed=False, weights=(1,), loops=False):
+    adj = {i: {} for i in range(n)}
+    for u in range(n):
+        for v in range(n) if directed else range(u, n):
+            if (u != v or loops) and rng.random() < p:
+                adj[u][v] = rng.choice(weights)
+                if not directed:
+                    adj[v][u] = adj[u][v]
+    return adj
+
+
+def planted(adj, k, rng):
+    # индуцированный подграф на k случайных вершинах
+    chosen = rng.sample(sorted(adj), k)
+    index = {v: i for i, v in enumerate(chosen)}
+    return {index[v]: {index[x]: w for x, w in adj[v].items() if x in index} for v in chosen}
+
+
+def make_graph(adj):
+    return CompactGraph.from_adjacency(adj, names=[f"N{i}" for i in range(len(adj))])
+
+
+def fits(g, m, mapping, induced):
+    g_adj, m_adj = g.adjacency(), m.adjacency()
+    if induced:
+        return all(m_adj[mapping[u]].get(mapping[x]) == g_adj[u].get(x) for u in range(len(g)) for x in range(len(g)))
+    return all(m_adj[mapping[u]].get(mapping[x]) == w for u in range(len(g)) for x, w in g_adj[u].items())
+
+
+def test_embeddings_agree_with_brute_force():
+    rng = random.Random(5)
+    for _ in range(200):
+        directed, loops = rng.random() < 0.5, rng.random() < 0.3
+        weights = (1, 2) if rng.random() < 0.4 else (1,)
+        m = make_graph(random_adjacency(rng.randint(1, 6), rng.uniform(0.2, 0.7), rng, directed, weights, loops))
+        g = make_graph(random_adjacency(rng.randint(1, 4), rng.uniform(0.2, 0.7), rng, directed, weights, loops))
+        for induced in (False, True):
+            expected = sorted(perm for perm in itertools.permutations(range(len(m)), len(g))
+                              if fits(g, m, perm, induced))
+            assert sorted(map(tuple, subgraph.search_embeddings(g, m, induced))) == expected
+
+
+@pytest.mark.parametrize("seed", [3, 5])
+def test_dense_planted_subgraph_is_found_quickly(seed):
+    # G(50, 1/2) и индуцированный подграф на 25 вершинах: без проверок после каждой
+    # расстановки поиск шёл больше 10 с
+    rng = random.Random(seed)
+    adj = random_adjacency(50, 0.5, rng)
+    g, m = make_graph(planted(adj, 25, rng)), make_graph(adj)
+    mapping = subgraph.solve_subgraph(g, m, induced=True, timeout=5)
+    assert mapping is not None
+    assert fits(g, m, [mapping[name] - 1 for name in g.names], True)
+
+
+def test_dense_missing_subgraph_is_rejected_quickly():
+    # случайный G(25, 1/2) не вкладывается в G(50, 1/2); раньше перебор занимал около 18 с
+    rng = random.Random(1)
+    m = make_graph(random_adjacency(50, 0.5, rng))
+    g = make_graph(random_adjacency(25, 0.5, rng))
+    assert subgraph.solve_subgraph(g, m, induced=True, timeout=10) is None
+
+
+def test_enumerate_with_strict_weights():
+    # невзвешенный треугольник вкладывается во взвешенный только без строгого сравнения весов
+    triangle = make_graph({0: {1: 1, 2: 1}, 1: {0: 1, 2: 1}, 2: {0: 1, 1: 1}})
+    weighted = make_graph({0: {1: 2, 2: 2}, 1: {0: 2, 2: 2}, 2: {0: 2, 1: 2}, 3: {}})
+    assert subgraph.enumerate_embeddings(triangle, weighted)[0] == 6
+    assert subgraph.enumerate_embeddings(triangle, weighted, strict_weights=True) == (0, True, [])
+    heavy = make_graph({0: {1: 2, 2: 2}, 1: {0: 2, 2: 2}, 2: {0: 2, 1: 2}})
+    assert matcher.enumerate_matches(triangle, heavy)[0] == 6
+    assert matcher.enumerate_matches(triangle, heavy, strict_weights=True)[0] == 0